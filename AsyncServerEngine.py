@@ -0,0 +1,161 @@
+# _______________________________________________
+# --------- ASYNCIO SERVER ENGINE CLASS ---------
+# ===============================================
+import asyncio
+import sys
+import threading
+
+
+class AsyncioScheduler:
+    """Class giving a server the same timer calls as TimerScheduler, backed by an asyncio event loop"""
+
+    # CONSTRUCTOR
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def now(self) -> float:
+        """Returns the event loop's monotonic time in seconds"""
+        return self.loop.time()
+
+    def callLater(self, delay: float, callback) -> asyncio.TimerHandle:
+        """Schedules callback on the event loop after delay seconds, returning a handle that can be cancelled"""
+        return self.loop.call_later(delay, callback)
+
+    def callSoon(self, callback) -> asyncio.Handle:
+        """Schedules callback on the event loop as soon as possible, from any thread (e.g. the write-ahead log's)"""
+        return self.loop.call_soon_threadsafe(callback)
+
+    @staticmethod
+    def cancel(timer) -> None:
+        """Cancels a scheduled timer (a no-op if it already ran or was never scheduled)"""
+        if timer is not None:
+            timer.cancel()
+
+
+class LoopTransport:
+    """Class wrapping a datagram transport so sends from other threads (e.g. the write-ahead log's group-commit
+    callbacks) are handed to the event loop instead of touching the transport directly"""
+
+    # CONSTRUCTOR
+    def __init__(self, transport: asyncio.DatagramTransport, loop: asyncio.AbstractEventLoop):
+        self.transport = transport
+        self.loop = loop
+        self.loopThread = threading.get_ident()
+
+    def sendto(self, data: bytes, address: tuple) -> None:
+        """Sends a datagram, from the loop thread directly or from any other thread via the loop"""
+        if threading.get_ident() == self.loopThread:
+            self.transport.sendto(data, address)
+        else:
+            self.loop.call_soon_threadsafe(self.transport.sendto, data, address)
+
+
+class ServerProtocol(asyncio.DatagramProtocol):
+    """Class delivering the datagrams received on a server's socket to that server"""
+
+    # CONSTRUCTOR
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport) -> None:
+        self.server.transport = LoopTransport(transport, asyncio.get_running_loop())
+
+    def datagram_received(self, data: bytes, address: tuple) -> None:
+        self.server.handleMessage(data, address)
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP errors for peers that are down are expected, just as the threaded engine ignores them
+        pass
+
+
+class MulticastProtocol(ServerProtocol):
+    """Class delivering the broadcasts received on a server's multicast group socket to that server (the server
+    keeps sending through its unicast socket)"""
+
+    def connection_made(self, transport) -> None:
+        pass
+
+    def datagram_received(self, data: bytes, address: tuple) -> None:
+        self.server.handleMulticast(data, address)
+
+
+class AsyncServerEngine:
+    """Class running one or more servers on a single asyncio event loop, in place of the receiver, clock and
+    test command threads, so every state transition happens on one thread in arrival order"""
+
+    # CONSTRUCTOR
+    def __init__(self, servers: list):
+        self.servers = servers
+
+    # _________________________________
+    # --------- RUN METHODS -----------
+    # =================================
+    def runForever(self, readTestCommands: bool = True) -> None:
+        """Starts the event loop and runs the servers until the process is stopped"""
+        asyncio.run(self.run(readTestCommands))
+
+    async def run(self, readTestCommands: bool = True) -> None:
+        """Attaches every server to the running loop and has it join the readiness barrier, then reads test commands
+        from stdin (or just waits)"""
+        for server in self.servers:
+            await self.startServer(server)
+        for server in self.servers:
+            server.joinReadinessBarrier()
+        if readTestCommands:
+            await self.testCommandLoop()
+        else:
+            await asyncio.Event().wait()
+
+    @staticmethod
+    async def startServer(server) -> None:
+        """Moves a server's timers onto the running loop and serves its already-bound socket (and multicast group
+        socket) with a protocol"""
+        loop = asyncio.get_running_loop()
+        server.scheduler = AsyncioScheduler(loop)
+        await loop.create_datagram_endpoint(lambda: ServerProtocol(server), sock=server.socket)
+        if server.multicastSocket is not None:
+            await loop.create_datagram_endpoint(lambda: MulticastProtocol(server), sock=server.multicastSocket)
+        print(server.name + " running on the asyncio engine...\n")
+
+    async def testCommandLoop(self) -> None:
+        """Reads the same t/f/s/r/l/m/p test commands as the threaded engine from stdin without blocking the loop
+        (with several servers in one process, prefix each command with the target node ID, e.g. '3 f')"""
+        readLine = await self.getStdinReader()
+        while True:
+            line = await readLine()
+            if not line:
+                await asyncio.Event().wait()  # stdin closed, keep serving
+            server, command = self.routeTestCommand(line.strip())
+            if server is None:
+                print("Prefix the command with one of the node IDs: " + str([s.id for s in self.servers]))
+            elif server.clusterReady is True:
+                server.handleTestCommand(command)
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    def routeTestCommand(self, line: str) -> tuple:
+        """Returns the server a command line is meant for and the command itself"""
+        if len(self.servers) == 1:
+            return self.servers[0], line
+        parts = line.split(" ", 1)
+        for server in self.servers:
+            if len(parts) == 2 and parts[0] == str(server.id):
+                return server, parts[1]
+        return None, line
+
+    @staticmethod
+    async def getStdinReader():
+        """Returns a coroutine function reading one line of stdin, through a pipe reader where the platform
+        supports one and a worker thread otherwise"""
+        loop = asyncio.get_running_loop()
+        try:
+            reader = asyncio.StreamReader()
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+            async def readLine() -> str:
+                return (await reader.readline()).decode("utf-8")
+        except (NotImplementedError, ValueError, OSError):
+            async def readLine() -> str:
+                return await loop.run_in_executor(None, sys.stdin.readline)
+        return readLine
@@ -1,6 +1,7 @@
 # _________________________________
 # --------- CLIENT CLASS ---------
 # =================================
+import random
 import socket
 import time
 from threading import Thread
@@ -8,15 +9,22 @@ from threading import Thread
 import jsonpickle
 
 from ClientMessage import ClientMessage
+from GameState import GameState, OUTCOMES, MATCH_SHIFT
+from WireCodec import WireCodec
 
 DELIMITER = "$"
+MATCH_DELIMITER = "@"  # Separates an action from the ID of the match it is played in (e.g. "0_Q@12")
+SEQUENCE_DELIMITER = "#"  # Separates an action from this client's sequence number for it (e.g. "0_Q@12#7")
+RETRY_MARK = "!"  # Ends an action resent after its leader timeout (applied only if the leader knows it has not been)
 
 
 class Client:
     """Class representing the client nodes (i.e. the RESE robots) in the Raft consensus project"""
 
     # CONSTRUCTOR
-    def __init__(self, nodeID: int, name: str, address: str, port: int, group: list, backupPath: str):
+    def __init__(self, nodeID: int, name: str, address: str, port: int, group: list, backupPath: str,
+                 matchID: int = 0, routingTable=None, useLeaderCache: bool = True, leaderTimeout: float = 1.0,
+                 transport=None, clock=time.monotonic):
         self.name = name
         self.id = nodeID
         self.backupPath = backupPath
@@ -25,9 +33,37 @@ class Client:
         # NETWORKING ATTRIBUTES
         self.address = address
         self.port = port
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind((self.address, self.port))
+        self.socket = None
+        if transport is None:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((self.address, self.port))
+        # Anything with sendto(bytes, (ip, port)), such as the simulator's in-memory network in place of a socket
+        self.transport = transport if transport is not None else self.socket
+        self.clock = clock  # Returns the current time in seconds (the simulator's virtual clock when simulated)
         self.group = group
+        # Routes this client's match to the Raft group hosting it (None sends to every server in the group)
+        self.routingTable = routingTable
+
+        # MATCH ATTRIBUTES
+        self.matchID = matchID
+
+        # LEADER DISCOVERY ATTRIBUTES (actions go to the cached leader, or to every server while it is unknown)
+        self.useLeaderCache = useLeaderCache
+        self.leaderTimeout = leaderTimeout  # Seconds without an outcome before the cached leader is presumed gone
+        self.leader = None  # Networking tuple of the server believed to be leader
+        self.pendingAction = None  # Last action sent that has not been followed by an outcome yet
+        self.pendingSince = 0.0
+        self.nextSequence = 0  # Sequence number of the latest action, so the leader can tell a resend from a new one
+        self.datagramsSent = 0
+
+        # READ ATTRIBUTES (read queries fetch the match's committed state without submitting an action)
+        self.nextReadID = 0
+        self.pendingQuery = None  # Last read query sent that has not been answered yet
+        self.querySince = 0.0
+        self.lastReadState = None  # Committed game state returned by the last answered read query
+        # Commit index of the last answer, which replica reads are fenced at so this client never reads older state
+        self.lastReadIndex = -1
+        self.readReplica = None  # Server or learner this client sends replica reads to (picked at random)
 
         # THREAD ATTRIBUTES (Initialized with boot-up script)
         self.receiverThread = None
@@ -52,21 +88,25 @@ class Client:
         while True:  # userInput = input("\nEnter Command:\n-> ")
             userInput = input()
             if userInput == "Q" or userInput == "q":
-                message = str(self.id) + "_Q"
+                message = self.getActionMessage("Q")
                 self.lastAction = message
-                self.multicastToServers(message)
+                self.sendAction(message)
             elif userInput == "W" or userInput == "w":
-                message = str(self.id) + "_W"
+                message = self.getActionMessage("W")
                 self.lastAction = message
-                self.multicastToServers(message)
+                self.sendAction(message)
             elif userInput == "A" or userInput == "a":
-                message = str(self.id) + "_A"
+                message = self.getActionMessage("A")
                 self.lastAction = message
-                self.multicastToServers(message)
+                self.sendAction(message)
             elif userInput == "S" or userInput == "s":
-                message = str(self.id) + "_S"
+                message = self.getActionMessage("S")
                 self.lastAction = message
-                self.multicastToServers(message)
+                self.sendAction(message)
+            elif userInput == "V" or userInput == "v":
+                self.sendQuery()
+            elif userInput == "F" or userInput == "f":
+                self.sendQuery(anyReplica=True)
             elif userInput == "?":
                 self.printReplMenu()
             else:
@@ -75,16 +115,55 @@ class Client:
     # _____________________________________________
     # --------- MESSAGE SENDING METHODS -----------
     # =============================================
+    def sendAction(self, message: str) -> None:
+        """Numbers a new action and sends it"""
+        self.nextSequence += 1
+        self.pendingAction = message + SEQUENCE_DELIMITER + str(self.nextSequence)
+        self.deliverAction(self.pendingAction)
+
+    def deliverAction(self, message: str) -> None:
+        """Sends an action to the cached leader, probing every server instead while no leader is known"""
+        self.pendingSince = self.clock()
+        if self.useLeaderCache and self.leader is not None:
+            self.sendMessage(self.leader, message)
+        else:
+            self.multicastToServers(message)
+
+    def sendQuery(self, anyReplica: bool = False, maxStaleness: float = None) -> None:
+        """Sends a read query for the committed state of this client's match ('Q$<match>$<read ID>'), to the cached
+        leader or to every server while no leader is known. A replica read instead goes to one server or learner,
+        which answers from its own committed state once it is no older than this client's last answer (and, given
+        maxStaleness, was caught up with the leader within that many seconds)"""
+        self.nextReadID += 1
+        self.pendingQuery = "Q" + DELIMITER + str(self.matchID) + DELIMITER + str(self.nextReadID)
+        if anyReplica:
+            self.pendingQuery += DELIMITER + str(self.lastReadIndex) + DELIMITER + (
+                str(maxStaleness) if maxStaleness is not None else "")
+            if self.readReplica is None:
+                self.readReplica = random.choice(self.getReplicas())
+            self.querySince = self.clock()
+            self.sendMessage(self.readReplica, self.pendingQuery)
+        else:
+            self.resendQuery()
+
+    def resendQuery(self) -> None:
+        """Sends the pending read query (again) to the cached leader, or to every server while none is known"""
+        self.querySince = self.clock()
+        if self.useLeaderCache and self.leader is not None:
+            self.sendMessage(self.leader, self.pendingQuery)
+        else:
+            self.multicastToServers(self.pendingQuery)
+
     def multicastToServers(self, message: str) -> None:
-        """Multicasts the message to all nodes in the server cluster"""
-        for process in self.group:
-            if process[0][0] == "S":
-                self.sendMessage(process, message)
+        """Multicasts the message to all nodes in the server cluster (the Raft group hosting this client's match)"""
+        for process in self.getServers():
+            self.sendMessage(process, message)
 
     def sendMessage(self, recipientAddressing: tuple, message: str) -> None:
         """Sends a message as a string to a recipient"""
         # print(recipientAddressing[0])
-        self.socket.sendto(message.encode("utf-8"), (recipientAddressing[1], recipientAddressing[2]))
+        self.transport.sendto(message.encode("utf-8"), (recipientAddressing[1], recipientAddressing[2]))
+        self.datagramsSent += 1
         # print("Client bytes sent:" + str(numBytesSent))
         # print("\nMessage sent to " + recipientAddressing[0] + " at " + recipientAddressing[1] + ":" + str(recipientAddressing[2]) + "...")
 
@@ -95,14 +174,93 @@ class Client:
         """Runs an infinite loop listening for messages from other processes in the group,
         accessing/modifying local data as needed"""
         print("Receiver thread started...")
+        self.socket.settimeout(self.leaderTimeout)
         while True:
-            # On receipt of a message, decode data and print
-            data, address = self.socket.recvfrom(16384)
-            data = data.decode("utf-8")
-            splitData = self.parseIncommingMessage(data)
-            self.lastOutcome = splitData[0]
-            print(splitData[1])
-            self.processLastOutcome()
+            self.checkLeaderTimeout()
+            try:
+                data, address = self.socket.recvfrom(16384)
+            except socket.timeout:
+                continue
+            self.handleMessage(data, address)
+
+    def handleMessage(self, data: bytes, address) -> None:
+        """On receipt of a message, decodes the data and prints it (called by whatever owns the socket)"""
+        if data[:1] == b"G":
+            # a compact outcome carries just the packed state code, rendered here from the graphics table
+            stateCode = WireCodec.decodeClientState(data)
+            self.hearOutcome(OUTCOMES[stateCode >> 8 & 0x7], GameState.getGraphicForStateCode(stateCode),
+                             stateCode >> MATCH_SHIFT, address)
+            return
+        if data[:1] == b"V":
+            readID, stateCode, commitIndex = WireCodec.decodeReadResult(data)
+            self.hearReadResult(readID, stateCode, commitIndex, address)
+            return
+        data = data.decode("utf-8")
+        splitData = self.parseIncommingMessage(data)
+        if splitData[0] == "L":
+            self.hearRedirect(int(splitData[1]), address)
+            return
+        if splitData[0] == "J":
+            self.hearRejection(splitData[1])
+            return
+        self.hearOutcome(splitData[0], splitData[1], int(splitData[2]) if len(splitData) > 2 else 0, address)
+
+    def hearOutcome(self, outcome: str, graphic: str, matchID: int, address) -> None:
+        """Prints the committed outcome of an action in this client's match and reacts to it"""
+        # Only the leader reports outcomes, so the sender is the leader to cache
+        self.leader = self.getProcessByAddress(address)
+        if matchID != self.matchID:
+            return  # Outcome of another match hosted by the same Raft group
+        if str(self.id) not in outcome:
+            self.pendingAction = None  # The outcome of this player's action (the opponent's actions name this player)
+        self.lastOutcome = outcome
+        print(graphic)
+        self.processLastOutcome()
+
+    def hearRejection(self, message: str) -> None:
+        """Drops the pending action the leader refused, as resending cannot help: an unknown action or match ID, or a
+        resend the leader cannot be sure was not applied already"""
+        if self.isPendingAction(message):
+            self.pendingAction = None
+        print("The action '" + message.rstrip(RETRY_MARK) + "' was not applied by the server cluster.")
+
+    def hearReadResult(self, readID: int, stateCode: int, commitIndex: int, address) -> None:
+        """Prints the committed game state answering this client's latest read query (ignoring older answers)"""
+        if self.pendingQuery is None or self.pendingQuery.split(DELIMITER)[2] != str(readID):
+            return
+        if not self.isReplicaRead():
+            self.leader = self.getProcessByAddress(address)  # Only the leader answers other reads
+        self.lastReadIndex = max(self.lastReadIndex, commitIndex)
+        self.pendingQuery = None
+        self.lastReadState = GameState.fromStateCode(stateCode)
+        print(GameState.getGraphicForStateCode(stateCode))
+
+    def hearRedirect(self, leaderID: int, senderAddress: tuple) -> None:
+        """Caches the leader named by a server that is not leader, resending the pending action (and read query) to
+        it if that server was the only one sent them (a probe already reached the leader)"""
+        wasSentOnlyHere = self.leader is not None and (self.leader[1], self.leader[2]) == senderAddress
+        self.leader = self.getServerByID(leaderID)
+        if self.isReplicaRead() and self.readReplica is not None and \
+                (self.readReplica[1], self.readReplica[2]) == senderAddress:
+            # the replica lags more than the read allows, so the leader serves it
+            self.resendQuery()
+            return
+        if wasSentOnlyHere and self.pendingAction is not None and self.leader is not None:
+            self.deliverAction(self.pendingAction)  # No leader has it, so it goes as a first send
+        if wasSentOnlyHere and self.pendingQuery is not None and self.leader is not None:
+            self.resendQuery()
+
+    def checkLeaderTimeout(self) -> None:
+        """Forgets the cached leader and probes every server with the pending action once it has gone unanswered
+        for leaderTimeout seconds. The resend is marked, as the action may have been applied with only its outcome
+        lost: the leader refuses it unless it knows it has not applied it, so no action is ever applied twice"""
+        if self.pendingAction is not None and self.clock() - self.pendingSince >= self.leaderTimeout:
+            self.leader = None
+            self.deliverAction(self.pendingAction + RETRY_MARK)
+        if self.pendingQuery is not None and self.clock() - self.querySince >= self.leaderTimeout:
+            self.leader = None
+            self.readReplica = None
+            self.resendQuery()
 
     def processLastOutcome(self) -> None:
         # add additional last outcome responses here as needed
@@ -112,7 +270,9 @@ class Client:
                 self.initiatePunchDelay(3)
         elif self.lastOutcome.__contains__("M"):
             if not self.lastOutcome.__contains__(str(self.id)):
-                if self.lastAction.__contains__("A") or self.lastAction.__contains__("S"):
+                if self.lastAction is None:
+                    pass  # The outcome of an action sent before this client started
+                elif self.lastAction.__contains__("A") or self.lastAction.__contains__("S"):
                     print("Block Up!")
                     self.lastAction = None
                 else:
@@ -137,8 +297,18 @@ class Client:
         print("Press 'W' PUNCH with RIGHT")
         print("Press 'A' BLOCK with LEFT")
         print("Press 'S' BLOCK with RIGHT")
+        print("Press 'V' VIEW the committed match state")
+        print("Press 'F' VIEW it from any server or learner (as fresh as your last view)")
         print("Press '?' to reprint the menu options")
 
+    def isPendingAction(self, message: str) -> bool:
+        """Returns whether an action message echoed by a server is the pending action (or a resend of it)"""
+        return self.pendingAction is not None and message.rstrip(RETRY_MARK) == self.pendingAction
+
+    def getActionMessage(self, key: str) -> str:
+        """Returns the action message for a pressed key, tagged with this client's match ID"""
+        return str(self.id) + "_" + key + MATCH_DELIMITER + str(self.matchID)
+
     @staticmethod
     def initiatePunchDelay(punchPenalty) -> None:
         while punchPenalty > 0:
@@ -147,6 +317,34 @@ class Client:
             punchPenalty = punchPenalty - 1
         print("Penalty Ended....FIGHT")
 
+    def getServers(self) -> list:
+        """Returns the networking tuples of the servers in the Raft group hosting this client's match"""
+        if self.routingTable is not None:
+            return self.routingTable.getServers(self.matchID)
+        return [process for process in self.group if process[0][0] == "S"]
+
+    def getReplicas(self) -> list:
+        """Returns the networking tuples of the servers and learners that can serve this client's replica reads"""
+        if self.routingTable is not None:
+            return self.routingTable.getServers(self.matchID)
+        return [process for process in self.group if process[0][0] == "S" or process[0][0] == "L"]
+
+    def isReplicaRead(self) -> bool:
+        """Returns whether the pending read query may be served by any replica"""
+        return self.pendingQuery is not None and len(self.pendingQuery.split(DELIMITER)) > 3
+
+    def getServerByID(self, serverID: int) -> tuple:
+        """Returns the networking tuple of the server with the given node ID (None if it is unknown)"""
+        for process in self.getServers():
+            if process[0].split("_")[-1] == str(serverID):
+                return process
+
+    def getProcessByAddress(self, address) -> tuple:
+        """Returns the networking tuple of the server sending from the given address"""
+        for process in self.getServers():
+            if process[1] == address[0] and process[2] == address[1]:
+                return process
+
     @staticmethod
     def parseIncommingMessage(data):
         splitData = data.split(DELIMITER)
@@ -0,0 +1,421 @@
+# _____________________________________________
+# --------- CLUSTER SIMULATOR CLASS -----------
+# =============================================
+import contextlib
+import copy
+import heapq
+import itertools
+import os
+import random
+
+from Client import Client
+from Log import Log
+from MulticastChannel import MulticastChannel
+from Server import Server
+from WireCodec import MAX_DATAGRAM
+
+SIMULATED_PORT = 4000
+SIMULATED_MULTICAST_GROUP = "239.255.0.1"
+
+
+class VirtualScheduler:
+    """Class giving servers the same timer calls as TimerScheduler on a virtual clock, which only moves forward
+    when the simulation runs the next due event"""
+
+    # CONSTRUCTOR
+    def __init__(self):
+        self.time = 0.0
+        self.timers = []  # Heap of [deadline, sequence number, callback] entries
+        self.sequence = itertools.count()  # Breaks ties so equal deadlines run in scheduling order
+
+    def now(self) -> float:
+        """Returns the current virtual time in seconds"""
+        return self.time
+
+    def callLater(self, delay: float, callback) -> list:
+        """Schedules callback to run after delay virtual seconds, returning a handle that can be cancelled"""
+        timer = [self.time + delay, next(self.sequence), callback]
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def callSoon(self, callback) -> list:
+        """Schedules callback to run at the current virtual time, after the events already due"""
+        return self.callLater(0, callback)
+
+    @staticmethod
+    def cancel(timer) -> None:
+        """Cancels a scheduled timer (a no-op if it already ran or was never scheduled)"""
+        if timer is not None:
+            timer[2] = None
+
+    def runUntil(self, deadline: float, afterEvent=None) -> None:
+        """Runs every event due by the deadline in order, then moves the clock to the deadline"""
+        while len(self.timers) > 0 and self.timers[0][0] <= deadline:
+            timer = heapq.heappop(self.timers)
+            if timer[2] is not None:
+                self.time = timer[0]
+                timer[2]()
+                if afterEvent is not None:
+                    afterEvent()
+        self.time = max(self.time, deadline)
+
+
+class SimulatedNetwork:
+    """Class delivering datagrams between simulated processes through the virtual scheduler, with a seeded random
+    delay, random loss and partitions that cut processes off from each other. Given a bandwidth, each one-way link
+    also transmits its datagrams one after another in order, and datagrams longer than a receive buffer are lost.
+    A datagram sent to a multicast group counts as one send and reaches each other member, lost or delayed on its
+    own"""
+
+    # CONSTRUCTOR
+    def __init__(self, scheduler: VirtualScheduler, rng: random.Random, minDelay: float, maxDelay: float,
+                 lossRate: float, bandwidth: float = None):
+        self.scheduler = scheduler
+        self.random = rng
+        self.minDelay = minDelay
+        self.maxDelay = maxDelay
+        self.lossRate = lossRate
+        self.bandwidth = bandwidth  # Bytes per second of every one-way link (None for links that never queue)
+        self.linkFreeAt = {}  # Time each (source, destination) link finishes transmitting, and its last delivery
+        self.handlers = {}  # Function receiving (data, sender address) for every attached address
+        self.partitionOf = {}  # Partition number of every address while partitioned (absent addresses are healed)
+        self.groupMembers = {}  # Addresses that joined each multicast group address
+        self.groupHandlers = {}  # Function receiving the multicast datagrams of every address that joined a group
+        self.datagramsSent = 0
+        self.datagramsSentBy = {}  # Datagrams sent from each address
+        self.datagramsDropped = 0
+        self.bytesSent = 0
+
+    def attach(self, address: tuple, handler) -> None:
+        """Delivers datagrams sent to address to handler(data, senderAddress)"""
+        self.handlers[address] = handler
+
+    def joinGroup(self, groupAddress: tuple, address: tuple, handler) -> None:
+        """Delivers datagrams sent to groupAddress to the process at address too, through handler(data,
+        senderAddress) as if heard on a socket joined to the group"""
+        self.groupMembers.setdefault(groupAddress, []).append(address)
+        self.groupHandlers[address] = handler
+
+    def getTransport(self, address: tuple) -> "SimulatedTransport":
+        """Returns the transport a process at address sends through"""
+        return SimulatedTransport(self, address)
+
+    def send(self, data: bytes, source: tuple, destination: tuple) -> None:
+        """Schedules the delivery of a datagram (to every other member of a multicast group) unless it is lost or
+        crosses a partition"""
+        self.datagramsSent += 1
+        self.datagramsSentBy[source] = self.datagramsSentBy.get(source, 0) + 1
+        self.bytesSent += len(data)
+        if destination not in self.groupMembers:
+            self.transmit(data, source, destination, self.handlers)
+            return
+        for receiver in self.groupMembers[destination]:
+            if receiver != source:
+                self.transmit(data, source, receiver, self.groupHandlers)
+
+    def transmit(self, data: bytes, source: tuple, destination: tuple, handlers: dict) -> None:
+        """Schedules the delivery of a datagram to one process unless it is lost or crosses a partition"""
+        if self.partitionOf.get(source, 0) != self.partitionOf.get(destination, 0) or \
+                self.random.random() < self.lossRate or len(data) > MAX_DATAGRAM:
+            self.datagramsDropped += 1
+            return
+        delay = self.random.uniform(self.minDelay, self.maxDelay)
+        if self.bandwidth is not None:
+            # queue behind the link's earlier datagrams and never overtake them
+            now = self.scheduler.now()
+            freeAt, lastDelivery = self.linkFreeAt.get((source, destination), (now, now))
+            freeAt = max(freeAt, now) + len(data) / self.bandwidth
+            delay = max(freeAt + delay, lastDelivery) - now
+            self.linkFreeAt[(source, destination)] = (freeAt, now + delay)
+        self.scheduler.callLater(delay, lambda: self.deliver(data, source, destination, handlers))
+
+    def deliver(self, data: bytes, source: tuple, destination: tuple, handlers: dict) -> None:
+        """Hands a datagram to the process at its destination (dropping it if nothing is attached there)"""
+        handler = handlers.get(destination)
+        if handler is not None:
+            handler(data, source)
+
+    def partition(self, addressGroups: list) -> None:
+        """Splits the network so only addresses in the same group reach each other (unlisted ones join group 0)"""
+        self.partitionOf = {}
+        for groupNumber in range(len(addressGroups)):
+            for address in addressGroups[groupNumber]:
+                self.partitionOf[address] = groupNumber
+
+    def heal(self) -> None:
+        """Removes every partition"""
+        self.partitionOf = {}
+
+
+class SimulatedTransport:
+    """Class standing in for a process's UDP socket on the simulated network"""
+
+    # CONSTRUCTOR
+    def __init__(self, network: SimulatedNetwork, address: tuple):
+        self.network = network
+        self.address = address
+
+    def sendto(self, data: bytes, address: tuple) -> None:
+        self.network.send(data, self.address, address)
+
+
+class SimulatedStorage:
+    """Class standing in for a server's write-ahead log, applying what it is given to an in-memory log once a
+    simulated fsync delay has passed (so a recovered log only holds what was durable) and then running the
+    durability callbacks"""
+
+    # CONSTRUCTOR
+    def __init__(self, scheduler: VirtualScheduler, syncDelay: float):
+        self.scheduler = scheduler
+        self.syncDelay = syncDelay
+        self.log = Log()
+        self.lastCommittedEntry = -1
+        self.termAndVote = (0, False)
+
+    def appendEntries(self, firstIndex: int, entries, onDurable=None) -> None:
+        self.afterSync(lambda: self.log.appendEntriesAfterIndex(firstIndex - 1, entries), onDurable)
+
+    def appendCommit(self, lastCommittedEntry: int, onDurable=None) -> None:
+        def commit() -> None:
+            self.lastCommittedEntry = max(self.lastCommittedEntry, lastCommittedEntry)
+        self.afterSync(commit, onDurable)
+
+    def appendVote(self, term: int, hasVoted: bool, onDurable=None) -> None:
+        def vote() -> None:
+            self.termAndVote = (term, hasVoted)
+        self.afterSync(vote, onDurable)
+
+    def appendSnapshot(self, log: Log, onDurable=None) -> None:
+        snapshot = (log.snapshotIndex, log.snapshotTerm, log.snapshotState, list(log.snapshotMatches.values()))
+        self.afterSync(lambda: self.log.installSnapshot(*snapshot), onDurable)
+
+    def afterSync(self, write, onDurable) -> None:
+        """Applies a write and runs its callback once the simulated fsync completes"""
+        def sync() -> None:
+            write()
+            if onDurable is not None:
+                onDurable()
+        self.scheduler.callLater(self.syncDelay, sync)
+
+    def flush(self) -> None:
+        pass  # Every write is applied by the virtual scheduler in order
+
+    def getTermAndVote(self) -> tuple:
+        return self.termAndVote
+
+    def recoverLog(self) -> Log:
+        """Returns a copy of the durable log"""
+        log = copy.deepcopy(self.log)
+        log.lastCommittedEntry = min(max(self.lastCommittedEntry, log.lastCommittedEntry), log.lastAppendedEntry)
+        return log
+
+
+class SimulatedPlayer:
+    """Class driving a client closed-loop: it sends an action, waits for the outcome and thinks before the next,
+    recording each action-to-outcome (i.e. commit) latency"""
+
+    # CONSTRUCTOR
+    def __init__(self, client: Client, scheduler: VirtualScheduler, rng: random.Random, thinkTime: float):
+        self.client = client
+        self.scheduler = scheduler
+        self.random = rng
+        self.thinkTime = thinkTime
+        self.sentAt = None
+        self.latencies = []
+        self.actionsSent = 0
+
+    def start(self) -> None:
+        """Sends the first action after a random think time and starts checking the client's leader timeout"""
+        self.scheduler.callLater(self.random.uniform(0, self.thinkTime), self.sendAction)
+        self.scheduler.callLater(self.client.leaderTimeout, self.checkLeaderTimeout)
+
+    def sendAction(self) -> None:
+        # Blocks only, since a blocked punch makes a client sleep out its penalty
+        message = self.client.getActionMessage(self.random.choice(["A", "S"]))
+        self.client.lastAction = message
+        self.sentAt = self.scheduler.now()
+        self.actionsSent += 1
+        self.client.sendAction(message)
+
+    def handleMessage(self, data: bytes, address) -> None:
+        self.client.handleMessage(data, address)
+        if self.sentAt is not None and self.client.pendingAction is None:
+            self.latencies.append(self.scheduler.now() - self.sentAt)
+            self.sentAt = None
+            self.scheduler.callLater(self.random.uniform(0, self.thinkTime), self.sendAction)
+
+    def checkLeaderTimeout(self) -> None:
+        """Stands in for the socket timeout of Client.listen"""
+        self.client.checkLeaderTimeout()
+        self.scheduler.callLater(self.client.leaderTimeout / 4, self.checkLeaderTimeout)
+
+
+class ClusterSimulator:
+    """Class running a whole cluster of Server and Client instances in one process, deterministically from a seed:
+    sockets are replaced by a simulated network, timers and sleeps by a virtual clock and the write-ahead log by
+    simulated storage. Checks Raft's safety properties after every event. With passMessageObjects, servers hand
+    their Raft messages to the network as objects instead of encoding them, which skips the codec (so datagram sizes
+    are not simulated) but runs the same events in the same order"""
+
+    # CONSTRUCTOR
+    def __init__(self, seed: int, serverCount: int = 5, playerCount: int = 2, minDelay: float = 0.0005,
+                 maxDelay: float = 0.002, lossRate: float = 0.0, timeoutRange: tuple = (5, 15), heartRate: float = 3,
+                 syncDelay: float = 0.0005, thinkTime: float = 0.05, batchWindow: float = 0.005,
+                 bandwidth: float = None, learnerCount: int = 0, useMulticast: bool = False, preVote: bool = True,
+                 adaptiveTiming: bool = False, passMessageObjects: bool = False):
+        if passMessageObjects and bandwidth is not None:
+            raise ValueError("Messages passed as objects have no size to hold a bandwidth to")
+        self.devnull = open(os.devnull, "w")
+        self.random = random.Random(seed)
+        random.seed(seed)  # Game states roll punches on the module generator
+        self.scheduler = VirtualScheduler()
+        self.network = SimulatedNetwork(self.scheduler, self.random, minDelay, maxDelay, lossRate, bandwidth)
+
+        # PROCESS ATTRIBUTES (server IDs start at 2 as in config.txt, each player is red in a match of its own)
+        processes = [("Server_" + str(nodeID), "10.0.0." + str(nodeID), SIMULATED_PORT)
+                     for nodeID in range(2, 2 + serverCount)]
+        learners = [("Learner_" + str(nodeID), "10.0.0." + str(nodeID), SIMULATED_PORT)
+                    for nodeID in range(2 + serverCount, 2 + serverCount + learnerCount)]
+        players = [("Client_Red_" + str(match), "10.0.1." + str(match), SIMULATED_PORT)
+                   for match in range(playerCount)]
+        self.servers = []
+        self.learners = []
+        multicastChannel = MulticastChannel(SIMULATED_MULTICAST_GROUP, SIMULATED_PORT) if useMulticast else None
+        with self.quiet():
+            for nodeID, process in zip(range(2, 2 + serverCount + learnerCount), processes + learners):
+                address = (process[1], process[2])
+                group = [other for other in processes + learners + players if other is not process]
+                server = Server(nodeID, process[0], process[1], process[2], group, os.devnull,
+                                useWriteAheadLog=False, batchWindow=batchWindow,
+                                transport=self.network.getTransport(address), isLearner=process in learners,
+                                multicastChannel=multicastChannel,
+                                electionTimeoutMs=(timeoutRange[0] * 1000, timeoutRange[1] * 1000),
+                                heartbeatMs=heartRate * 1000, preVote=preVote, adaptiveTiming=adaptiveTiming)
+                server.scheduler = self.scheduler
+                server.passMessageObjects = passMessageObjects
+                server.writeAheadLog = SimulatedStorage(self.scheduler, syncDelay)
+                server.timeout = self.random.uniform(*timeoutRange)  # Drawn from the seeded generator instead
+                self.network.attach(address, server.handleMessage)
+                if multicastChannel is not None:
+                    self.network.joinGroup(multicastChannel.getAddress(), address, server.handleMulticast)
+                (self.learners if server.isLearner else self.servers).append(server)
+            self.players = []
+            for match, process in zip(range(playerCount), players):
+                address = (process[1], process[2])
+                client = Client(0, process[0], process[1], process[2], processes + learners, os.devnull,
+                                matchID=match, transport=self.network.getTransport(address),
+                                clock=self.scheduler.now)
+                player = SimulatedPlayer(client, self.scheduler, self.random, thinkTime)
+                self.network.attach(address, player.handleMessage)
+                self.players.append(player)
+
+        # SAFETY CHECK ATTRIBUTES
+        self.leaderOfTerm = {}  # Name of the first server seen leading each term
+        self.committed = {}  # (term, state code) of every committed entry seen so far, keyed by index
+        self.replicas = self.getReplicas()
+        self.checkedThrough = {server.name: -1 for server in self.replicas}  # Last committed index per replica
+        self.violations = []
+
+    # _________________________________
+    # --------- RUN METHODS -----------
+    # =================================
+    def start(self) -> None:
+        """Starts every server's election timer and every player's first action"""
+        for server in self.getReplicas():
+            server.markClusterReady()
+        for player in self.players:
+            player.start()
+
+    def runFor(self, seconds: float) -> None:
+        """Runs the simulation for a span of virtual time"""
+        with self.quiet():
+            self.scheduler.runUntil(self.scheduler.now() + seconds, self.checkSafety)
+
+    def runUntil(self, predicate, limit: float, step: float = 0.001) -> float:
+        """Runs until predicate() holds, returning the virtual seconds that took (or None after limit seconds)"""
+        start = self.scheduler.now()
+        while not predicate():
+            if self.scheduler.now() - start >= limit:
+                return None
+            self.runFor(step)
+        return self.scheduler.now() - start
+
+    def waitForLeader(self, limit: float, excluded=None) -> float:
+        """Runs until a live server other than excluded is leader, returning the virtual seconds that took"""
+        return self.runUntil(lambda: self.getLeader(excluded) is not None, limit)
+
+    # _______________________________________
+    # --------- FAULT INJECTION METHODS -----
+    # =======================================
+    def failServer(self, server: Server) -> None:
+        """Fails a server as the 'f' test command does"""
+        server.handleTestCommand("f")
+
+    def recoverServer(self, server: Server) -> None:
+        """Restarts a failed server from its durable log as the 'r' test command does"""
+        with self.quiet():
+            server.handleTestCommand("r")
+        self.checkedThrough[server.name] = min(self.checkedThrough[server.name], server.log.lastCommittedEntry)
+
+    def transferLeadership(self, leader: Server, targetID: int = -1) -> None:
+        """Hands leadership to another voter as the 'x' test command does"""
+        with self.quiet():
+            leader.handleTestCommand("x" if targetID < 0 else "x " + str(targetID))
+
+    def partition(self, serverGroups: list) -> None:
+        """Partitions the servers into the given groups (players stay with the first group)"""
+        self.network.partition([[(server.address, server.port) for server in group] for group in serverGroups])
+
+    def heal(self) -> None:
+        self.network.heal()
+
+    # ______________________________________
+    # --------- SAFETY CHECK METHODS -------
+    # ======================================
+    def checkSafety(self) -> None:
+        """Records a violation if two servers lead the same term (election safety) or two servers ever commit
+        different entries at the same index (state machine safety), learners included. Runs after every event, so
+        a replica that leads no term and committed nothing new since the last check costs two attribute reads"""
+        checkedThrough = self.checkedThrough
+        for server in self.replicas:
+            if server.isLeader is True and self.leaderOfTerm.setdefault(server.currentTerm, server.name) != server.name:
+                self.recordViolation("Two leaders in term " + str(server.currentTerm) + ": " +
+                                     self.leaderOfTerm[server.currentTerm] + ", " + server.name)
+            if server.log.lastCommittedEntry > checkedThrough[server.name]:
+                self.checkCommittedEntries(server)
+
+    def checkCommittedEntries(self, server: Server) -> None:
+        """Compares the entries a replica committed since the last check with those other replicas committed"""
+        log = server.log
+        for index in range(max(self.checkedThrough[server.name], log.snapshotIndex) + 1,
+                           min(log.lastCommittedEntry, log.lastAppendedEntry) + 1):
+            entry = (log.getTermAtIndex(index), log.stateCodes[index - log.snapshotIndex - 1])
+            if self.committed.setdefault(index, entry) != entry:
+                self.recordViolation(server.name + " committed " + str(entry) + " at index " + str(index) +
+                                     " where another server committed " + str(self.committed[index]))
+        self.checkedThrough[server.name] = log.lastCommittedEntry
+
+    def recordViolation(self, description: str) -> None:
+        if description not in self.violations:
+            self.violations.append(description)
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    def getLeader(self, excluded=None) -> Server:
+        """Returns a live leader other than excluded (the one with the highest term), or None"""
+        leaders = [server for server in self.servers
+                   if server.isLeader is True and server.isFailed is False and server is not excluded]
+        return max(leaders, key=lambda server: server.currentTerm) if len(leaders) > 0 else None
+
+    def getReplicas(self) -> list:
+        """Returns every voting server followed by every learner"""
+        return self.servers + self.learners
+
+    def getLatencies(self) -> list:
+        """Returns every player's action-to-outcome latencies in virtual seconds"""
+        return [latency for player in self.players for latency in player.latencies]
+
+    def quiet(self):
+        """Silences the servers' and clients' console output while the simulation runs"""
+        return contextlib.redirect_stdout(self.devnull)
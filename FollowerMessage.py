@@ -1,7 +1,13 @@
-
 class FollowerMessage:
-    def __init__(self, currentTerm, responseToLeader, lastCommittedIndex, nextIndex):
+    def __init__(self, currentTerm, responseToLeader, lastCommittedIndex, nextIndex, conflictTerm=-1,
+                 conflictIndex=-1, snapshotIndex=-1, snapshotOffset=-1):
         self.currentTerm = currentTerm
         self.response = responseToLeader
         self.lastCommittedIndex = lastCommittedIndex
         self.nextIndex = nextIndex
+        self.conflictTerm = conflictTerm
+        self.conflictIndex = conflictIndex
+        # Index of the snapshot a snapshot ack is for, and how many of its match states are held from the first on
+        # (both -1 when not acking a snapshot)
+        self.snapshotIndex = snapshotIndex
+        self.snapshotOffset = snapshotOffset
@@ -3,12 +3,21 @@
 # ===================================
 import random
 
+# ENCODING TABLES: Position in each tuple is the small-int code used by the packed state code
+ACTIONS = ("", "0_Q", "0_W", "0_A", "0_S", "1_Q", "1_W", "1_A", "1_S")
+OUTCOMES = ("", "M_0", "M_1", "B_0", "B_1", "K_0", "K_1")
+MATCH_SHIFT = 13  # Bits of a packed state code below the match ID
+MATCH_LIMIT = 1 << (32 - MATCH_SHIFT)  # Match IDs must be below this to fit in a 32-bit packed state code
+STATE_MASK = (1 << MATCH_SHIFT) - 1  # Bits of a packed state code that decide its graphic (all but the match ID)
+
 
 class GameState:
     """Class representing a snapshot in time (i.e. game state) of a RESE robots match"""
+    # Fixed attributes keep each instance small (logs store the packed state code from getStateCode instead)
+    __slots__ = ("redLeft", "redRight", "blueLeft", "blueRight", "action", "outcome", "winner", "match")
 
     # CONSTRUCTOR
-    def __init__(self):
+    def __init__(self, match: int = 0):
         # ENCODING: A RESE robot's arm can be either inactive/punching (0) or blocking (1)
         self.redLeft = 0
         self.redRight = 0
@@ -20,6 +29,8 @@ class GameState:
         self.outcome = ""
         # ENCODING: A game can result in either Red's the winner (0), or Blue's the winner (1), or in-progress (2)
         self.winner = 2
+        # ENCODING: The ID of the match this game state belongs to (a Raft group can host many concurrent matches)
+        self.match = match
 
     # _______________________________________
     # --------- GAMESTATE METHODS -----------
@@ -85,11 +96,31 @@ class GameState:
                 else:
                     self.outcome = "M_0"
 
+    def getStateCode(self) -> int:
+        """Packs the game state into a single 32-bit int (hands in bits 0-3, action 4-7, outcome 8-10, winner 11-12,
+        match ID 13 onward)"""
+        return (self.redLeft | self.redRight << 1 | self.blueLeft << 2 | self.blueRight << 3
+                | ACTIONS.index(self.action) << 4 | OUTCOMES.index(self.outcome) << 8 | self.winner << 11
+                | self.match << MATCH_SHIFT)
+
+    @classmethod
+    def fromStateCode(cls, stateCode: int) -> "GameState":
+        """Unpacks a state code produced by getStateCode into a new game state"""
+        gameState = cls()
+        gameState.redLeft = stateCode & 1
+        gameState.redRight = stateCode >> 1 & 1
+        gameState.blueLeft = stateCode >> 2 & 1
+        gameState.blueRight = stateCode >> 3 & 1
+        gameState.action = ACTIONS[stateCode >> 4 & 0xF]
+        gameState.outcome = OUTCOMES[stateCode >> 8 & 0x7]
+        gameState.winner = stateCode >> 11 & 0x3
+        gameState.match = stateCode >> MATCH_SHIFT
+        return gameState
+
     @staticmethod
     def isHit() -> bool:
         """Evaluates if a punch lands using the 10% RNG"""
-        random.seed()
-        rngRoll = random.random()
+        rngRoll = random.random()  # Drawn from the module generator, so a simulation can seed it
         if rngRoll < 0.10:
             return True
         else:
@@ -110,6 +141,15 @@ class GameState:
 
     def getGameStateGraphic(self) -> str:
         """Returns a single string graphic encoding of current game state for sending to client"""
+        return GRAPHICS[self.getStateCode() & STATE_MASK]
+
+    @staticmethod
+    def getGraphicForStateCode(stateCode: int) -> str:
+        """Returns the graphic of a packed state code (of any match) from the precomputed table"""
+        return GRAPHICS[stateCode & STATE_MASK]
+
+    def renderGameStateGraphic(self) -> str:
+        """Builds the graphic of the current game state from the robot graphics (see GRAPHICS for the lookup)"""
         graphic = ""
         if self.winner == 2:
             graphic = graphic + "===============================\n\n"
@@ -198,6 +238,23 @@ class GameState:
         return stringGraphic
 
 
+def buildGraphicsTable() -> list:
+    """Renders the graphic of every valid combination of hands, action, outcome and winner once, indexed by the
+    low bits of the packed state code (invalid codes and the initial state, with no action or outcome yet, map to the empty string)"""
+    graphics = [""] * (STATE_MASK + 1)
+    distinct = {}  # Many codes share a graphic (e.g. the outcome of a block is not drawn), so keep one copy each
+    for stateCode in range(STATE_MASK + 1):
+        action = stateCode >> 4 & 0xF
+        outcome = stateCode >> 8 & 0x7
+        if 0 < action < len(ACTIONS) and 0 < outcome < len(OUTCOMES) and (stateCode >> 11 & 0x3) < 3:
+            graphic = GameState.fromStateCode(stateCode).renderGameStateGraphic()
+            graphics[stateCode] = distinct.setdefault(graphic, graphic)
+    return graphics
+
+
+GRAPHICS = buildGraphicsTable()
+
+
 """
 gs = GameState()
 gs.updateGameState("1_A")
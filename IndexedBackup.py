@@ -0,0 +1,103 @@
+# _________________________________________
+# --------- INDEXED BACKUP CLASS ----------
+# =========================================
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+from GameState import GameState
+from Log import Log
+
+# ENCODING: The backup holds the log's arrays as raw bytes, followed by the term index, the latest state code of
+# every match and the snapshot's match states, and ends with a fixed-size trailer locating all of them. Every entry
+# is fixed-size, so the entry at index i sits at termsOffset + 8 * (i - snapshotIndex - 1) (and likewise for its
+# state code); nothing needs to be parsed to find it
+MAGIC = 0x52455345  # "RESE"
+VERSION = 1
+NO_STATE = 0xFFFFFFFF  # Snapshot state code of a log without a snapshot
+TRAILER = struct.Struct("<IBqqqIqIII")
+TRAILER_CHECKSUM = struct.Struct("<I")
+TERM_RUN = struct.Struct("<qqq")
+
+
+class IndexedBackup:
+    """Class writing a log to a backup file laid out for fast recovery, and reading one back by memory-mapping it:
+    the trailer restores the commit and append indexes, term index and match states at once, and each array is
+    copied out of the map in one step, so no entry is decoded into a game state until it is accessed"""
+
+    # ______________________________________
+    # --------- WRITING METHODS -----------
+    # ======================================
+    @staticmethod
+    def write(log: Log, backupPath: str, matches: dict = None) -> None:
+        """Writes the log (and the latest game state of every match, found from the log if not given) to a
+        temporary file and then swaps it in, so a crash mid-write leaves the old backup"""
+        termRuns = [(term, span[0], span[1]) for term, span in sorted(log.termIndex.items())]
+        if matches is None:
+            matches = log.getLatestGameStates()
+        matchCodes = array("I", [gameState.getStateCode() for gameState in matches.values()])
+        snapshotCodes = array("I", [gameState.getStateCode() for gameState in log.snapshotMatches.values()])
+        trailer = TRAILER.pack(MAGIC, VERSION, log.snapshotIndex, log.snapshotTerm, log.lastCommittedEntry,
+                               log.snapshotState.getStateCode() if log.snapshotState is not None else NO_STATE,
+                               len(log.terms), len(termRuns), len(matchCodes), len(snapshotCodes))
+        with open(backupPath + ".tmp", "wb") as backupFile:
+            backupFile.write(log.terms.tobytes())
+            backupFile.write(log.stateCodes.tobytes())
+            backupFile.write(b"".join(TERM_RUN.pack(*termRun) for termRun in termRuns))
+            backupFile.write(matchCodes.tobytes())
+            backupFile.write(snapshotCodes.tobytes())
+            backupFile.write(trailer + TRAILER_CHECKSUM.pack(zlib.crc32(trailer)))
+        os.replace(backupPath + ".tmp", backupPath)
+
+    # ______________________________________
+    # --------- READING METHODS -----------
+    # ======================================
+    @staticmethod
+    def isIndexedBackup(backupPath: str) -> bool:
+        """Returns whether a backup file ends with an intact trailer (older backups are jsonpickle text)"""
+        trailerSize = TRAILER.size + TRAILER_CHECKSUM.size
+        if os.path.getsize(backupPath) < trailerSize:
+            return False
+        with open(backupPath, "rb") as backupFile:
+            backupFile.seek(-trailerSize, os.SEEK_END)
+            tail = backupFile.read(trailerSize)
+        return (TRAILER.unpack_from(tail)[0] == MAGIC and
+                TRAILER_CHECKSUM.unpack_from(tail, TRAILER.size)[0] == zlib.crc32(tail[:TRAILER.size]))
+
+    @staticmethod
+    def read(backupPath: str) -> tuple:
+        """Returns the recovered log and the latest game state of every match, keyed by match ID"""
+        with open(backupPath, "rb") as backupFile, \
+                mmap.mmap(backupFile.fileno(), 0, access=mmap.ACCESS_READ) as backupMap, \
+                memoryview(backupMap) as backup:  # Slices of the view copy nothing until frombytes
+            trailerOffset = len(backup) - TRAILER.size - TRAILER_CHECKSUM.size
+            (magic, version, snapshotIndex, snapshotTerm, lastCommittedEntry, snapshotCode, entryCount, runCount,
+             matchCount, snapshotCount) = TRAILER.unpack_from(backup, trailerOffset)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not an indexed backup of version " + str(VERSION) + ": " + backupPath)
+            log = Log()
+            offset = 0
+            log.terms.frombytes(backup[offset:offset + entryCount * log.terms.itemsize])
+            offset += entryCount * log.terms.itemsize
+            log.stateCodes.frombytes(backup[offset:offset + entryCount * log.stateCodes.itemsize])
+            offset += entryCount * log.stateCodes.itemsize
+            for term, first, last in TERM_RUN.iter_unpack(backup[offset:offset + runCount * TERM_RUN.size]):
+                log.termIndex[term] = [first, last]
+            offset += runCount * TERM_RUN.size
+            matchCodes = array("I")
+            matchCodes.frombytes(backup[offset:offset + matchCount * matchCodes.itemsize])
+            offset += matchCount * matchCodes.itemsize
+            snapshotCodes = array("I")
+            snapshotCodes.frombytes(backup[offset:offset + snapshotCount * snapshotCodes.itemsize])
+        log.snapshotIndex = snapshotIndex
+        log.snapshotTerm = snapshotTerm
+        log.snapshotState = GameState.fromStateCode(snapshotCode) if snapshotCode != NO_STATE else None
+        log.snapshotMatches = {gameState.match: gameState for gameState in map(GameState.fromStateCode,
+                                                                               snapshotCodes)}
+        log.lastAppendedEntry = snapshotIndex + entryCount
+        log.nextIndex = log.lastAppendedEntry + 1
+        log.lastCommittedEntry = lastCommittedEntry
+        matches = {gameState.match: gameState for gameState in map(GameState.fromStateCode, matchCodes)}
+        return log, matches
@@ -0,0 +1,290 @@
+# _______________________________________
+# --------- LOAD GENERATOR CLASS --------
+# =======================================
+"""
+LOCAL RUN COMMAND (drives a running cluster as one of the clients of a config or shard file, writing the results
+as JSON):
+    python LoadGenerator.py config.txt --rate 500 --seconds 10 --output results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import queue
+import random
+import socket
+import time
+from threading import Thread
+
+from Client import Client, DELIMITER, MATCH_DELIMITER, RETRY_MARK, SEQUENCE_DELIMITER
+from GameState import MATCH_SHIFT
+from RoutingTable import RoutingTable
+from WireCodec import WireCodec
+
+OPEN_LOOP = "open"
+CLOSED_LOOP = "closed"
+BLOCK_KEYS = ["A", "S"]  # Blocks only, so no match ends (and stops answering) mid-run
+
+
+class LoadGenerator:
+    """Class driving a cluster with many virtual clients, each a Client playing its own match over one shared
+    socket, and recording the time from sending each action to receiving its committed outcome. Actions are sent
+    open-loop (on a fixed or Poisson schedule at a target rate, whether or not earlier ones have committed) or
+    closed-loop (each virtual client sending its next action once the previous one's outcome arrives)"""
+
+    # CONSTRUCTOR
+    def __init__(self, name: str, address: str, port: int, routingTable: RoutingTable, clientCount: int = 16,
+                 firstMatch: int = 0, mode: str = OPEN_LOOP, rate: float = 500, schedule: str = "fixed",
+                 thinkTime: float = 0.0, actionKeys: list = None, useLeaderCache: bool = True,
+                 leaderTimeout: float = 1.0, seed: int = None):
+        self.name = name
+        self.address = address
+        self.port = port
+        self.mode = mode
+        self.rate = rate  # Actions/sec over all virtual clients (open loop only)
+        self.schedule = schedule  # "fixed" spacing or "poisson" arrivals (open loop only)
+        self.thinkTime = thinkTime  # Seconds between an outcome and the next action (closed loop only)
+        self.actionKeys = actionKeys if actionKeys is not None else BLOCK_KEYS
+        self.random = random.Random(seed)
+
+        # NETWORKING ATTRIBUTES (servers send outcomes to the clients in their group, so bind as one of them)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((self.address, self.port))
+        self.socket.settimeout(0.1)
+
+        # VIRTUAL CLIENT ATTRIBUTES (keyed by match ID)
+        self.clients = {}
+        # Send times of each match's actions still waiting for their outcome, keyed by the action's sequence number
+        # (which the leader echoes in the outcome, so each outcome is timed against the action it answers)
+        self.sendTimes = {}
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # Silences "Starting..."
+            for matchID in range(firstMatch, firstMatch + clientCount):
+                self.clients[matchID] = Client(0, name, address, port, routingTable.clients, "", matchID,
+                                               routingTable, useLeaderCache, leaderTimeout, transport=self.socket)
+                self.sendTimes[matchID] = {}
+        self.ready = queue.Queue()  # Matches whose outcome arrived, so their next action can go (closed loop)
+
+        # RESULT ATTRIBUTES
+        self.latencies = []
+        self.sent = 0
+        self.duplicates = 0  # Outcomes with no action waiting
+        # Outcomes that name no action (committed by a later leader than the one that took it), which open loop
+        # cannot time as several actions of their match may be waiting
+        self.unattributed = 0
+        self.refused = 0  # Actions the leader would not apply (resent after a timeout when it may have applied them)
+        self.firstSendAt = None
+        self.lastOutcomeAt = None
+        self.running = False
+
+    # __________________________________
+    # --------- RUN METHODS ------------
+    # ==================================
+    def run(self, seconds: float, drainSeconds: float = 2.0) -> dict:
+        """Sends actions for the given number of seconds, waits drainSeconds for outstanding outcomes and returns
+        the results"""
+        self.running = True
+        receiver = Thread(target=self.listen, args=(), daemon=True)
+        receiver.start()
+        self.firstSendAt = time.perf_counter()
+        if self.mode == OPEN_LOOP:
+            self.sendOpenLoop(seconds)
+        else:
+            self.sendClosedLoop(seconds)
+        deadline = time.perf_counter() + drainSeconds
+        while time.perf_counter() < deadline and self.getOutstanding() > 0:
+            self.checkLeaderTimeouts()
+            time.sleep(0.01)
+        self.running = False
+        receiver.join()
+        self.socket.close()
+        return self.getResults(seconds)
+
+    def sendOpenLoop(self, seconds: float) -> None:
+        """Sends actions round-robin over the virtual clients on the schedule, whether or not earlier ones have
+        committed"""
+        matchIDs = list(self.clients)
+        due = self.firstSendAt
+        sample = 0
+        nextTimeoutCheck = due
+        while due < self.firstSendAt + seconds:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.sendAction(matchIDs[sample % len(matchIDs)])
+            sample += 1
+            if self.schedule == "poisson":
+                due += self.random.expovariate(self.rate)
+            else:
+                due = self.firstSendAt + sample / self.rate
+            if due >= nextTimeoutCheck:
+                self.checkLeaderTimeouts()
+                nextTimeoutCheck = due + 0.05
+
+    def sendClosedLoop(self, seconds: float) -> None:
+        """Keeps one action outstanding per virtual client, sending the next thinkTime after each outcome"""
+        for matchID in self.clients:
+            self.sendAction(matchID)
+        end = self.firstSendAt + seconds
+        while time.perf_counter() < end:
+            try:
+                readyAt, matchID = self.ready.get(timeout=0.05)
+            except queue.Empty:
+                self.checkLeaderTimeouts()
+                continue
+            delay = readyAt + self.thinkTime - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if time.perf_counter() < end:
+                self.sendAction(matchID)
+
+    def sendAction(self, matchID: int) -> None:
+        """Sends a virtual client's next action through its Client (to its cached leader, or probing every server)"""
+        client = self.clients[matchID]
+        message = client.getActionMessage(self.random.choice(self.actionKeys))
+        client.lastAction = message
+        sentAt = time.perf_counter()
+        self.sent += 1
+        client.sendAction(message)
+        self.sendTimes[matchID][client.nextSequence] = sentAt
+
+    def checkLeaderTimeouts(self) -> None:
+        """Lets every virtual client resend an action gone unanswered for its leader timeout"""
+        for client in self.clients.values():
+            client.checkLeaderTimeout()
+
+    # ______________________________________________
+    # --------- MESSAGE RECEIVING METHODS ----------
+    # ==============================================
+    def listen(self) -> None:
+        """Receives outcomes and redirects until the run ends"""
+        while self.running:
+            try:
+                data, address = self.socket.recvfrom(16384)
+            except socket.timeout:
+                continue
+            except OSError:
+                continue  # ICMP port unreachable from a server that is down
+            self.handleMessage(data, address)
+
+    def handleMessage(self, data: bytes, address) -> None:
+        """Times an outcome against the action whose sequence number it echoes, and passes redirects to every
+        virtual client (they share this socket, so a redirect cannot be told apart)"""
+        if data[:1] == b"G":
+            matchID = WireCodec.decodeClientState(data) >> MATCH_SHIFT  # A compact outcome
+            sequence = WireCodec.decodeClientSequence(data)
+        else:
+            splitData = data.decode("utf-8").split(DELIMITER)
+            if splitData[0] == "L":
+                for client in self.clients.values():
+                    client.hearRedirect(int(splitData[1]), address)
+                return
+            if splitData[0] == "J":
+                self.hearRejection(splitData[1])
+                return
+            matchID = int(splitData[2]) if len(splitData) > 2 else 0
+            sequence = int(splitData[3]) if len(splitData) > 3 else None
+        if matchID not in self.clients:
+            return  # Outcome of a match this generator is not playing
+        receivedAt = time.perf_counter()
+        client = self.clients[matchID]
+        client.leader = client.getProcessByAddress(address)
+        sendTimes = self.sendTimes[matchID]
+        if sequence is None and self.mode == CLOSED_LOOP and len(sendTimes) == 1:
+            sequence = next(iter(sendTimes))  # The one action a closed-loop client has waiting
+        if sequence is None or sequence == client.nextSequence:
+            client.pendingAction = None
+        if sequence is None:
+            self.unattributed += 1
+            return
+        if sequence not in sendTimes:
+            self.duplicates += 1
+            return
+        self.latencies.append(receivedAt - sendTimes.pop(sequence))
+        self.lastOutcomeAt = receivedAt
+        if self.mode == CLOSED_LOOP:
+            self.ready.put((receivedAt, matchID))
+
+    def hearRejection(self, message: str) -> None:
+        """Stops waiting on an action the leader refused (named by its match ID and sequence number), which will
+        never have an outcome"""
+        body, delimiter, sequence = message.rstrip(RETRY_MARK).partition(SEQUENCE_DELIMITER)
+        matchID = body.partition(MATCH_DELIMITER)[2]
+        if not (matchID.isdigit() and sequence.isdigit()) or int(matchID) not in self.clients:
+            return
+        matchID, sequence = int(matchID), int(sequence)
+        client = self.clients[matchID]
+        if client.isPendingAction(message):
+            client.pendingAction = None
+        if self.sendTimes[matchID].pop(sequence, None) is not None:
+            self.refused += 1
+            if self.mode == CLOSED_LOOP:
+                self.ready.put((time.perf_counter(), matchID))
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    def getOutstanding(self) -> int:
+        """Returns the number of actions sent that have not had an outcome yet"""
+        return sum(len(sendTimes) for sendTimes in self.sendTimes.values())
+
+    def getResults(self, seconds: float) -> dict:
+        """Returns the configuration, committed actions/sec and latency percentiles (in ms) of the run"""
+        committed = len(self.latencies)
+        elapsed = (self.lastOutcomeAt - self.firstSendAt) if committed > 0 else seconds
+        results = {"mode": self.mode, "schedule": self.schedule if self.mode == OPEN_LOOP else None,
+                   "offeredRate": self.rate if self.mode == OPEN_LOOP else None, "thinkTime": self.thinkTime,
+                   "clients": len(self.clients), "seconds": seconds, "sent": self.sent, "committed": committed,
+                   "unanswered": self.getOutstanding(), "duplicates": self.duplicates,
+                   "unattributed": self.unattributed, "refused": self.refused,
+                   "committedPerSecond": committed / elapsed,
+                   "datagramsPerAction": sum(client.datagramsSent for client in self.clients.values()) /
+                   max(self.sent, 1)}
+        ordered = sorted(self.latencies)
+        for label, fraction in [("p50", 0.5), ("p99", 0.99), ("p999", 0.999), ("max", 1.0)]:
+            results[label + "Ms"] = ordered[min(committed - 1, int(fraction * committed))] * 1000 \
+                if committed > 0 else None
+        results["meanMs"] = sum(ordered) / committed * 1000 if committed > 0 else None
+        return results
+
+    @staticmethod
+    def saveResults(results: dict, outputPath: str) -> None:
+        """Writes results as JSON, so runs can be compared"""
+        with open(outputPath, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+
+def parseArguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drives a cluster with virtual clients and reports latency")
+    parser.add_argument("configFile", help="config.txt or a shard file listing the servers and clients")
+    parser.add_argument("--section", default="$LOCAL$", help="section of a config file to read (default $LOCAL$)")
+    parser.add_argument("--client", default=None, help="client name to bind as (default the first client)")
+    parser.add_argument("--clients", type=int, default=16, help="virtual clients, one match each (default 16)")
+    parser.add_argument("--first-match", type=int, default=0, help="match ID of the first virtual client")
+    parser.add_argument("--mode", choices=[OPEN_LOOP, CLOSED_LOOP], default=OPEN_LOOP)
+    parser.add_argument("--rate", type=float, default=500, help="offered actions/sec (open loop)")
+    parser.add_argument("--schedule", choices=["fixed", "poisson"], default="fixed", help="open loop arrivals")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between outcome and action (closed loop)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--drain", type=float, default=2)
+    parser.add_argument("--no-leader-cache", action="store_true", help="send every action to every server")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="path to write the results to as JSON")
+    return parser.parse_args()
+
+
+# START-UP SCRIPT
+if __name__ == "__main__":
+    arguments = parseArguments()
+    with open(arguments.configFile, "r") as configFile:
+        isShardFile = "$SHARDS$" in configFile.read()
+    table = RoutingTable.fromShardFile(arguments.configFile) if isShardFile else \
+        RoutingTable.fromConfigFile(arguments.configFile, arguments.section)
+    clientName, clientAddress, clientPort = next(client for client in table.clients
+                                                 if arguments.client in [None, client[0]])
+    generator = LoadGenerator(clientName, clientAddress, clientPort, table, arguments.clients, arguments.first_match,
+                              arguments.mode, arguments.rate, arguments.schedule, arguments.think,
+                              useLeaderCache=not arguments.no_leader_cache, seed=arguments.seed)
+    runResults = generator.run(arguments.seconds, arguments.drain)
+    print(json.dumps(runResults, indent=2))
+    if arguments.output is not None:
+        LoadGenerator.saveResults(runResults, arguments.output)
@@ -1,29 +1,64 @@
 # _____________________________
 # --------- LOG CLASS ---------
 # =============================
-from GameState import GameState
+from array import array
+
+from GameState import GameState, MATCH_SHIFT
 
 
 class Log:
-    """Class representing a log as a series of game states in RESE robots"""
+    """Class representing a log as a series of game states in RESE robots, where the committed prefix up to
+    snapshotIndex may be compacted away into a snapshot of every match's game state. Entries are stored in
+    parallel arrays of terms and packed state codes rather than as game state objects"""
 
     # CONSTRUCTOR
     def __init__(self):
-        self.logList = []
+        # Entries after the snapshot, so the entry at index i is at position i - snapshotIndex - 1 of both arrays
+        self.terms = array("q")
+        self.stateCodes = array("I")  # Each game state packed by GameState.getStateCode
         self.lastAppendedEntry = -1  # Index of the most recently added entry to the log list
+        # First and last index of every term with entries after the snapshot, keyed by term (terms never decrease
+        # along the log, so each term covers one contiguous run of entries)
+        self.termIndex = {}
         self.lastCommittedEntry = -1  # Index of the most recently committed entry to the log list
         self.prevLogIndex = -1
         self.nextIndex = 0
 
+        # SNAPSHOT ATTRIBUTES
+        self.snapshotIndex = -1  # Index of the last entry folded into the snapshot
+        self.snapshotTerm = 0  # Term of the last entry folded into the snapshot
+        self.snapshotState = None  # Game state as of snapshotIndex
+        self.snapshotMatches = {}  # Latest game state of every match as of snapshotIndex, keyed by match ID
+
+    @property
+    def logList(self) -> list:
+        """The entries after the snapshot as (game state, term) tuples, decoded fresh on every access"""
+        return self.getSubLog(self.snapshotIndex + 1)
+
+    @logList.setter
+    def logList(self, entries) -> None:
+        """Replaces the entries after the snapshot (also lets backups from the list-based log decode)"""
+        for gameState, term in entries:
+            if not hasattr(gameState, "match"):
+                gameState.match = 0  # Backups written before matches were sharded hold a single match
+        stateCodes = array("I", [gameState.getStateCode() for gameState, term in entries])
+        self.terms = array("q", [term for gameState, term in entries])
+        self.stateCodes = stateCodes
+        if "snapshotIndex" in self.__dict__:  # A backup being decoded has its term index rebuilt once loaded
+            self.rebuildTermIndex()
+
     # _________________________________
     # --------- LOG METHODS -----------
     # =================================
     def appendEntryToLog(self, gamestate: GameState, term) -> None:
         """Adds a potential entry (i.e. client action and game response) to the local log list
         NOTE: This does not commit the entry!"""
-        self.logList.append((gamestate, term))
+        stateCode = gamestate.getStateCode()  # Packed first, so a state that cannot be packed leaves no term behind
+        self.terms.append(term)
+        self.stateCodes.append(stateCode)
         self.lastAppendedEntry += 1
         self.nextIndex += 1
+        self.indexTerm(term, self.lastAppendedEntry)
 
     def commitEntryToLog(self) -> None:
         """Adds a confirmed entry (i.e. client action and game response) to the local log list
@@ -32,41 +67,214 @@ class Log:
         # If our item is committed this index gets incremented, this also only gets incremented when the leader
         # says so
         self.lastCommittedEntry += 1
+
+    def commitThroughIndex(self, index) -> None:
+        """Commits every entry up to index in one step (never moving the commit index backwards)
+        NOTE: This is a commit and cannot be rolled back!"""
+        self.lastCommittedEntry = max(self.lastCommittedEntry, min(index, self.lastAppendedEntry))
     
     def appendEntriesToLog(self, partialLeaderLog):
         """ appends the missing entries into log"""
         for item in partialLeaderLog:
             self.appendEntryToLog(item[0], item[1])
-        self.lastCommittedEntry = len(self.logList)
-        self.lastAppendedEntry = len(self.logList)
+        self.lastCommittedEntry = len(self.terms)
+        self.lastAppendedEntry = len(self.terms)
+
+    def appendEntriesAfterIndex(self, prevLogIndex, entries) -> int:
+        """Appends the leader's entries following prevLogIndex, first dropping any local suffix that conflicts
+        with them (entries that already match are kept as they are). Returns the index of the first entry
+        actually written, which is one past the end of the log when nothing changed"""
+        firstWritten = prevLogIndex + 1 + len(entries)
+        for offset in range(len(entries)):
+            index = prevLogIndex + 1 + offset
+            if index <= self.snapshotIndex:
+                continue  # Already committed and compacted into the snapshot
+            position = index - self.snapshotIndex - 1
+            if position < len(self.terms):
+                if self.terms[position] == entries[offset][1]:
+                    continue
+                self.removeItemsFromIndextoEnd(index)
+            firstWritten = min(firstWritten, index)
+            self.terms.append(entries[offset][1])
+            self.stateCodes.append(entries[offset][0].getStateCode())
+            self.indexTerm(entries[offset][1], index)
+        self.lastAppendedEntry = self.snapshotIndex + len(self.terms)
+        self.nextIndex = self.lastAppendedEntry + 1
+        return firstWritten
+
+    def getSubLog(self, startIndex, endIndex=None):
+        """ returns this list from the startIndex through endIndex, or to the end of the list (startIndex must follow
+        the snapshot)"""
+        position = max(startIndex - self.snapshotIndex - 1, 0)
+        endPosition = endIndex - self.snapshotIndex if endIndex is not None else len(self.terms)
+        return [(GameState.fromStateCode(stateCode), term)
+                for stateCode, term in zip(self.stateCodes[position:endPosition], self.terms[position:endPosition])]
+
+    def getEntry(self, index):
+        """ returns the (game state, term) entry at a given index that follows the snapshot """
+        position = index - self.snapshotIndex - 1
+        return GameState.fromStateCode(self.stateCodes[position]), self.terms[position]
+
+    def getStateCodeAtIndex(self, index) -> int:
+        """ returns the packed state code of the entry at a given index that follows the snapshot """
+        return self.stateCodes[index - self.snapshotIndex - 1]
+
+    def getLatestGameState(self):
+        """ returns the game state of the newest entry (or of the snapshot), or None for an empty log """
+        if len(self.stateCodes) > 0:
+            return GameState.fromStateCode(self.stateCodes[-1])
+        return self.snapshotState
 
-    def getSubLog(self, startIndex):
-        """ returns this list from the startIndex to the end of the list"""
-        return self.logList[startIndex::]
+    def getLatestGameStates(self) -> dict:
+        """ returns the game state of the newest entry of every match, keyed by match ID """
+        latestCodes = {}
+        for stateCode in self.stateCodes:
+            latestCodes[stateCode >> MATCH_SHIFT] = stateCode
+        matches = dict(self.snapshotMatches)
+        for match, stateCode in latestCodes.items():
+            matches[match] = GameState.fromStateCode(stateCode)
+        return matches
+
+    def getCommittedStateCodes(self) -> dict:
+        """ returns the packed state code of the newest committed entry of every match, keyed by match ID """
+        committedCodes = {match: gameState.getStateCode() for match, gameState in self.snapshotMatches.items()}
+        for stateCode in self.stateCodes[:max(self.lastCommittedEntry - self.snapshotIndex, 0)]:
+            committedCodes[stateCode >> MATCH_SHIFT] = stateCode
+        return committedCodes
 
     def removeItemsFromIndextoEnd(self, startIndex):
-        """ removes all items from the index to the end of the list"""
-        for i in range(startIndex, len(self.logList)):
-            self.logList.__delitem__(i)
+        """ removes all items from the index to the end of the list (startIndex must follow the snapshot)"""
+        position = max(startIndex - self.snapshotIndex - 1, 0)
+        del self.terms[position:]
+        del self.stateCodes[position:]
+        self.lastAppendedEntry = self.snapshotIndex + len(self.terms)
+        self.nextIndex = self.lastAppendedEntry + 1
+        for term, span in list(self.termIndex.items()):
+            if span[0] > self.lastAppendedEntry:
+                del self.termIndex[term]
+            elif span[1] > self.lastAppendedEntry:
+                span[1] = self.lastAppendedEntry
 
     def getTermAtIndex(self, index):
         """ returns the term of the entry at a given index """
         retVal = 0
-        if len(self.logList) > 0 and index < len(self.logList):
-            entryAtIndex = self.logList[index]
-            retVal = entryAtIndex[1]
+        if index == self.snapshotIndex:
+            retVal = self.snapshotTerm
+        elif self.snapshotIndex < index <= self.lastAppendedEntry:
+            retVal = self.terms[index - self.snapshotIndex - 1]
         return retVal
 
+    # ________________________________________
+    # --------- TERM INDEX METHODS -----------
+    # ========================================
+    def indexTerm(self, term, index) -> None:
+        """Records that the entry at index (the newest in the log) belongs to term"""
+        span = self.termIndex.get(term)
+        if span is None:
+            self.termIndex[term] = [index, index]
+        else:
+            span[1] = index
+
+    def rebuildTermIndex(self) -> None:
+        """Recomputes the term index from the entries after the snapshot (e.g. after loading an old backup)"""
+        self.termIndex = {}
+        for position in range(len(self.terms)):
+            self.indexTerm(self.terms[position], self.snapshotIndex + 1 + position)
+
+    def getLastIndexOfTerm(self, term) -> int:
+        """ returns the index of the last entry of a term after the snapshot, or -1 if the log holds none """
+        span = self.termIndex.get(term)
+        return span[1] if span is not None else -1
+
+    def getConflictHint(self, prevLogIndex) -> tuple:
+        """ returns the (conflict term, conflict index) a follower answers an inconsistent AppendEntries with:
+        the term of its entry at prevLogIndex and the first index of that term, or no term (-1) and one past its
+        last entry when its log is too short """
+        if prevLogIndex > self.lastAppendedEntry:
+            return -1, self.lastAppendedEntry + 1
+        conflictTerm = self.getTermAtIndex(prevLogIndex)
+        span = self.termIndex.get(conflictTerm)
+        return conflictTerm, span[0] if span is not None else prevLogIndex
+
+    def getNextIndexAfterConflict(self, conflictTerm, conflictIndex) -> int:
+        """ returns the index a leader resends from after a follower's conflict hint, skipping the follower's
+        whole conflicting term: one past the leader's own last entry of that term if it has one, otherwise the
+        first index of the follower's conflicting term """
+        if conflictTerm >= 0:
+            lastIndex = self.getLastIndexOfTerm(conflictTerm)
+            if lastIndex >= 0:
+                return lastIndex + 1
+        return conflictIndex
+
+    # ______________________________________
+    # --------- SNAPSHOT METHODS -----------
+    # ======================================
+    def compactToCommitted(self) -> None:
+        """Folds every committed entry into the snapshot and drops them from the log list"""
+        compactIndex = min(self.lastCommittedEntry, self.lastAppendedEntry)
+        if compactIndex <= self.snapshotIndex:
+            return
+        gameState, term = self.getEntry(compactIndex)
+        latestCodes = {}
+        for stateCode in self.stateCodes[:compactIndex - self.snapshotIndex]:
+            latestCodes[stateCode >> MATCH_SHIFT] = stateCode
+        for match, stateCode in latestCodes.items():
+            self.snapshotMatches[match] = GameState.fromStateCode(stateCode)
+        del self.terms[:compactIndex - self.snapshotIndex]
+        del self.stateCodes[:compactIndex - self.snapshotIndex]
+        self.snapshotState = gameState
+        self.snapshotTerm = term
+        self.snapshotIndex = compactIndex
+        self.dropTermIndexThrough(compactIndex)
+
+    def installSnapshot(self, snapshotIndex: int, snapshotTerm: int, gameState: GameState,
+                        matchStates: list = None) -> None:
+        """Replaces the log up to snapshotIndex with a leader's snapshot (gameState and the latest state of every
+        match), keeping any later entries that agree with it"""
+        if snapshotIndex <= self.snapshotIndex:
+            return
+        if snapshotIndex <= self.lastAppendedEntry and self.getTermAtIndex(snapshotIndex) == snapshotTerm:
+            del self.terms[:snapshotIndex - self.snapshotIndex]
+            del self.stateCodes[:snapshotIndex - self.snapshotIndex]
+        else:
+            del self.terms[:]
+            del self.stateCodes[:]
+        self.snapshotIndex = snapshotIndex
+        self.snapshotTerm = snapshotTerm
+        self.snapshotState = gameState
+        if matchStates is None:
+            matchStates = [gameState]
+        self.snapshotMatches = {matchState.match: matchState for matchState in matchStates}
+        self.lastAppendedEntry = self.snapshotIndex + len(self.terms)
+        self.nextIndex = self.lastAppendedEntry + 1
+        self.lastCommittedEntry = max(self.lastCommittedEntry, snapshotIndex)
+        if len(self.terms) == 0:
+            self.termIndex = {}
+        self.dropTermIndexThrough(snapshotIndex)
+
+    def dropTermIndexThrough(self, snapshotIndex) -> None:
+        """Removes entries up to snapshotIndex, which were folded into the snapshot, from the term index"""
+        for term, span in list(self.termIndex.items()):
+            if span[1] <= snapshotIndex:
+                del self.termIndex[term]
+            elif span[0] <= snapshotIndex:
+                span[0] = snapshotIndex + 1
+
     def printLogEntries(self):
         """Prints all the committed log entries"""
-        if len(self.logList) == 0:
+        if self.snapshotIndex >= 0:
+            print("\n============ SNAPSHOT ============")
+            print("Log Entries #0-" + str(self.snapshotIndex))
+            print("Term #" + str(self.snapshotTerm))
+            self.snapshotState.printGameState()
+        if len(self.terms) == 0:
             print("Log is empty!")
         else:
-            for i in range(len(self.logList)):
+            for i in range(self.snapshotIndex + 1, self.lastAppendedEntry + 1):
                 print("\n============ LOG ENTRY ============")
                 print("Log Entry #" + str(i))
-                print("Term #" + str(self.logList[i][1]))
-                self.logList[i][0].printGameState()
+                print("Term #" + str(self.getEntry(i)[1]))
+                self.getEntry(i)[0].printGameState()
                 if i <= self.lastCommittedEntry:
                     print("STATUS IN LOG: Committed")
                 else:
@@ -0,0 +1,136 @@
+# _________________________________
+# --------- METRICS CLASSES -------
+# =================================
+"""
+SCRAPE COMMAND (for a server started with a metrics port):
+    curl http://127.0.0.1:<metrics port>/metrics
+"""
+import math
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+# Upper bounds (in seconds) of the histogram buckets: powers of two from about 1 microsecond to about 16 seconds
+SMALLEST_EXPONENT = -20
+BUCKET_BOUNDS = [2.0 ** exponent for exponent in range(SMALLEST_EXPONENT, 5)]
+
+
+class Histogram:
+    """Class counting observed durations into fixed power-of-two buckets, so an observation is one exponent
+    extraction and three additions"""
+
+    # CONSTRUCTOR
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)  # The last bucket counts observations past every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # value < 2 ** exponent, so the exponent picks the bucket (clamped to the first and the overflow bucket)
+        bucket = math.frexp(value)[1] - SMALLEST_EXPONENT
+        self.buckets[0 if bucket < 0 else bucket if bucket < len(BUCKET_BOUNDS) else len(BUCKET_BOUNDS)] += 1
+        self.count += 1
+        self.sum += value
+
+    def getQuantile(self, fraction: float) -> float:
+        """Returns the upper bound of the bucket holding the given fraction of observations (0 if there are none)"""
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in range(len(BUCKET_BOUNDS)):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return BUCKET_BOUNDS[bucket]
+        return math.inf
+
+
+class MetricsRegistry:
+    """Class holding a server's counters (optionally split by a label, e.g. message type), duration histograms and
+    gauges. Counters and histograms are plain additions made on the thread doing the work without locking (hot
+    paths hold on to the counter or histogram itself to skip the lookup by name); gauges are functions only called
+    when the metrics are read, so they cost nothing on the hot paths"""
+
+    # CONSTRUCTOR
+    def __init__(self):
+        self.counters = defaultdict(lambda: defaultdict(int))  # Counts by label, keyed by counter name
+        self.histograms = defaultdict(Histogram)
+        self.gauges = {}  # Function returning the current value, keyed by gauge name
+
+    # _____________________________________
+    # --------- RECORDING METHODS ---------
+    # =====================================
+    def increment(self, name: str, label: str = "", amount: int = 1) -> None:
+        self.counters[name][label] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.histograms[name].observe(seconds)
+
+    def getCounter(self, name: str) -> defaultdict:
+        """Returns a counter's counts by label, to be incremented in place"""
+        return self.counters[name]
+
+    def getHistogram(self, name: str) -> Histogram:
+        return self.histograms[name]
+
+    def registerGauge(self, name: str, function) -> None:
+        self.gauges[name] = function
+
+    # ___________________________________
+    # --------- READING METHODS ---------
+    # ===================================
+    def formatText(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        lines = []
+        for name, counts in sorted(self.counters.items()):
+            lines.append("# TYPE " + name + " counter")
+            for label, count in sorted(dict(counts).items()):
+                lines.append(name + ('{type="' + label + '"}' if label != "" else "") + " " + str(count))
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append("# TYPE " + name + " histogram")
+            buckets = list(histogram.buckets)
+            cumulative = 0
+            for bound, bucketCount in zip(BUCKET_BOUNDS, buckets):
+                cumulative += bucketCount
+                lines.append(name + '_bucket{le="' + repr(bound) + '"} ' + str(cumulative))
+            lines.append(name + '_bucket{le="+Inf"} ' + str(sum(buckets)))
+            lines.append(name + "_sum " + repr(histogram.sum))
+            lines.append(name + "_count " + str(histogram.count))
+        for name, function in sorted(self.gauges.items()):
+            lines.append("# TYPE " + name + " gauge")
+            lines.append(name + " " + str(function()))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsEndpoint:
+    """Class serving a registry's metrics over HTTP (GET /metrics) from its own daemon thread, so a scrape never
+    waits on or holds up a server's receive thread"""
+
+    # CONSTRUCTOR
+    def __init__(self, registry: MetricsRegistry, address: str, port: int):
+        self.registry = registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(handler) -> None:
+                if handler.path.split("?")[0] not in ["/", "/metrics"]:
+                    handler.send_error(404)
+                    return
+                body = registry.formatText().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args) -> None:
+                pass  # Keep scrapes out of the server's console output
+
+        self.httpServer = ThreadingHTTPServer((address, port), MetricsHandler)
+        self.httpServer.daemon_threads = True
+        self.port = self.httpServer.server_address[1]
+        self.thread = Thread(target=self.httpServer.serve_forever, args=(), daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
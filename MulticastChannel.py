@@ -0,0 +1,43 @@
+# __________________________________________
+# --------- MULTICAST CHANNEL CLASS --------
+# ==========================================
+import socket
+
+
+class MulticastChannel:
+    """Class setting up the sockets of an IP multicast group shared by a Raft group's servers and learners, so a
+    leader's broadcasts cost one sendto whatever the group's size. Broadcasts are sent from a server's own unicast
+    socket (so receivers still see which server sent them) and received on a second socket joined to the group;
+    everything else (acks, votes, client traffic) stays unicast"""
+
+    # CONSTRUCTOR
+    def __init__(self, groupAddress: str, groupPort: int, interface: str = "127.0.0.1", ttl: int = 1):
+        self.groupAddress = groupAddress  # e.g. 239.255.0.1 (administratively scoped)
+        self.groupPort = groupPort
+        self.interface = interface  # Local interface to send and join on (loopback for a local cluster)
+        self.ttl = ttl  # Routers a broadcast may cross (1 keeps it on the local network)
+
+    # ____________________________________
+    # --------- SOCKET METHODS -----------
+    # ====================================
+    def configureSender(self, unicastSocket: socket.socket) -> None:
+        """Lets a server's unicast socket send to the group, looping broadcasts back to servers on the same host"""
+        unicastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.interface))
+        unicastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+        unicastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+    def openReceiver(self) -> socket.socket:
+        """Returns a socket joined to the group, bound to the group port alongside every other member on this
+        host (each gets its own copy of every broadcast)"""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        receiver.bind(("", self.groupPort))
+        receiver.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                            socket.inet_aton(self.groupAddress) + socket.inet_aton(self.interface))
+        return receiver
+
+    def getAddress(self) -> tuple:
+        """Returns the (ip, port) broadcasts are sent to"""
+        return self.groupAddress, self.groupPort
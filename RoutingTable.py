@@ -0,0 +1,88 @@
+# _______________________________________
+# --------- ROUTING TABLE CLASS ---------
+# =======================================
+"""
+SHARD FILE FORMAT (one process per line, after a $SHARDS$ line, until a blank line):
+    <Raft Group ID> <Process ID> <Process Name> <IP> <Port> <Backup Path>
+where clients, which take actions in matches on every group, use '-' as their Raft group ID
+"""
+
+SECTION = "$SHARDS$"
+NO_GROUP = "-"
+
+
+class RoutingTable:
+    """Class mapping match IDs onto the independent Raft groups that host them, so a client can send a match's
+    actions to that group's servers only. Matches are spread over the groups by match ID modulo the group count"""
+
+    # CONSTRUCTOR
+    def __init__(self, groups: dict = None, clients: list = None):
+        self.groups = {}  # Networking tuples (name, ip, port) of every server, keyed by Raft group ID
+        self.processes = {}  # (Raft group ID, process ID, name, ip, port, backup path) of every server and client
+        self.clients = clients if clients is not None else []
+        for groupID, servers in (groups or {}).items():
+            self.groups[groupID] = list(servers)
+
+    # _____________________________________
+    # --------- ROUTING METHODS -----------
+    # =====================================
+    def getGroupID(self, matchID: int) -> int:
+        """Returns the ID of the Raft group hosting a match"""
+        groupIDs = sorted(self.groups)
+        return groupIDs[matchID % len(groupIDs)]
+
+    def getServers(self, matchID: int) -> list:
+        """Returns the networking tuples of the servers in the Raft group hosting a match"""
+        return self.groups[self.getGroupID(matchID)]
+
+    def getGroupMembers(self, groupID: int, name: str) -> list:
+        """Returns the group a server of the given Raft group is started with: the other servers of its Raft group
+        and every client"""
+        return [server for server in self.groups[groupID] if server[0] != name] + self.clients
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    def addProcess(self, groupID, processID: int, name: str, address: str, port: int, backupPath: str) -> None:
+        """Adds a server (or learner) to a Raft group, or a client when the group ID is '-'"""
+        if groupID == NO_GROUP:
+            self.clients.append((name, address, port))
+        else:
+            self.groups.setdefault(int(groupID), []).append((name, address, port))
+        self.processes[(groupID, processID)] = (groupID, processID, name, address, port, backupPath)
+
+    @classmethod
+    def fromShardFile(cls, shardFilePath: str) -> "RoutingTable":
+        """Reads the $SHARDS$ section of a shard file into a routing table"""
+        with open(shardFilePath, "r") as shardFile:
+            shardLines = shardFile.read().split("\n")
+        routingTable = cls()
+        inSection = False
+        for line in shardLines:
+            if line.strip() == SECTION:
+                inSection = True
+            elif inSection and line.strip() == "":
+                break
+            elif inSection and not line.startswith("#"):
+                groupID, processID, name, address, port, backupPath = line.split(" ")
+                routingTable.addProcess(groupID if groupID == NO_GROUP else int(groupID), int(processID), name,
+                                        address, int(port), backupPath)
+        return routingTable
+
+    @classmethod
+    def fromConfigFile(cls, configFilePath: str, section: str = "$LOCAL$") -> "RoutingTable":
+        """Reads a section of a configuration file (config.txt) into a routing table of one Raft group"""
+        with open(configFilePath, "r") as configFile:
+            configLines = configFile.read().split("\n")
+        routingTable = cls()
+        inSection = False
+        for line in configLines:
+            if line.strip() == section:
+                inSection = True
+            elif inSection and line.strip() == "":
+                break
+            elif inSection and not line.startswith("#"):
+                processID, name, publicIP, port, privateIP, backupPath = line.split(" ")
+                routingTable.addProcess(0 if name[0] in ("S", "L") else NO_GROUP, int(processID), name, publicIP,
+                                        int(port), backupPath)
+        return routingTable
@@ -1,29 +1,54 @@
 # _________________________________
 # --------- SERVER CLASS ---------
 # =================================
-import copy
 import math
+import os
 import random
 import socket
 import time
-from threading import Thread
+from threading import Event, Lock, Thread
 
 import jsonpickle
 
 from ElectionMessage import ElectionMessage
 from FollowerMessage import FollowerMessage
-from GameState import GameState
+from GameState import GameState, ACTIONS, MATCH_LIMIT, MATCH_SHIFT
+from IndexedBackup import IndexedBackup
 from LeaderMessage import LeaderMessage
 from Log import Log
+from Metrics import MetricsRegistry, MetricsEndpoint
+from MulticastChannel import MulticastChannel
+from ServerPipeline import ServerPipeline
+from SnapshotMessage import SnapshotMessage
+from TimerScheduler import TimerScheduler
+from WireCodec import WireCodec, FramedMessage, MAX_DATAGRAM
+from WriteAheadLog import WriteAheadLog
 
 DELIMITER = "$"
+MATCH_DELIMITER = "@"  # Separates a client action from the ID of the match it is played in (e.g. "0_Q@12")
+SEQUENCE_DELIMITER = "#"  # Separates a client action from the client's sequence number for it (e.g. "0_Q@12#7")
+RETRY_MARK = "!"  # Ends a client action resent after the client's leader timeout (e.g. "0_Q@12#7!")
+REJECTED = "J"  # Answers a client action the leader will not apply ('J$<action message>')
+CLOCK_DRIFT_BOUND = 0.1  # Fraction a leader's lease is cut short by to cover clocks running at different rates
+# ADAPTIVE TIMING: the heartbeat interval is HEARTBEAT_RTOS round-trip timeouts (smoothed RTT plus four deviations,
+# as TCP computes it), no shorter than MIN_ADAPTIVE_HEARTBEAT, and election timeouts span ELECTION_TIMEOUT_BEATS of it
+HEARTBEAT_RTOS = 4
+MIN_ADAPTIVE_HEARTBEAT = 0.01
+ELECTION_TIMEOUT_BEATS = (10, 20)
 
 
 class Server:
     """Class representing a server node in the Raft consensus project"""
 
     # CONSTRUCTOR
-    def __init__(self, nodeID: int, name: str, address: str, port: int, group: list, backupPath: str):
+    def __init__(self, nodeID: int, name: str, address: str, port: int, group: list, backupPath: str,
+                 useBinaryCodec: bool = True, useWriteAheadLog: bool = True, snapshotThreshold: int = 1000,
+                 batchWindow: float = 0.005, batchSize: int = 64, transport=None, metricsPort: int = None,
+                 compactClientStates: bool = False, useIndexedBackup: bool = True, chunkEntries: int = None,
+                 replicationWindow: int = 8, retransmitTimeout: float = 0.1, leaseDuration: float = None,
+                 isLearner: bool = False, multicastChannel: MulticastChannel = None,
+                 electionTimeoutMs: tuple = (5000, 15000), heartbeatMs: float = 3000, preVote: bool = True,
+                 adaptiveTiming: bool = False, usePipeline: bool = True):
         self.name = name
         self.id = nodeID
         self.backupPath = backupPath
@@ -32,40 +57,192 @@ class Server:
         # NETWORKING ATTRIBUTES
         self.address = address
         self.port = port
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind((self.address, self.port))
+        self.socket = None
+        if transport is None:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((self.address, self.port))
+        # Anything with sendto(bytes, (ip, port)), replaced by engines that own the socket (or given, e.g. by the
+        # simulator's in-memory network, in place of a socket)
+        self.transport = transport if transport is not None else self.socket
+        # Leader broadcasts go to the multicast group in one send when there is one, and are heard on a second socket
+        self.multicastAddress = multicastChannel.getAddress() if multicastChannel is not None else None
+        self.multicastSocket = None
+        if multicastChannel is not None and transport is None:
+            multicastChannel.configureSender(self.socket)
+            self.multicastSocket = multicastChannel.openReceiver()
         self.group = group
+        # Encode outgoing Raft messages as compact binary (incoming messages of either encoding are always accepted)
+        self.useBinaryCodec = useBinaryCodec
+        # Hand Raft messages (except snapshots, whose match states the receiver keeps) to the transport as objects
+        # instead of encoding them, which only an in-memory transport such as the simulator's can carry
+        self.passMessageObjects = False
+        # Send clients each committed state's packed code to render locally instead of its outcome and graphic
+        self.compactClientStates = compactClientStates
 
         # THREAD ATTRIBUTES (Initialized with boot-up script)
         self.clusterReady = False
+        self.clusterReadyEvent = Event()  # Set once the cluster is ready, waking the threads waiting for it
+
+        # READINESS BARRIER ATTRIBUTES
+        self.readyPeers = set()  # Names of the servers and learners heard from since joining the barrier
+        self.joinedBarrierAt = None
+        self.barrierTimer = None
+        self.barrierRetry = 0.05  # Seconds between announcements to peers not heard from yet
+        # Seconds after which a majority of voters is enough to pass, so one server that is down holds no one up
+        self.barrierTimeout = 2.0
+        self.foundRunningCluster = False  # Whether a peer already past the barrier answered
         self.receiverThread = None
-        self.senderThread = None
+        self.multicastThread = None
         self.clockThread = None
         self.testCommandThread = None
+        # Run the threaded engine as a pipeline of bounded stages (receive, protocol, notify) instead of handling
+        # every datagram on the receiver thread while timers fire on the clock thread
+        self.usePipeline = usePipeline
+        self.pipeline = None
+        # Without a pipeline, held by the receiver, clock and test command threads while they run a handler, timer
+        # or command, so no two of them ever touch the server's state at once
+        self.stateLock = Lock()
         self.isFailed = False
 
         # LEADER MANAGEMENT ATTRIBUTES
         self.isFollower = True
+        # A learner (named 'Learner_<id>') is replicated to and serves reads, but never votes, runs for leader or
+        # counts toward a majority, so adding learners adds read capacity without slowing commits
+        self.isLearner = isLearner
         self.currentLeader = -1
-        self.timeout = self.getRandomTimeout(5, 15)  # TODO - Tune upper and lower bound of timeout to AWS cluster
-        self.clock = self.timeout
+        # Bounds in seconds this node's election timeout is drawn from
+        self.electionTimeoutRange = (electionTimeoutMs[0] / 1000, electionTimeoutMs[1] / 1000)
+        self.timeout = self.getRandomTimeout(*self.electionTimeoutRange)
         self.isLeader = False
-        self.heartRate = 3  # TODO - Arbitrary
+        self.heartRate = heartbeatMs / 1000  # Seconds between a leader's heartbeats
+        # Ask for pre-votes before starting an election, so a node that cannot win (e.g. one rejoining after a
+        # partition) never bumps the term and unseats a healthy leader
+        self.preVote = preVote
+        self.preVoteTerm = None  # Term the pre-vote under way proposes (None while there is none)
+        self.preVotesReceived = 0
+        # Derive the heartbeat interval (as leader, from confirmation round trips) and the election timeout bounds
+        # (as follower, from the leader's heartbeat interval) instead of keeping the configured ones
+        self.adaptiveTiming = adaptiveTiming
+        self.maxHeartRate = self.heartRate  # Adaptive heartbeats are never slower than the configured ones
+        self.smoothedRoundTrip = None
+        self.roundTripVariation = None
+        # Voter a leader is handing leadership to (None while there is no transfer): until it wins or the transfer
+        # times out, client actions are redirected to it, and it is sent TimeoutNow once it holds the whole log
+        self.transferTarget = None
+        self.transferTimer = None
+        self.timeoutNowSent = False
+        self.redirectsSent = 0  # Client actions answered with the leader's ID instead of being handled
+
+        # TIMER ATTRIBUTES (Deadlines in seconds on the scheduler's monotonic clock, run by the clock thread)
+        self.scheduler = TimerScheduler()
+        self.electionTimer = None
+        self.heartbeatTimer = None
         self.isCandidate = False
-        self.acksReceived = 0
+        # Per-follower replication progress, keyed by server name (reset each time this node becomes leader)
+        self.nextIndex = {}  # Index of the next entry to send to each follower
+        self.lastReplicatedAt = {}  # Scheduler time of the last AppendEntries (or snapshot) sent to each follower
+        self.matchIndex = {}  # Index of the highest entry known to be replicated on each follower
+        # Index of the highest entry this leader knows is durable in its own write-ahead log, which is what it counts
+        # toward a majority (as followers only ack entries once they are durable)
+        self.durableIndex = -1
+
+        # CATCH-UP ATTRIBUTES (entries and snapshots are sent in chunks that each fit in one datagram, with at most
+        # replicationWindow chunks unacknowledged per follower; each ack lets another chunk go out)
+        self.chunkEntries = chunkEntries if chunkEntries is not None else WireCodec.getMaxEntries(useBinaryCodec)
+        self.chunkMatchStates = WireCodec.getMaxMatchStates(useBinaryCodec)
+        self.replicationWindow = replicationWindow
+        self.chunksInFlight = {}  # Chunks sent to each follower and not yet acknowledged
+        # Index each follower was last sent back to after reporting a gap, so the nacks of the chunks that were
+        # already in flight past the same gap don't each resend the window again
+        self.rewoundTo = {}
+        # [snapshot index, match states acked, match states sent, offset last resent from] of each follower being
+        # sent the snapshot
+        self.snapshotTransfers = {}
+        # Seconds without an ack from a follower still catching up before its window is resent from where it stood,
+        # doubling on every retry that brings no progress (up to the heart rate)
+        self.retransmitTimeout = retransmitTimeout
+        self.retransmitTimers = {}  # [timer, progress when armed, current timeout] of each follower catching up
+        self.snapshotMatchList = (-1, [])  # (snapshot index, its match states in the order they are sent)
+        # [(snapshot index, snapshot term), match states received so far, count held from the first on] of the
+        # snapshot a follower is receiving
+        self.pendingSnapshot = None
         # TODO - Need to check if we receive something from a server while election and check its term vs ours
-        self.prevLogTerm = 0
         self.currentTerm = 0
         self.hasVoted = False
 
         self.votesReceived = 0
-        # len group - 2 (client nodes) / 2(to get the majority ... rounded up
-        self.majority = math.ceil(len(group) / 2)
+        # Majority of the voting servers (clients and learners don't count)
+        self.majority = (len([process for process in group if self.isVoter(process)]) + 1) // 2 + 1
         # print("Majority" + str(self.majority))
 
         # GAME STATE & LOG ATTRIBUTES
-        self.currentGameState = GameState()
+        self.matches = {}  # Latest game state of every match hosted by this Raft group, keyed by match ID
         self.log = Log()
+        # Append-only segments beside the backup file (None falls back to rewriting the whole backup per commit)
+        self.writeAheadLog = None
+        if useWriteAheadLog:
+            self.writeAheadLog = WriteAheadLog(os.path.splitext(self.backupPath)[0] + "_WAL")
+        # Without a write-ahead log, rewrite the backup in the memory-mappable indexed format (or as jsonpickle)
+        self.useIndexedBackup = useIndexedBackup
+        # Committed entries beyond the last snapshot that trigger compaction into a new snapshot
+        self.snapshotThreshold = snapshotThreshold
+
+        # READ ATTRIBUTES (read queries are answered from the committed state of their match without a log entry,
+        # once a round of leadership confirmations sent after they arrived is acked by a majority, or at once while
+        # the leader holds a lease)
+        self.committedStateCodes = {}  # Packed state code of every match's newest committed entry, keyed by match ID
+        # Seconds after a confirmation round is sent that no other leader can be elected, as followers that acked it
+        # refuse to vote for that long after hearing from their leader (None disables leases and that refusal; it
+        # must be shorter than the election timeout on every server)
+        self.leaseDuration = leaseDuration
+        self.leaseExpiresAt = -math.inf
+        self.lastLeaderContactAt = -math.inf
+        # Scheduler time this node last held every entry its leader had committed (the leader always does)
+        self.caughtUpAt = -math.inf
+        # (min commit index, match ID, read ID, client address) of every replica read waiting for its commit index
+        self.fencedReads = []
+        self.readRound = 0  # Number of the latest confirmation round started
+        self.confirmedReadRound = 0  # Number of the latest confirmation round acked by a majority
+        self.readRoundAcks = {}  # Followers that acked each unconfirmed round, keyed by round
+        self.readRoundSentAt = {}  # Scheduler time each unconfirmed round was sent, keyed by round
+        # (round, read index, match ID, read ID, client address, arrival time) of every read awaiting confirmation
+        self.pendingReads = []
+        if self.writeAheadLog is not None:
+            # a restarted server resumes from the entries it made durable, so new entries follow its own instead of
+            # an older run's, and from the newest term and vote it recorded (it has seen at least the newest term in
+            # its entries), so it never votes twice in one term
+            self.loadAndRecoverLog()
+            self.currentTerm, self.hasVoted = max(self.writeAheadLog.getTermAndVote(),
+                                                  (self.log.getTermAtIndex(self.log.lastAppendedEntry), False))
+
+        # CLIENT ACTION BATCHING ATTRIBUTES (a batch is appended and replicated once its window or size is reached)
+        self.batchWindow = batchWindow  # Seconds to collect actions after the first arrives (0 disables batching)
+        self.batchSize = batchSize
+        self.pendingActions = []
+        self.batchTimer = None
+        # Sequence number of the newest action of each (match ID, player) taken in this leader's term, so an action
+        # resent after a timeout is only applied when this leader knows it has not applied it already
+        self.clientSequences = {}
+        # Sequence number of the client action behind each entry this leader appended and has not committed yet,
+        # keyed by index and echoed in the entry's outcome so clients can tell which of their actions it answers
+        self.entrySequences = {}
+
+        # METRICS ATTRIBUTES (read with the 'm' test command, or scraped over HTTP when a metrics port is given)
+        self.metrics = MetricsRegistry()
+        self.messagesReceived = self.metrics.getCounter("raft_messages_received_total")  # Counts by message type
+        self.decodeTimes = self.metrics.getHistogram("raft_decode_seconds")
+        self.encodeTimes = self.metrics.getHistogram("raft_encode_seconds")
+        self.appendedAt = []  # (last index, scheduler time) of every batch appended and not yet committed
+        # Counts by "lease", "read_index" or "replica"
+        self.readsServed = self.metrics.getCounter("raft_reads_total")
+        self.readTimes = self.metrics.getHistogram("raft_read_seconds")
+        self.leadershipTransfers = self.metrics.getCounter("raft_leadership_transfers_total")  # "started", "aborted"
+        self.actionsRefused = self.metrics.getCounter("raft_actions_refused_total")  # Counts by "invalid", "resent"
+        self.lastHeartbeatAt = None
+        self.registerGauges()
+        self.metricsEndpoint = None
+        if metricsPort is not None:
+            self.metricsEndpoint = MetricsEndpoint(self.metrics, "127.0.0.1", metricsPort)
 
         # TODO - Helper methods to modify group size based on testing needs
         # self.createTwoClientThreeServerGroup()
@@ -74,209 +251,474 @@ class Server:
     # __________________________________________
     # --------- MAIN EXECUTION LOOPS -----------
     # ==========================================
-    def mainOutgoingLoop(self) -> None:
-        """The main loop that drives the server's behavior in Raft (with the listening loop triggering actions here)"""
-        print("Sender thread started...")
-        while True:
-            if self.isFailed is False:
-                # Leader Logic
-                if self.isLeader is True:
-                    self.pulseHeartbeat()
-                # Follower Logic
-                elif self.isFollower is True:
-                    # Follower Times Out
-                    if self.clock <= 0:
-                        print("TIMEOUT! Initiating election...\n")
-                        self.initiateElection()
-            else:
-                print("FAILED")
-                time.sleep(1)
-
     def mainIncomingLoop(self) -> None:
         """Runs an infinite loop listening for messages from other processes in the group,
         accessing/modifying local data as needed"""
         print("Receiver thread started...\n")
         while True:
-            # On receipt of a message, decode data
-            data, address = self.socket.recvfrom(16384)
-            address = [0, address[0], address[1]]
-            data = data.decode("utf-8")
-            # RAW MESSAGE PRINT FOR TESTING
-            # print("\n" + data + "\n")
-            if self.isFailed is False:
-                # Logic for if message is to start complete cluster
-                if data[0] == "S":
-                    self.clusterReady = True
-                # Logic for if message was a heart beat
-                elif data[0] == "H":
-                    print("Heartbeat received...\n")
+            data, address = self.socket.recvfrom(MAX_DATAGRAM)
+            with self.stateLock:
+                self.handleMessage(data, address)
+
+    def mainMulticastLoop(self) -> None:
+        """Runs an infinite loop listening for broadcasts on the multicast group"""
+        print("Multicast receiver thread started...\n")
+        while True:
+            data, address = self.multicastSocket.recvfrom(MAX_DATAGRAM)
+            with self.stateLock:
+                self.handleMulticast(data, address)
+
+    def handleMulticast(self, data: bytes, address) -> None:
+        """Handles a broadcast heard on the multicast group like any other message, except this server's own
+        broadcasts and, on a learner, the election, pre-vote and confirmation requests only voters answer"""
+        if (address[0], address[1]) == (self.address, self.port):
+            return
+        if self.isLearner and data[:1] in (b"E", b"U", b"P", b"C"):
+            return
+        self.handleMessage(data, address)
+
+    def handleMessage(self, data: bytes, address) -> None:
+        """Decodes one message received from another process in the group and accesses/modifies local data as
+        needed (called by whichever engine owns the socket)"""
+        address = [0, address[0], address[1]]
+        messageType = chr(data[0])
+        self.messagesReceived[messageType] += 1
+        # RAW MESSAGE PRINT FOR TESTING
+        # print("\n" + str(data) + "\n")
+        if self.isFailed is False:
+            # Logic for a peer's readiness announcement or answer (carrying whether it is past the barrier)
+            if messageType == "B":
+                self.hearReadiness(data.decode("utf-8"), address)
+            # Logic for if message was a heart beat (carrying the leader's commit index)
+            elif messageType == "H":
+                print("Heartbeat received...\n")
+                heartbeat = self.decodeMessage(data)
+                self.advanceTerm(heartbeat.currentTerm)
+                if not self.isLeader and heartbeat.currentTerm >= self.currentTerm:
                     self.hearHeartbeat()
-                # Logic for if message was an election request
-                elif data[0] == "E":
-                    splitData = data.split(DELIMITER)
-                    electionMessage = jsonpickle.decode(splitData[1])
-                    print("Election initiated by Server " + str(electionMessage.eid) + "...\n")
-                    self.castVote(electionMessage, address)
-                # Logic for if message was a negative vote
-                elif data[0] == "N":
-                    print("No vote received by Server " + data[-1] + "...\n")
-                # Logic for if message was a positive vote
-                elif data[0] == "Y":
-                    print("Yes vote received by Server " + data[-1] + "...\n")
-                    self.countYesVote()
-                # Logic for if message was a won election announcement
-                elif data[0] == "W":
-                    print("Election won by Server " + data[-1] + "...\n")
-                    self.hearWonElection(data[-1])
-                # Logic for if we receive a commit message from leader
-                elif data[0] == "C":
-                    self.log.commitEntryToLog()
-                    # every time we commit we write to our backup
-                    self.writeLogtoFile()
-                # logic for updating incorrect logs
-                elif data[0] == "U":
-                    splitData = data.split(DELIMITER)
-                    leaderMsg = jsonpickle.decode(splitData[1])
-                    # check to see if we still have a log inconsistnecy
-                    # if self.checkForLogInconsistency(leaderMsg):
-                    #    acked = False
-                    #   print(self.log.logList)
-                    # else:
-                    # no log inconsistency so we append the missing log entries to our log
-                    #  self.log.appendEntriesToLog(leaderMsg.entries)
-                    #   print(self.log.logList)
-                    #   acked = True
-                    self.log.logList = leaderMsg.entries
-                    self.log.lastCommittedEntry = leaderMsg.lastCommittedEntry
-                    self.log.lastAppendedEntry = leaderMsg.lastAppendedEntry
-                    acked = True
-                    # ack the leader with either we were successful or not
-                    newPickle = self.getFollowerResponseMsg(acked)
-                    message = "A" + DELIMITER + newPickle
-                    self.sendMessage(address, message)
-                # Logic for acking message from leader
-                elif data[0] == "R":
-                    splitData = data.split(DELIMITER)
-                    leaderMsg = jsonpickle.decode(splitData[1])
-                    # need to send message back to leader
-                    # need to append to log
-                    acked = True
-                    if not self.isLeader:
-                        if self.log.nextIndex <= leaderMsg.lastAppendedEntry:
-                            acked = False
-                        elif self.checkForLogInconsistency:
-                            acked = False
+                    self.hearFromLeader(address)
+                    if not self.checkForLogInconsistency(heartbeat):
+                        self.followLeaderCommit(heartbeat.lastCommittedEntry, heartbeat.prevLogIndex)
+            # Logic for if message was an election request
+            elif messageType == "E":
+                electionMessage = self.decodeMessage(data)
+                print("Election initiated by Server " + str(electionMessage.eid) + "...\n")
+                self.castVote(electionMessage, address)
+            # Logic for an election request of a leadership transfer (sent by the target of a TimeoutNow)
+            elif messageType == "U":
+                self.castVote(self.decodeMessage(data), address, isTransfer=True)
+            # Logic for a leader's TimeoutNow, telling this node to run for leader at once (carrying the term)
+            elif messageType == "T":
+                self.hearTimeoutNow(self.parseTerm(data))
+            # Logic for an admin request to hand leadership to a voter ('X_<target ID>', -1 for the most caught up)
+            elif messageType == "X":
+                if self.isLeader is True:
+                    self.transferLeadership(int(data.decode("utf-8").split("_")[1]))
+                else:
+                    self.sendMessage(address, "L" + DELIMITER + str(self.getKnownLeader()))
+            # Logic for a pre-vote request (an election request for a term the sender has not moved to yet)
+            elif messageType == "P":
+                self.answerPreVote(self.decodeMessage(data), address)
+            # Logic for a pre-vote answer (carrying the proposed term and whether the vote would be given)
+            elif messageType == "O":
+                self.countPreVote(self.parseTerm(data), data.decode("utf-8").split("_")[2] == "1")
+            # Logic for if message was a negative vote (carrying the voter's term)
+            elif messageType == "N":
+                print("No vote received by Server " + chr(data[-1]) + "...\n")
+                self.advanceTerm(self.parseTerm(data))
+            # Logic for if message was a positive vote (carrying the term it was cast in)
+            elif messageType == "Y":
+                print("Yes vote received by Server " + chr(data[-1]) + "...\n")
+                self.countYesVote(self.parseTerm(data))
+            # Logic for if message was a won election announcement (carrying the term it was won in)
+            elif messageType == "W":
+                print("Election won by Server " + chr(data[-1]) + "...\n")
+                self.hearWonElection(chr(data[-1]), self.parseTerm(data))
+            # Logic for an AppendEntries message carrying the log suffix this follower is missing
+            elif messageType == "R":
+                leaderMsg = self.decodeMessage(data)
+                self.advanceTerm(leaderMsg.currentTerm)
+                if not self.isLeader:
+                    acked = False
+                    # on a nack the hints tell the leader where to back off to
+                    conflictTerm = -1
+                    replyIndex = min(self.log.lastAppendedEntry + 1, max(leaderMsg.prevLogIndex, 0))
+                    if leaderMsg.currentTerm >= self.currentTerm:
+                        self.hearHeartbeat()
+                        self.hearFromLeader(address)
+                        if self.checkForLogInconsistency(leaderMsg):
+                            conflictTerm, replyIndex = self.log.getConflictHint(leaderMsg.prevLogIndex)
                         else:
-                            # if there are no issues we add it to our log and ack the leader
-                            self.currentGameState = leaderMsg.entries
-                            self.log.appendEntryToLog(copy.deepcopy(
-                                self.currentGameState), self.currentTerm)
-                        newPickle = self.getFollowerResponseMsg(acked)
-                        message = "A" + DELIMITER + newPickle
+                            acked = True
+                            previousLastEntry = self.log.lastAppendedEntry
+                            firstWritten = self.log.appendEntriesAfterIndex(leaderMsg.prevLogIndex,
+                                                                            leaderMsg.entries)
+                            # only the entries the leader just verified are known to match
+                            replyIndex = leaderMsg.prevLogIndex + len(leaderMsg.entries) + 1
+                            self.updateMatches(firstWritten, previousLastEntry)
+                    message = WireCodec.frame("A", self.getFollowerResponseMsg(acked, replyIndex, conflictTerm))
+                    if acked and self.writeAheadLog is not None:
+                        # the ack is only sent once the new entries are durable
+                        self.persistEntries(firstWritten, lambda reply=message, to=address: self.sendMessage(
+                            to, reply))
+                    else:
                         self.sendMessage(address, message)
-                # Logic for receiving an Ack
-                elif data[0] == "A":
-                    splitData = data.split(DELIMITER)
-                    # using pickle so the message is easier to parse
-                    followerMsg = jsonpickle.decode(splitData[1])
-                    if followerMsg.response:
-                        self.acksReceived += 1
+                    if acked:
+                        self.followLeaderCommit(leaderMsg.lastCommittedEntry, replyIndex - 1)
+            # Logic for installing a leader's snapshot when this follower is behind its compacted prefix
+            elif messageType == "I":
+                snapshotMsg = self.decodeMessage(data)
+                self.advanceTerm(snapshotMsg.currentTerm)
+                if not self.isLeader:
+                    acked = snapshotMsg.currentTerm >= self.currentTerm
+                    received = 0
+                    if acked:
+                        self.hearHeartbeat()
+                        self.hearFromLeader(address)
+                        received = self.receiveSnapshotChunk(snapshotMsg)
+                    installed = acked and received == snapshotMsg.matchCount
+                    if installed and snapshotMsg.snapshotIndex > self.log.snapshotIndex:
+                        self.log.installSnapshot(snapshotMsg.snapshotIndex, snapshotMsg.snapshotTerm,
+                                                 snapshotMsg.gameState, self.pendingSnapshot[1])
+                        self.pendingSnapshot = None
+                        self.matches = self.log.getLatestGameStates()
+                        self.committedStateCodes = self.log.getCommittedStateCodes()
+                        self.serveFencedReads()
+                    # until every chunk is held the ack only reports how far the transfer got
+                    message = WireCodec.frame("A", self.getFollowerResponseMsg(
+                        acked, max(snapshotMsg.snapshotIndex if installed else -1, self.log.snapshotIndex) + 1,
+                        snapshotMsg.snapshotIndex, received))
+                    if installed and self.writeAheadLog is not None:
+                        self.writeAheadLog.appendSnapshot(self.log, lambda reply=message, to=address: (
+                            self.sendMessage(to, reply)))
                     else:
-                        # sends a message back to the behind process
-                        # correctionMessage = self.getLeaderMsg(self.log.getSubLog(followerMsg.nextIndex))
-                        correctionMessage = self.getLeaderMsg(self.log.logList)
-                        message = "U" + DELIMITER + correctionMessage
                         self.sendMessage(address, message)
-                    # if we receive enoough acks we tell the servers to commit the message
-                    if self.acksReceived >= self.majority:
-                        # set our acks to 0 to prevent sending messages multiple times
-                        self.acksReceived = 0
-                        # tell the servers to commit item
-                        print("Enough Acks received sending commit message... ")
-                        for i in range(self.log.lastCommittedEntry, self.log.lastAppendedEntry):
-                            self.log.commitEntryToLog()
-                        self.messageServers("C")
-                        # inform the client of action outcome
-                        self.announceOutcome()
-                        gamestateGraphic = self.currentGameState.getGameStateGraphic()
-                        self.messageClients(self.currentGameState.outcome + DELIMITER + gamestateGraphic)
-                # Logic for if message was an action sent to the server cluster by a client
-                elif data[0] == "0" or data[0] == "1":
-                    # TODO - Improve so that all handle message, not just leader (i.e. this is very fragile)
-                    if self.isLeader is True:
-                        self.announceAction(data)
-                        self.currentGameState.updateGameState(data)
-                        self.log.appendEntryToLog(copy.deepcopy(
-                            self.currentGameState),
-                            self.currentTerm)  # NOTE: Current Gamestate is updated in place, hence the copy
-                        messageToServers = self.getLeaderMsg(self.currentGameState)
-                        message = "R" + DELIMITER + messageToServers
-                        self.acksReceived = 0
-                        self.messageServers(message)
+            # Logic for receiving an Ack
+            elif messageType == "A":
+                followerMsg = self.decodeMessage(data)
+                follower = self.getProcessByAddress(address)
+                # an ack from an earlier term (e.g. delayed from this node's last time as leader) may vouch for
+                # entries the follower has since overwritten, so it is ignored like a stale AppendEntries
+                if self.isLeader is True and follower is not None and followerMsg.currentTerm >= self.currentTerm:
+                    self.chunksInFlight[follower[0]] = max(self.chunksInFlight.get(follower[0], 0) - 1, 0)
+                    if followerMsg.currentTerm > self.currentTerm:
+                        # a follower has seen a newer term so this leader is stale
+                        self.advanceTerm(followerMsg.currentTerm)
+                    elif followerMsg.snapshotOffset >= 0:
+                        self.hearSnapshotAck(follower, followerMsg)
+                    elif followerMsg.response:
+                        self.matchIndex[follower[0]] = max(self.matchIndex[follower[0]], followerMsg.nextIndex - 1)
+                        self.nextIndex[follower[0]] = max(self.nextIndex[follower[0]], followerMsg.nextIndex)
+                        self.advanceCommitIndex()
+                        # the ack frees a window slot for the next chunk of a follower still catching up
+                        if self.nextIndex[follower[0]] <= self.log.lastAppendedEntry:
+                            self.replicateToFollower(follower)
+                    else:
+                        # skip the follower's whole conflicting term (or the gap past its shorter log) at once and
+                        # resend only the suffix it is missing
+                        backoffIndex = self.log.getNextIndexAfterConflict(followerMsg.conflictTerm,
+                                                                         followerMsg.conflictIndex)
+                        # chunks sent past a lost one all report the same gap, which only needs resending once
+                        if followerMsg.conflictTerm >= 0 or self.rewoundTo.get(follower[0]) != backoffIndex:
+                            self.rewoundTo[follower[0]] = backoffIndex
+                            self.nextIndex[follower[0]] = max(self.matchIndex[follower[0]] + 1, backoffIndex)
+                            self.chunksInFlight[follower[0]] = 0
+                            self.replicateToFollower(follower)
+                    if self.transferTarget is not None and follower[0] == self.transferTarget[0]:
+                        self.sendTimeoutNowIfCaughtUp()
+            # Logic for a leader's leadership confirmation round (carrying its term and the round number)
+            elif messageType == "C":
+                term = self.parseTerm(data)
+                self.advanceTerm(term)
+                fields = data.decode("utf-8").split("_")
+                if not self.isLeader and term >= self.currentTerm:
+                    self.hearHeartbeat()
+                    self.hearFromLeader(address)
+                    if len(fields) > 3 and self.adaptiveTiming:
+                        self.adaptElectionTimeout(float(fields[3]))
+                # a leader of an older term learns the newer one from the reply and steps down
+                self.sendMessage(address, "K_" + str(self.currentTerm) + "_" + fields[2])
+            # Logic for a follower's ack of a confirmation round (carrying its term and the round number)
+            elif messageType == "K":
+                term = self.parseTerm(data)
+                self.advanceTerm(term)
+                follower = self.getProcessByAddress(address)
+                if self.isLeader is True and term == self.currentTerm and follower is not None:
+                    readRound = int(data.decode("utf-8").split("_")[2])
+                    if self.adaptiveTiming and readRound == self.readRound and readRound in self.readRoundSentAt:
+                        self.observeRoundTrip(self.scheduler.now() - self.readRoundSentAt[readRound])
+                    self.hearReadConfirmation(readRound, follower)
+            # Logic for a read-only query of a match's committed state sent by a client ('Q$<match>$<read ID>')
+            elif messageType == "Q":
+                self.hearReadQuery(data.decode("utf-8"), address)
+            # Logic for if message was an action sent to the server cluster by a client
+            elif messageType == "0" or messageType == "1":
+                if self.isLeader is True and self.transferTarget is not None:
+                    # the leader is handing over, so the client resends to the node about to take over
+                    self.redirectsSent += 1
+                    self.sendMessage(address, "L" + DELIMITER + self.transferTarget[0].split("_")[-1])
+                elif self.isLeader is True and self.parseAction(data.decode("utf-8")) is None:
+                    # an unknown action or match ID would never pack into a log entry, so it is refused up front
+                    self.actionsRefused["invalid"] += 1
+                    self.sendMessage(address, REJECTED + DELIMITER + data.decode("utf-8"))
+                elif self.isLeader is True and not self.takeClientSequence(data.decode("utf-8")):
+                    self.actionsRefused["resent"] += 1
+                    self.sendMessage(address, REJECTED + DELIMITER + data.decode("utf-8"))
+                elif self.isLeader is True:
+                    self.pendingActions.append(data.decode("utf-8"))
+                    if len(self.pendingActions) >= self.batchSize or self.batchWindow <= 0:
+                        self.appendActionBatch()
+                    elif self.batchTimer is None:
+                        self.batchTimer = self.scheduler.callLater(self.batchWindow, self.appendActionBatch)
+                else:
+                    # point the client at the leader (-1 while none is known) so it stops sending here
+                    self.redirectsSent += 1
+                    self.sendMessage(address, "L" + DELIMITER + str(self.getKnownLeader()))
 
     def mainClockLoop(self) -> None:
-        """Runs an infinite loop that executes countdown timers independent of the other loops"""
-        # Bring up all clusters at once with single command at Server_2
-        if self.id == 2:
-            time.sleep(0.25)  # Minor delay lets other threads come online before prompt
-            self.startCompleteCluster()
-        while self.clusterReady is False:
-            time.sleep(1)  # Sleep the clock thread until the START message is received by Server_2
+        """Runs the timer scheduler that drives election timeouts and heartbeats, sleeping between deadlines"""
         print("Clock thread started...\n")
-        # Runs clock
-        while True:
-            if self.isFailed is False:
-                # Display clock and decrement
-                minutes, seconds = divmod(self.clock, 60)
-                timeFormat = "{:02d}:{:02d}".format(minutes, seconds)
-                print(timeFormat, end="\r")
-                time.sleep(1)
-                self.clock -= 1
+        # The election timer is first armed once the readiness barrier passes (see markClusterReady)
+        self.scheduler.run(self.runTimerLocked)
+
+    def runTimerLocked(self, timer: list) -> None:
+        """Runs a due timer's callback holding the state lock (called on the clock thread without a pipeline)"""
+        with self.stateLock:
+            ServerPipeline.runTimer(timer)
 
     def testCommandLoop(self) -> None:
         """Runs an infinite loop that awaits user commands to force failures, recovers, and timeouts"""
-        while self.clusterReady is False:
-            time.sleep(1)
+        self.clusterReadyEvent.wait()
         while True:
-            testCommand = input()
-            if testCommand == "t":
-                if self.isFollower is True:
-                    self.clock = 0
-            elif testCommand == "f":
-                self.isFailed = True
-            elif testCommand == "s":
-                self.isFailed = False
-            elif testCommand == "r":
-                self.loadAndRecoverLog()
-                self.isFailed = False
-            elif testCommand == "l":
-                self.loadAndRecoverLog()
-            elif testCommand == "p":
-                self.log.printLogEntries()
-                print("\nLog as Object:")
-                print(self.log.logList)
+            try:
+                testCommand = input()
+            except EOFError:
+                return  # Started without a console (e.g. by the cluster launcher)
+            if self.pipeline is not None:
+                self.pipeline.protocol.putUrgent(self.handleTestCommand, testCommand)
+            else:
+                with self.stateLock:
+                    self.handleTestCommand(testCommand)
+
+    def handleTestCommand(self, testCommand: str) -> None:
+        """Carries out one user command forcing a failure, recovery or timeout"""
+        if testCommand == "t":
+            if self.isFollower is True:
+                self.scheduler.cancel(self.electionTimer)
+                self.electionTimer = self.scheduler.callLater(0, self.onElectionTimeout)
+        elif testCommand == "f":
+            self.isFailed = True
+        elif testCommand == "s":
+            self.isFailed = False
+            self.resetElectionTimer()
+        elif testCommand == "r":
+            self.loadAndRecoverLog()
+            self.isFailed = False
+            self.resetElectionTimer()
+        elif testCommand == "l":
+            self.loadAndRecoverLog()
+        elif testCommand == "x" or testCommand.startswith("x "):
+            # 'x' hands leadership to the most caught-up voter, 'x <id>' to a chosen one
+            if self.isLeader is True:
+                self.transferLeadership(int(testCommand[2:]) if len(testCommand) > 2 else -1)
+        elif testCommand == "m":
+            print(self.metrics.formatText())
+        elif testCommand == "p":
+            self.log.printLogEntries()
+            print("\nLog as Object:")
+            print(self.log.logList)
+
+    # ___________________________________
+    # --------- TIMER METHODS -----------
+    # ===================================
+    def resetElectionTimer(self) -> None:
+        """Restarts the countdown after which a follower (or candidate) that hears nothing starts an election"""
+        self.scheduler.cancel(self.electionTimer)
+        self.electionTimer = self.scheduler.callLater(self.timeout, self.onElectionTimeout)
+
+    def onElectionTimeout(self) -> None:
+        """Fires when the election timer runs out without a heartbeat from the leader"""
+        if self.isFailed is False and self.isLeader is False and self.isLearner is False:
+            print("TIMEOUT! Initiating election...\n")
+            if self.preVote:
+                self.startPreVote()
+            else:
+                self.initiateElection()
+        self.resetElectionTimer()
+
+    def startHeartbeats(self) -> None:
+        """Stops the election timer and starts pulsing heartbeats right away, as a newly elected leader does"""
+        self.scheduler.cancel(self.electionTimer)
+        self.scheduler.cancel(self.heartbeatTimer)
+        self.heartbeatTimer = self.scheduler.callLater(0, self.onHeartbeatDue)
+
+    def onHeartbeatDue(self) -> None:
+        """Fires every heartRate seconds while this node is leader (renewing its lease, if leases are on)"""
+        if self.isLeader is True:
+            if self.isFailed is False:
+                self.pulseHeartbeat()
+                if (self.leaseDuration is not None or self.adaptiveTiming) and len(self.readRoundAcks) == 0:
+                    # the round's acks renew the lease and time the round trips adaptive timing is derived from
+                    self.startReadRound()
+            self.heartbeatTimer = self.scheduler.callLater(self.heartRate, self.onHeartbeatDue)
+
+    def observeRoundTrip(self, roundTrip: float) -> None:
+        """Folds a leader's measured confirmation round trip into its smoothed RTT and deviation (as TCP does) and
+        derives the heartbeat interval from them, never longer than the configured one"""
+        if self.smoothedRoundTrip is None:
+            self.smoothedRoundTrip = roundTrip
+            self.roundTripVariation = roundTrip / 2
+        else:
+            self.roundTripVariation = 0.75 * self.roundTripVariation + 0.25 * abs(self.smoothedRoundTrip - roundTrip)
+            self.smoothedRoundTrip = 0.875 * self.smoothedRoundTrip + 0.125 * roundTrip
+        retransmissionTimeout = self.smoothedRoundTrip + 4 * self.roundTripVariation
+        self.heartRate = min(self.maxHeartRate, max(MIN_ADAPTIVE_HEARTBEAT, HEARTBEAT_RTOS * retransmissionTimeout))
+
+    def adaptElectionTimeout(self, leaderHeartRate: float) -> None:
+        """Derives a follower's election timeout bounds from the leader's heartbeat interval, redrawing its timeout
+        only when the bounds move by more than a fifth (so jitter in the RTT does not keep redrawing it)"""
+        lowerBound = ELECTION_TIMEOUT_BEATS[0] * leaderHeartRate
+        if abs(lowerBound - self.electionTimeoutRange[0]) <= self.electionTimeoutRange[0] / 5:
+            return
+        self.electionTimeoutRange = (lowerBound, ELECTION_TIMEOUT_BEATS[1] * leaderHeartRate)
+        self.timeout = self.getRandomTimeout(*self.electionTimeoutRange)
+        self.resetElectionTimer()
 
     # _______________________________________
     # --------- HEARTBEAT METHODS -----------
     # =======================================
     def pulseHeartbeat(self) -> None:
-        """Pulses the leader's heart beat"""
-        if self.clock <= 0:
-            print("Sending heartbeat...\n")
-            for process in self.group:
-                if process[0][0] == "S":  # Multicast to servers only
-                    self.sendMessage(process, "H")
-            self.clock = self.heartRate
+        """Pulses the leader's heart beat (carrying its commit index), retrying replication instead for any follower
+        that is behind and skipping followers that were just sent replication traffic. Over multicast, one beat
+        covers every caught-up follower (a follower that is behind fails its log check and ignores it)"""
+        print("Sending heartbeat...\n")
+        needsBeat = False
+        for process in self.group:
+            if self.isReplica(process):  # Multicast to servers and learners only
+                if self.scheduler.now() - self.lastReplicatedAt.get(process[0], -math.inf) < self.heartRate / 2:
+                    continue  # An AppendEntries sent since the last beat already reset its election timer
+                if self.matchIndex.get(process[0], -1) < self.log.lastAppendedEntry:
+                    self.resumeReplication(process)
+                elif self.multicastAddress is not None:
+                    needsBeat = True
+                else:
+                    # the entries up to matchIndex are known to match, so the follower can commit through them
+                    self.sendMessage(process, WireCodec.frame("H", self.getLeaderMsg(
+                        None, self.matchIndex.get(process[0], -1))))
+        if needsBeat:
+            # every caught-up follower's matchIndex is the last appended entry, so they share one beat
+            self.messageReplicas(WireCodec.frame("H", self.getLeaderMsg(None, self.log.lastAppendedEntry)))
 
     def hearHeartbeat(self) -> None:
         """Listens for the heartbeat from a leader and responds with current log state"""
-        self.clock = self.timeout
+        self.resetElectionTimer()
+        now = self.scheduler.now()
+        if self.lastHeartbeatAt is not None:
+            self.metrics.observe("raft_heartbeat_interval_seconds", now - self.lastHeartbeatAt)
+        self.lastHeartbeatAt = now
+
+    def followLeaderCommit(self, leaderCommit, verifiedIndex) -> None:
+        """Advances a follower's commit index straight to the leader's with a single persistence call, but only
+        through verifiedIndex, the last entry known to match the leader's log"""
+        if min(leaderCommit, verifiedIndex) > self.log.lastCommittedEntry:
+            firstCommitted = self.log.lastCommittedEntry + 1
+            self.log.commitThroughIndex(min(leaderCommit, verifiedIndex))
+            self.applyCommittedStates(firstCommitted)
+            self.persistCommit()
+            self.compactLogIfNeeded()
+            self.serveFencedReads()
+        if self.log.lastCommittedEntry >= leaderCommit:
+            self.caughtUpAt = self.scheduler.now()
+
+    # _______________________________________________
+    # --------- READINESS BARRIER METHODS -----------
+    # ===============================================
+    def joinReadinessBarrier(self) -> None:
+        """Announces to every server and learner that this node is up, until the barrier passes: once every one of
+        them has been heard from (the lowest voter ID then runs for leader at once), once any of them answers that
+        it is already past (a restart into a running cluster), or after barrierTimeout with a majority of voters"""
+        if self.clusterReady is False and self.joinedBarrierAt is None:
+            self.joinedBarrierAt = self.scheduler.now()
+            self.announceReadiness()
+
+    def announceReadiness(self) -> None:
+        """Asks every peer not heard from yet to answer, rechecking the barrier every barrierRetry seconds"""
+        self.barrierTimer = None
+        self.checkReadinessBarrier()
+        if self.clusterReady is True:
+            return
+        for process in self.group:
+            if self.isReplica(process) and process[0] not in self.readyPeers:
+                self.sendMessage(process, "B_0_1")
+        self.barrierTimer = self.scheduler.callLater(self.barrierRetry, self.announceReadiness)
+
+    def hearReadiness(self, message: str, address) -> None:
+        """Records a peer as up from its 'B_<past barrier>_<wants answer>' message, answering it if asked"""
+        peer = self.getProcessByAddress(address)
+        if peer is None:
+            return
+        isPast, wantsAnswer = message.split("_")[1:3]
+        self.readyPeers.add(peer[0])
+        if isPast == "1":
+            self.foundRunningCluster = True
+        if wantsAnswer == "1":
+            self.sendMessage(address, "B_" + ("1" if self.clusterReady else "0") + "_0")
+        self.checkReadinessBarrier()
+
+    def checkReadinessBarrier(self) -> None:
+        """Passes the barrier if its conditions hold (see joinReadinessBarrier)"""
+        if self.clusterReady is True or self.joinedBarrierAt is None:
+            return
+        replicas = [process[0] for process in self.group if self.isReplica(process)]
+        votersHeard = len([name for name in self.readyPeers if name[0] == "S"]) + (0 if self.isLearner else 1)
+        if all(name in self.readyPeers for name in replicas):
+            self.markClusterReady()
+            voterIDs = [int(name.split("_")[-1]) for name in replicas if name[0] == "S"]
+            if self.foundRunningCluster is False and self.isLearner is False and self.id < min(voterIDs + [math.inf]):
+                # a cold start with everyone up needs no timeout to pass before someone runs for leader
+                self.scheduler.cancel(self.electionTimer)
+                self.electionTimer = self.scheduler.callLater(0, self.onElectionTimeout)
+        elif self.foundRunningCluster is True or (self.scheduler.now() - self.joinedBarrierAt >= self.barrierTimeout
+                                                  and votersHeard >= self.majority):
+            self.markClusterReady()
 
     # _____________________________________________
     # --------- LEADER ELECTION METHODS -----------
     # =============================================
-    def initiateElection(self) -> None:
-        """Initiates an election when a follower node has timed out"""
+    def startPreVote(self) -> None:
+        """Asks the voters whether they would vote for this node in the next term, without moving to it; the
+        election only starts once a majority would"""
+        self.preVoteTerm = self.currentTerm + 1
+        self.preVotesReceived = 1
+        if self.preVotesReceived >= self.majority:
+            self.preVoteTerm = None
+            self.initiateElection()
+            return
+        self.messageServers(WireCodec.frame("P", self.encodeMessage(ElectionMessage(
+            self.id, self.preVoteTerm, self.log.lastAppendedEntry, self.log.getTermAtIndex(self.log.lastAppendedEntry)))))
+
+    def answerPreVote(self, preVoteMessage: ElectionMessage, senderAddress) -> None:
+        """Tells a node whether it would get this node's vote in the term it proposes ('O_<term>_<1 or 0>'), without
+        changing any state: only if that term is newer, its log is at least as up to date and this node has not
+        heard from a leader within its shortest election timeout either"""
+        lastLogTerm = self.log.getTermAtIndex(self.log.lastAppendedEntry)
+        wouldVote = self.isLearner is False and self.isLeader is False and \
+            preVoteMessage.currentTerm > self.currentTerm and \
+            (preVoteMessage.lastLogTems, preVoteMessage.lastLogIndex) >= (lastLogTerm, self.log.lastAppendedEntry) and \
+            self.scheduler.now() - self.lastLeaderContactAt >= self.electionTimeoutRange[0]
+        self.sendMessage(senderAddress, "O_" + str(preVoteMessage.currentTerm) + "_" + ("1" if wouldVote else "0"))
+
+    def countPreVote(self, term: int, wouldVote: bool) -> None:
+        """Counts a pre-vote for the term this node proposed, starting the election once a majority would vote"""
+        if not wouldVote or term != self.preVoteTerm or term != self.currentTerm + 1 or self.isLeader:
+            return  # A refusal, or an answer to a pre-vote this node has since moved on from
+        self.preVotesReceived += 1
+        if self.preVotesReceived >= self.majority:
+            self.preVoteTerm = None
+            self.initiateElection()
+
+    def initiateElection(self, isTransfer: bool = False) -> None:
+        """Initiates an election when a follower node has timed out (or was told to by a leader handing over)"""
         # Flips identity from follower to candidate and casts vote for self
         self.isFollower = False
         self.isCandidate = True
@@ -286,20 +728,30 @@ class Server:
         self.hasVoted = True
         self.votesReceived = 1
         electionPickle = self.getElectionMessage()
-        message = "E" + DELIMITER + electionPickle
-        # Broadcast request for votes
-        for process in self.group:
-            if process[0][0] == "S":
-                self.sendMessage(process, message)
+        message = WireCodec.frame("U" if isTransfer else "E", electionPickle)
+        # Broadcast request for votes once the new term and the vote for itself are durable
+        self.persistTermAndVote(lambda: self.messageServers(message))
 
-    def castVote(self, electionMessage: ElectionMessage, senderAddress) -> None:
-        """Casts a positive or negative vote for a candidate node"""
+    def castVote(self, electionMessage: ElectionMessage, senderAddress, isTransfer: bool = False) -> None:
+        """Casts a positive or negative vote for a candidate node (a candidate the leader handed over to is not
+        refused for the leader's lease, which the leader gave up before handing over)"""
         candidate = electionMessage.eid
+        if self.isLearner:
+            self.sendMessage(senderAddress, "N_" + str(self.currentTerm) + "_" + str(self.id))
+            return
+        if self.leaseDuration is not None and self.isLeader is False and isTransfer is False and \
+                self.scheduler.now() - self.lastLeaderContactAt < self.leaseDuration:
+            # the leader may still be serving reads on a lease this node's acks granted, so the candidate is
+            # refused without adopting its term
+            self.sendMessage(senderAddress, "N_" + str(self.currentTerm) + "_" + str(self.id))
+            return
+        self.advanceTerm(electionMessage.currentTerm)
+        lastLogTerm = self.log.getTermAtIndex(self.log.lastAppendedEntry)
         if electionMessage.currentTerm < self.currentTerm:
             # if their current term is less than ours then they are behind
             vote = "N_"
-        elif electionMessage.lastLogIndex < self.log.lastCommittedEntry:
-            # if their last committed entry is less than ours then they are behind
+        elif (electionMessage.lastLogTems, electionMessage.lastLogIndex) < (lastLogTerm, self.log.lastAppendedEntry):
+            # if their log ends in an older term (or is shorter in the same term) it may lack committed entries
             vote = "N_"
         elif self.hasVoted:
             # we have already voted
@@ -309,79 +761,638 @@ class Server:
             vote = "Y_"
             self.hasVoted = True
         # candidateAddress = self.getProcessAddressing(candidate)
-        self.sendMessage(senderAddress, vote + str(self.id))
+        reply = vote + str(self.currentTerm) + "_" + str(self.id)
+        if vote == "Y_":
+            # a yes vote is only sent once it is durable, so a restart cannot cast another in the same term
+            self.persistTermAndVote(lambda: self.sendMessage(senderAddress, reply))
+        else:
+            self.sendMessage(senderAddress, reply)
 
-    def countYesVote(self) -> None:
+    def countYesVote(self, term: int) -> None:
         """Counts a positive vote for the candidate and declares the election if a majority has been reached"""
+        if term != self.currentTerm:
+            return  # A late vote from an election this node has since moved on from
         self.votesReceived += 1
         # If the election is won, end the election and become leader
         if self.votesReceived >= self.majority and self.isCandidate is True:
             self.isCandidate = False
-            self.hasVoted = False
             self.votesReceived = 0
             self.isLeader = True
             self.currentLeader = self.id
+            self.resetFollowerProgress()
             self.broadcastElectionWin()
+            self.startHeartbeats()
 
     def broadcastElectionWin(self) -> None:
-        """Broadcasts an election win to the group"""
-        for process in self.group:
-            if process[0][0] == "S":
-                self.sendMessage(process, "W_" + str(self.id))
+        """Broadcasts an election win to the group's servers and learners"""
+        self.messageReplicas("W_" + str(self.currentTerm) + "_" + str(self.id))
+
+    def stepDown(self) -> None:
+        """Returns a leader or candidate to the follower role"""
+        self.isFollower = True
+        self.isCandidate = False
+        self.isLeader = False
+        self.votesReceived = 0
+        self.scheduler.cancel(self.heartbeatTimer)
+        self.resetElectionTimer()
+        self.resetReadState()
+        self.endLeadershipTransfer()
+
+    def advanceTerm(self, term: int) -> None:
+        """Moves to a newer term seen in any message, where this node has not voted yet and can no longer lead
+        (a no-op for the current or an older term)"""
+        if term > self.currentTerm:
+            self.currentTerm = term
+            self.hasVoted = False
+            self.persistTermAndVote()
+            if self.isLeader or self.isCandidate:
+                self.stepDown()
+
+    def hearFromLeader(self, leaderAddress) -> None:
+        """Remembers the sender of a current AppendEntries as leader (in case its election win was missed), ending
+        this node's candidacy if it was running for the same term"""
+        if self.isCandidate:
+            self.stepDown()
+        self.lastLeaderContactAt = self.scheduler.now()
+        self.preVoteTerm = None
+        leader = self.getProcessByAddress(leaderAddress)
+        if leader is not None:
+            self.currentLeader = int(leader[0].split("_")[-1])
 
-    def hearWonElection(self, newLeader: str) -> None:
+    def hearWonElection(self, newLeader: str, term: int) -> None:
         """Receives an announcement of an election win and updates leadership accordingly"""
+        if term < self.currentTerm:
+            return  # Announced by a leader of an older term
+        self.advanceTerm(term)
         self.isFollower = True
         self.isCandidate = False
         self.isLeader = False
-        self.hasVoted = False
         self.votesReceived = 0
         self.currentLeader = int(newLeader)
-        self.currentTerm += 1
+        self.lastLeaderContactAt = self.scheduler.now()
+        self.preVoteTerm = None
+        self.scheduler.cancel(self.heartbeatTimer)
+        self.resetElectionTimer()
+
+    # _______________________________________________
+    # --------- LEADERSHIP TRANSFER METHODS -----------
+    # ===============================================
+    def transferLeadership(self, targetID: int = -1) -> None:
+        """Hands leadership to a voter (the most caught-up one for -1): stops accepting client actions and gives up
+        the lease, brings the target up to date and sends it TimeoutNow, abandoning the transfer if it has not
+        taken over within the longest election timeout"""
+        voters = [process for process in self.group if self.isVoter(process)]
+        targets = [process for process in voters if int(process[0].split("_")[-1]) == targetID] if targetID >= 0 \
+            else sorted(voters, key=lambda process: self.matchIndex.get(process[0], -1), reverse=True)
+        if self.isLeader is False or self.transferTarget is not None or len(targets) == 0:
+            return
+        print("Handing leadership to " + targets[0][0] + "...\n")
+        self.leadershipTransfers["started"] += 1
+        self.transferTarget = targets[0]
+        self.timeoutNowSent = False
+        self.leaseExpiresAt = -math.inf  # Voters stop refusing the target's election for the lease they granted
+        self.transferTimer = self.scheduler.callLater(self.electionTimeoutRange[1], self.abortLeadershipTransfer)
+        if len(self.pendingActions) > 0:
+            self.appendActionBatch()  # Actions accepted before the transfer reach the target with the log
+        self.sendTimeoutNowIfCaughtUp()
+        if self.timeoutNowSent is False:
+            self.resumeReplication(self.transferTarget)
+
+    def sendTimeoutNowIfCaughtUp(self) -> None:
+        """Sends the transfer target TimeoutNow ('T_<term>') once it holds every entry of this leader's log"""
+        if self.timeoutNowSent is False and \
+                self.matchIndex.get(self.transferTarget[0], -1) >= self.log.lastAppendedEntry:
+            self.timeoutNowSent = True
+            self.sendMessage(self.transferTarget, "T_" + str(self.currentTerm))
+
+    def hearTimeoutNow(self, term: int) -> None:
+        """Runs for leader at once, skipping the pre-vote, when this node's leader is handing over to it"""
+        if term == self.currentTerm and self.isLeader is False and self.isLearner is False:
+            print("TimeoutNow received! Initiating election...\n")
+            self.preVoteTerm = None
+            self.initiateElection(isTransfer=True)
+            self.resetElectionTimer()
+
+    def abortLeadershipTransfer(self) -> None:
+        """Resumes accepting client actions once a transfer has gone an election timeout without the target
+        taking over"""
+        if self.isLeader is True and self.transferTarget is not None:
+            print("Leadership transfer to " + self.transferTarget[0] + " timed out...\n")
+            self.leadershipTransfers["aborted"] += 1
+            self.endLeadershipTransfer()
+
+    def endLeadershipTransfer(self) -> None:
+        """Clears a leadership transfer, whether the target took over or it was abandoned"""
+        self.scheduler.cancel(self.transferTimer)
+        self.transferTimer = None
+        self.transferTarget = None
+        self.timeoutNowSent = False
+
+    # _________________________________________
+    # --------- REPLICATION METHODS -----------
+    # =========================================
+    def appendActionBatch(self) -> None:
+        """Applies every pending client action, appends them as consecutive entries and replicates them to each
+        follower in one AppendEntries (earlier batches may still be awaiting acks; each entry commits once the
+        median matchIndex passes it)"""
+        self.scheduler.cancel(self.batchTimer)
+        self.batchTimer = None
+        actions, self.pendingActions = self.pendingActions, []
+        if self.isLeader is False or len(actions) == 0:
+            return
+        firstIndex = self.log.lastAppendedEntry + 1
+        for message in actions:
+            action, matchID = self.parseAction(message)
+            gameState = self.getMatchState(matchID)
+            self.runNotification(self.announceAction, action)
+            gameState.updateGameState(action)
+            self.log.appendEntryToLog(gameState, self.currentTerm)  # Stored as its packed state code
+            sequence = self.getActionSequence(message)
+            if sequence is not None:
+                self.entrySequences[self.log.lastAppendedEntry] = sequence
+        self.appendedAt.append((self.log.lastAppendedEntry, self.scheduler.now()))
+        self.persistLeaderEntries(firstIndex)
+        if self.multicastAddress is not None and self.multicastBatch(firstIndex):
+            return
+        for process in self.group:
+            if self.isReplica(process):
+                self.replicateToFollower(process)
+
+    def multicastBatch(self, firstIndex: int) -> bool:
+        """Sends a batch appended from firstIndex to every follower in one broadcast AppendEntries, returning
+        whether it could: only when each follower would have been sent that same single chunk, i.e. all of them
+        expect firstIndex next and have room in their window"""
+        followers = [process for process in self.group if self.isReplica(process)]
+        if firstIndex <= self.log.snapshotIndex or self.log.lastAppendedEntry - firstIndex + 1 > self.chunkEntries:
+            return False
+        for process in followers:
+            if self.nextIndex.get(process[0]) != firstIndex or \
+                    self.chunksInFlight.get(process[0], 0) >= self.replicationWindow:
+                return False
+        self.messageReplicas(WireCodec.frame("R", self.getLeaderMsg(self.log.getSubLog(firstIndex),
+                                                                    firstIndex - 1)))
+        for process in followers:
+            self.lastReplicatedAt[process[0]] = self.scheduler.now()
+            self.chunksInFlight[process[0]] = self.chunksInFlight.get(process[0], 0) + 1
+            self.nextIndex[process[0]] = self.log.lastAppendedEntry + 1
+            self.armRetransmitTimer(process)
+        return True
+
+    def resetFollowerProgress(self) -> None:
+        """Initializes the per-follower replication state (and the client sequence numbers taken) when this node
+        becomes leader"""
+        self.clientSequences = {}
+        self.entrySequences = {}
+        self.nextIndex = {}
+        self.matchIndex = {}
+        self.lastReplicatedAt = {}
+        self.chunksInFlight = {}
+        self.rewoundTo = {}
+        self.snapshotTransfers = {}
+        for retransmitTimer in self.retransmitTimers.values():
+            self.scheduler.cancel(retransmitTimer[0])
+        self.retransmitTimers = {}
+        self.appendedAt = []
+        self.resetReadState()
+        for process in self.group:
+            if self.isReplica(process):
+                self.nextIndex[process[0]] = self.log.lastAppendedEntry + 1
+                self.matchIndex[process[0]] = -1
+        # entries appended before this term (some perhaps still being synced) count once everything queued is durable
+        self.durableIndex = -1
+        self.persistLeaderEntries(self.log.lastAppendedEntry + 1)
+
+    def replicateToFollower(self, process) -> None:
+        """Sends a follower the entries from its nextIndex onward, optimistically assuming they will be accepted, in
+        chunks of at most chunkEntries while fewer than replicationWindow chunks are unacknowledged (acks send the
+        rest). A follower already holding every entry is sent an empty AppendEntries to check its log"""
+        nextIndex = self.nextIndex.get(process[0], self.log.lastAppendedEntry + 1)
+        self.lastReplicatedAt[process[0]] = self.scheduler.now()
+        if nextIndex <= self.log.snapshotIndex:
+            # the entries this follower needs were compacted away, so send the snapshot instead
+            self.sendSnapshotChunks(process)
+            return
+        while self.chunksInFlight.get(process[0], 0) < self.replicationWindow:
+            lastIndex = min(nextIndex + self.chunkEntries - 1, self.log.lastAppendedEntry)
+            message = WireCodec.frame("R", self.getLeaderMsg(self.log.getSubLog(nextIndex, lastIndex),
+                                                             nextIndex - 1))
+            self.sendMessage(process, message)
+            self.chunksInFlight[process[0]] = self.chunksInFlight.get(process[0], 0) + 1
+            nextIndex = lastIndex + 1
+            if nextIndex > self.log.lastAppendedEntry:
+                break
+        self.nextIndex[process[0]] = nextIndex
+        self.armRetransmitTimer(process)
+
+    def resumeReplication(self, process) -> None:
+        """Reopens the window of a follower whose acks stopped, as chunks (or acks) were lost, and resumes from
+        where its transfer stood (a follower missing earlier chunks answers with where its log ends)"""
+        self.chunksInFlight[process[0]] = 0
+        self.rewoundTo.pop(process[0], None)
+        transfer = self.snapshotTransfers.get(process[0])
+        if transfer is not None:
+            transfer[2] = transfer[1]
+            transfer[3] = -1
+        self.replicateToFollower(process)
+
+    def getReplicationProgress(self, process) -> tuple:
+        """Returns what a follower has acknowledged so far: its matchIndex and the snapshot match states it holds"""
+        transfer = self.snapshotTransfers.get(process[0])
+        return self.matchIndex.get(process[0], -1), transfer[1] if transfer is not None else -1
+
+    def armRetransmitTimer(self, process) -> None:
+        """Starts a follower's retransmit timer unless it is already running"""
+        retransmitTimer = self.retransmitTimers.get(process[0])
+        if retransmitTimer is None:
+            retransmitTimer = self.retransmitTimers[process[0]] = [None, None, self.retransmitTimeout]
+        elif retransmitTimer[0] is not None:
+            return
+        retransmitTimer[1] = self.getReplicationProgress(process)
+        retransmitTimer[0] = self.scheduler.callLater(retransmitTimer[2], lambda: self.onRetransmitDue(process))
+
+    def onRetransmitDue(self, process) -> None:
+        """Fires retransmitTimeout after a follower was sent chunks: a follower that acked something since gets
+        more time, one that acked nothing is resent its window, and one that has caught up needs no timer"""
+        retransmitTimer = self.retransmitTimers[process[0]]
+        retransmitTimer[0] = None
+        if self.isLeader is False or self.isFailed is True:
+            return
+        if self.matchIndex.get(process[0], -1) >= self.log.lastAppendedEntry:
+            retransmitTimer[2] = self.retransmitTimeout
+            return
+        if self.getReplicationProgress(process) != retransmitTimer[1]:
+            retransmitTimer[2] = self.retransmitTimeout
+            self.armRetransmitTimer(process)
+        else:
+            retransmitTimer[2] = min(retransmitTimer[2] * 2, self.heartRate)
+            self.resumeReplication(process)
+
+    def sendSnapshotChunks(self, process) -> None:
+        """Sends a follower the leader's snapshot, its match states split into chunks of at most chunkMatchStates
+        while fewer than replicationWindow chunks are unacknowledged (starting over if the leader has compacted
+        again since the transfer began)"""
+        matchStates = self.getSnapshotMatchList()
+        transfer = self.snapshotTransfers.get(process[0])
+        if transfer is None or transfer[0] != self.log.snapshotIndex:
+            transfer = self.snapshotTransfers[process[0]] = [self.log.snapshotIndex, 0, 0, -1]
+        while self.chunksInFlight.get(process[0], 0) < self.replicationWindow:
+            transfer[2] = self.sendSnapshotChunk(process, transfer[2])
+            if transfer[2] >= len(matchStates):
+                break
+        self.armRetransmitTimer(process)
+
+    def sendSnapshotChunk(self, process, offset: int) -> int:
+        """Sends a follower the chunk of the snapshot's match states starting at offset, returning where the next
+        chunk starts"""
+        matchStates = self.getSnapshotMatchList()
+        chunk = matchStates[offset:offset + self.chunkMatchStates]
+        snapshotMsg = SnapshotMessage(self.currentTerm, self.log.snapshotIndex, self.log.snapshotTerm,
+                                      self.log.snapshotState, chunk, offset, len(matchStates))
+        self.sendMessage(process, WireCodec.frame("I", self.encodeMessage(snapshotMsg)))
+        self.chunksInFlight[process[0]] = self.chunksInFlight.get(process[0], 0) + 1
+        return offset + len(chunk)
+
+    def hearSnapshotAck(self, follower, followerMsg) -> None:
+        """Advances a follower's snapshot transfer on its ack, which counts the match states it holds from the first
+        on. Once it has installed the snapshot, replication carries on from the entries after it"""
+        transfer = self.snapshotTransfers.get(follower[0])
+        if followerMsg.response is False or transfer is None:
+            return
+        if followerMsg.nextIndex > transfer[0]:
+            del self.snapshotTransfers[follower[0]]
+            self.matchIndex[follower[0]] = max(self.matchIndex[follower[0]], followerMsg.nextIndex - 1)
+            self.nextIndex[follower[0]] = max(self.nextIndex[follower[0]], followerMsg.nextIndex)
+            self.advanceCommitIndex()
+            if self.nextIndex[follower[0]] <= self.log.lastAppendedEntry:
+                self.replicateToFollower(follower)
+            return
+        if followerMsg.snapshotIndex != transfer[0]:
+            return  # An ack of a snapshot the leader has since replaced
+        if followerMsg.snapshotOffset > transfer[1]:
+            transfer[1] = followerMsg.snapshotOffset
+        elif followerMsg.snapshotOffset == transfer[1] < transfer[2] and transfer[3] != transfer[1]:
+            # the follower holds a later chunk but not the one at its offset, which was lost (the follower keeps
+            # chunks that arrive out of order, so only that one is resent)
+            transfer[3] = transfer[1]
+            self.sendSnapshotChunk(follower, transfer[1])
+        if transfer[2] < len(self.getSnapshotMatchList()):
+            self.replicateToFollower(follower)
+
+    def receiveSnapshotChunk(self, snapshotMsg: SnapshotMessage) -> int:
+        """Holds one chunk of a leader's snapshot, returning how many of its match states are now held from the
+        first on (all of them for a snapshot this follower has already installed)"""
+        if snapshotMsg.snapshotIndex <= self.log.snapshotIndex:
+            return snapshotMsg.matchCount
+        snapshotID = (snapshotMsg.snapshotIndex, snapshotMsg.snapshotTerm)
+        if self.pendingSnapshot is None or self.pendingSnapshot[0] != snapshotID:
+            self.pendingSnapshot = [snapshotID, [None] * snapshotMsg.matchCount, 0]
+        matchStates = self.pendingSnapshot[1]
+        matchStates[snapshotMsg.offset:snapshotMsg.offset + len(snapshotMsg.matchStates)] = snapshotMsg.matchStates
+        while self.pendingSnapshot[2] < len(matchStates) and matchStates[self.pendingSnapshot[2]] is not None:
+            self.pendingSnapshot[2] += 1
+        return self.pendingSnapshot[2]
+
+    def getSnapshotMatchList(self) -> list:
+        """Returns the snapshot's match states in a fixed order, so chunk offsets mean the same across messages"""
+        if self.snapshotMatchList[0] != self.log.snapshotIndex:
+            self.snapshotMatchList = (self.log.snapshotIndex, list(self.log.snapshotMatches.values()))
+        return self.snapshotMatchList[1]
+
+    def advanceCommitIndex(self) -> None:
+        """Commits up to the index durable on a majority of servers (the median of the voters' matchIndex and this
+        leader's durableIndex)"""
+        matchIndexes = sorted([matchIndex for name, matchIndex in self.matchIndex.items() if name[0] == "S"] +
+                              [self.durableIndex], reverse=True)
+        majorityIndex = matchIndexes[self.majority - 1]
+        # Only entries from the leader's own term are committed by counting replicas
+        if majorityIndex > self.log.lastCommittedEntry and self.log.getTermAtIndex(majorityIndex) == self.currentTerm:
+            print("Enough Acks received sending commit message... ")
+            # followers learn the new commit index from the next AppendEntries or heartbeat
+            for index in range(self.log.lastCommittedEntry + 1, majorityIndex + 1):
+                self.log.commitEntryToLog()
+                # inform the client of action outcome
+                stateCode = self.log.getStateCodeAtIndex(index)
+                self.committedStateCodes[stateCode >> MATCH_SHIFT] = stateCode
+                self.runNotification(self.announceCommittedState, stateCode, self.entrySequences.pop(index, None))
+            self.persistCommit()
+            self.compactLogIfNeeded()
+            self.observeAppendToCommit()
+            if len(self.pendingReads) > 0:
+                self.serveConfirmedReads()
+            self.serveFencedReads()
+
+    def observeAppendToCommit(self) -> None:
+        """Records the time from appending each batch now committed to its commit"""
+        now = self.scheduler.now()
+        committedBatches = 0
+        for lastIndex, appendedAt in self.appendedAt:
+            if lastIndex > self.log.lastCommittedEntry:
+                break
+            self.metrics.observe("raft_append_to_commit_seconds", now - appendedAt)
+            committedBatches += 1
+        del self.appendedAt[:committedBatches]
+
+    def updateMatches(self, firstWritten, previousLastEntry) -> None:
+        """Points every match at its newest game state once a follower has written entries from firstWritten on"""
+        if firstWritten <= previousLastEntry:
+            # a conflicting suffix was replaced, so a match it touched may now end at an older entry
+            self.matches = self.log.getLatestGameStates()
+        else:
+            for gameState, term in self.log.getSubLog(firstWritten):
+                self.matches[gameState.match] = gameState
+
+    def compactLogIfNeeded(self) -> None:
+        """Folds the committed prefix into a snapshot once it passes the threshold, leaving the snapshot's
+        serialization and the deletion of the segments it covers to the write-ahead log's writer thread"""
+        if self.log.lastCommittedEntry - self.log.snapshotIndex < self.snapshotThreshold:
+            return
+        self.log.compactToCommitted()
+        if self.writeAheadLog is not None:
+            self.writeAheadLog.appendSnapshot(self.log)
+
+    # __________________________________
+    # --------- READ METHODS -----------
+    # ==================================
+    def hearReadQuery(self, message: str, address) -> None:
+        """Answers a client's read query at once while this leader holds a lease, or queues it for the next
+        confirmation round otherwise (a server that is not leader points the client at the leader instead)"""
+        splitData = message.split(DELIMITER)
+        matchID, readID = int(splitData[1]), int(splitData[2])
+        if len(splitData) > 3:
+            # 'Q$<match>$<read ID>$<min commit index>$<max staleness>' may be served by any replica
+            self.hearReplicaRead(matchID, readID, int(splitData[3]),
+                                 float(splitData[4]) if splitData[4] != "" else None, address)
+            return
+        if self.isLeader is False:
+            self.redirectsSent += 1
+            self.sendMessage(address, "L" + DELIMITER + str(self.getKnownLeader()))
+            return
+        if self.scheduler.now() < self.leaseExpiresAt and self.knowsCommitIndex():
+            self.readsServed["lease"] += 1
+            self.answerRead(matchID, readID, address)
+            return
+        # until an entry of this term commits the commit index may trail entries a past leader committed, so such
+        # a read waits for this leader's whole log to commit instead
+        readIndex = self.log.lastCommittedEntry if self.knowsCommitIndex() else self.log.lastAppendedEntry
+        self.pendingReads.append((self.readRound + 1, readIndex, matchID, readID, address, self.scheduler.now()))
+        if len(self.readRoundAcks) == 0:
+            self.startReadRound()
+
+    def hearReplicaRead(self, matchID: int, readID: int, minCommitIndex: int, maxStaleness, address) -> None:
+        """Answers a read any server or learner may serve from its own committed state, once it has committed
+        through minCommitIndex (the commit index of the client's last answer, so its reads never go back in time).
+        Given maxStaleness, a replica that has not held all of the leader's committed entries within that many
+        seconds points the client at the leader instead"""
+        if maxStaleness is not None and self.isLeader is False and \
+                self.scheduler.now() - self.caughtUpAt > maxStaleness:
+            self.redirectsSent += 1
+            self.sendMessage(address, "L" + DELIMITER + str(self.getKnownLeader()))
+            return
+        self.fencedReads.append((minCommitIndex, matchID, readID, address))
+        self.serveFencedReads()
+
+    def serveFencedReads(self) -> None:
+        """Answers every replica read whose minimum commit index this node has committed through"""
+        if len(self.fencedReads) == 0:
+            return
+        waiting = []
+        for read in self.fencedReads:
+            if read[0] <= self.log.lastCommittedEntry:
+                self.readsServed["replica"] += 1
+                self.answerRead(read[1], read[2], read[3])
+            else:
+                waiting.append(read)
+        self.fencedReads = waiting
+
+    def startReadRound(self) -> None:
+        """Asks every follower to confirm this node is still their leader, covering every read queued so far (a
+        round acked by no majority within retransmitTimeout is replaced by a new one)"""
+        self.readRound += 1
+        readRound = self.readRound
+        self.readRoundAcks[readRound] = set()
+        self.readRoundSentAt[readRound] = self.scheduler.now()
+        if self.majority <= 1:
+            self.confirmReadRound(readRound)
+            return
+        # with adaptive timing the round also tells followers the heartbeat interval to derive timeouts from
+        self.messageServers("C_" + str(self.currentTerm) + "_" + str(readRound) +
+                            ("_" + str(self.heartRate) if self.adaptiveTiming else ""))
+        self.scheduler.callLater(self.retransmitTimeout, lambda: self.retryReadRound(readRound))
+
+    def retryReadRound(self, readRound: int) -> None:
+        """Starts a new confirmation round if readRound is the latest and has still not been acked by a majority"""
+        if self.isLeader is True and self.isFailed is False and readRound == self.readRound and \
+                readRound in self.readRoundAcks:
+            self.startReadRound()
+
+    def hearReadConfirmation(self, readRound: int, follower) -> None:
+        """Counts a follower's ack of a confirmation round, confirming it once a majority (with this node) acked"""
+        acks = self.readRoundAcks.get(readRound)
+        if acks is None:
+            return  # A round already confirmed (or superseded by a later confirmed one)
+        acks.add(follower[0])
+        if len(acks) + 1 >= self.majority:
+            self.confirmReadRound(readRound)
+
+    def confirmReadRound(self, readRound: int) -> None:
+        """Records that this node was leader when readRound was sent, renewing its lease from that time and
+        answering every read queued by then"""
+        if self.leaseDuration is not None and self.transferTarget is None:
+            self.leaseExpiresAt = max(self.leaseExpiresAt, self.readRoundSentAt[readRound] +
+                                      self.leaseDuration * (1 - CLOCK_DRIFT_BOUND))
+        for pendingRound in list(self.readRoundAcks):
+            if pendingRound <= readRound:
+                del self.readRoundAcks[pendingRound]
+                del self.readRoundSentAt[pendingRound]
+        self.confirmedReadRound = max(self.confirmedReadRound, readRound)
+        self.serveConfirmedReads()
+        # reads that arrived while this round was out wait for one sent after them
+        if len(self.pendingReads) > 0 and len(self.readRoundAcks) == 0:
+            self.startReadRound()
+
+    def serveConfirmedReads(self) -> None:
+        """Answers every queued read whose confirmation round was acked and whose read index has committed"""
+        now = self.scheduler.now()
+        waiting = []
+        for read in self.pendingReads:
+            if read[0] <= self.confirmedReadRound and read[1] <= self.log.lastCommittedEntry and \
+                    self.knowsCommitIndex():
+                self.readsServed["read_index"] += 1
+                self.readTimes.observe(now - read[5])
+                self.answerRead(read[2], read[3], read[4])
+            else:
+                waiting.append(read)
+        self.pendingReads = waiting
+
+    def answerRead(self, matchID: int, readID: int, address) -> None:
+        """Sends a client the committed state of a match (a match with no entries yet is in its initial state) and
+        the commit index it is as of"""
+        stateCode = self.committedStateCodes.get(matchID)
+        if stateCode is None:
+            stateCode = GameState(matchID).getStateCode()
+        self.sendMessage(address, WireCodec.encodeReadResult(readID, stateCode, self.log.lastCommittedEntry))
+
+    def knowsCommitIndex(self) -> bool:
+        """Returns whether this leader's commit index is known to be the cluster's: an entry of its own term has
+        committed, or every entry in its log has"""
+        return self.log.getTermAtIndex(self.log.lastCommittedEntry) == self.currentTerm or \
+            self.log.lastCommittedEntry == self.log.lastAppendedEntry
+
+    def applyCommittedStates(self, firstIndex: int) -> None:
+        """Points every match at its newest committed state after the entries from firstIndex on committed"""
+        for index in range(max(firstIndex, self.log.snapshotIndex + 1), self.log.lastCommittedEntry + 1):
+            stateCode = self.log.getStateCodeAtIndex(index)
+            self.committedStateCodes[stateCode >> MATCH_SHIFT] = stateCode
+
+    def resetReadState(self) -> None:
+        """Drops queued reads, unconfirmed rounds and the lease when this node starts or stops leading (clients
+        resend unanswered reads)"""
+        self.pendingReads = []
+        self.readRoundAcks = {}
+        self.readRoundSentAt = {}
+        self.confirmedReadRound = self.readRound
+        self.leaseExpiresAt = -math.inf
 
     # _______________________________________
     # --------- MESSAGING METHODS -----------
     # =======================================
-    def sendMessage(self, recipientAddressing, message: str) -> None:
-        """Sends a message as a string to a recipient"""
-        self.socket.sendto(message.encode("utf-8"), (recipientAddressing[1], recipientAddressing[2]))
+    def sendMessage(self, recipientAddressing, message) -> None:
+        """Sends a message as a string (or already encoded bytes) to a recipient"""
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        self.transport.sendto(message, (recipientAddressing[1], recipientAddressing[2]))
         # print("\nMessage sent to " + recipientAddressing[0] + " at " + recipientAddressing[1] + ":" + str(recipientAddressing[2]) + "...\n")
 
-    def messageServers(self, message: str) -> None:
-        """ Multicasts messages to all servers """
+    def messageServers(self, message) -> None:
+        """ Multicasts messages to all voting servers (in one send to the multicast group when there is one, where
+        learners ignore them) """
+        if self.multicastAddress is not None:
+            self.sendMessage((None,) + self.multicastAddress, message)
+            return
+        for process in self.group:
+            if self.isVoter(process):  # Multicast to voting servers
+                self.sendMessage(process, message)
+
+    def messageReplicas(self, message) -> None:
+        """ Multicasts messages to all servers and learners (in one send to the multicast group when there is one) """
+        if self.multicastAddress is not None:
+            self.sendMessage((None,) + self.multicastAddress, message)
+            return
         for process in self.group:
-            if process[0][0] == "S":  # Multicast to servers
+            if self.isReplica(process):
                 self.sendMessage(process, message)
 
-    def messageClients(self, message: str) -> None:
+    def messageClients(self, message) -> None:
         """Multicasts a message just to the clients"""
         for process in self.group:
             if process[0][0] == "C":  # Multicast to clients
                 self.sendMessage(process, message)
 
+    def announceCommittedState(self, stateCode: int, sequence: int = None) -> None:
+        """Prints a committed game state's outcome and sends it to the clients, packed or rendered, with the sequence
+        number of the action behind it when this leader appended it ('outcome$graphic$match$sequence')"""
+        committedState = GameState.fromStateCode(stateCode)
+        self.announceOutcome(committedState)
+        if self.compactClientStates:
+            self.messageClients(WireCodec.encodeClientState(stateCode, sequence))
+        else:
+            gamestateGraphic = GameState.getGraphicForStateCode(stateCode)
+            message = committedState.outcome + DELIMITER + gamestateGraphic + DELIMITER + str(committedState.match)
+            if sequence is not None:
+                message += DELIMITER + str(sequence)
+            self.messageClients(message)
+
+    def runOnProtocolThread(self, function, *arguments) -> None:
+        """Hands a call made on another thread (e.g. the write-ahead log's) to the pipeline's protocol stage, or
+        without a pipeline to the scheduler, whose clock thread takes the state lock (or whose event loop runs it)"""
+        if self.pipeline is not None:
+            self.pipeline.protocol.putUrgent(function, *arguments)
+        else:
+            self.scheduler.callSoon(lambda: function(*arguments))
+
+    def runNotification(self, function, *arguments) -> None:
+        """Hands a client notification to the pipeline's notify stage (waiting for room, as outcomes must not be
+        lost), or runs it right away without a pipeline"""
+        if self.pipeline is not None:
+            self.pipeline.notify.put(function, *arguments)
+        else:
+            function(*arguments)
+
     # ____________________________________
     # --------- HELPER METHODS -----------
     # ====================================
     def startThreads(self) -> None:
-        """Boots-up both the sender and receiver threads"""
-        self.senderThread = Thread(target=self.mainOutgoingLoop, args=())
-        self.senderThread.start()
+        """Boots-up the receiver (and multicast receiver), test command and clock (timer scheduler) threads, or the
+        pipeline's stages in their place"""
+        if self.usePipeline:
+            self.pipeline = ServerPipeline(self)
+            self.pipeline.start()
+            self.testCommandThread = Thread(target=self.testCommandLoop, args=())
+            self.testCommandThread.start()
+            self.pipeline.protocol.putUrgent(self.joinReadinessBarrier)
+            return
         self.receiverThread = Thread(target=self.mainIncomingLoop, args=())
         self.receiverThread.start()
+        if self.multicastSocket is not None:
+            self.multicastThread = Thread(target=self.mainMulticastLoop, args=())
+            self.multicastThread.start()
         self.testCommandThread = Thread(target=self.testCommandLoop, args=())
         self.testCommandThread.start()
         self.clockThread = Thread(target=self.mainClockLoop, args=())
         self.clockThread.start()
+        with self.stateLock:
+            self.joinReadinessBarrier()
 
-    def announceOutcome(self) -> None:
+    @staticmethod
+    def announceOutcome(gameState: GameState) -> None:
         """Concatenates the outcome details and prints them"""
         robot = "RED "
-        if self.currentGameState.outcome[-1] == "1":
+        if gameState.outcome[-1] == "1":
             robot = "BLUE "
         outcome = "was unaffected!"
-        if self.currentGameState.outcome[0] == "B":
+        if gameState.outcome[0] == "B":
             outcome = "blocked the punch!"
-        elif self.currentGameState.outcome[0] == "K":
+        elif gameState.outcome[0] == "K":
             outcome = "was KNOCKED OUT!\n\n\tGAME OVER!!!"
         print(robot + outcome)
 
@@ -400,10 +1411,79 @@ class Server:
         print(robot + action + hand)
 
     @staticmethod
-    def getRandomTimeout(lb: int, ub: int) -> int:
-        """Returns a random timeout duration for follower nodes"""
-        random.seed()
-        return random.randint(lb, ub)
+    def getRandomTimeout(lb: float, ub: float) -> float:
+        """Returns a random timeout duration in seconds (with millisecond resolution) for follower nodes"""
+        return random.randint(round(lb * 1000), round(ub * 1000)) / 1000
+
+    @classmethod
+    def parseAction(cls, message: str):
+        """Splits a client's action message into the action and the ID of its match (match 0 if none is given),
+        returning None for an unknown action, a match ID outside [0, MATCH_LIMIT) or a malformed sequence number"""
+        body, delimiter, sequence = message.partition(SEQUENCE_DELIMITER)
+        if delimiter != "" and not cls.isNumber(sequence.rstrip(RETRY_MARK)):
+            return None
+        action, delimiter, matchID = body.partition(MATCH_DELIMITER)
+        if delimiter == "":
+            matchID = "0"
+        if action not in ACTIONS[1:] or not cls.isNumber(matchID) or int(matchID) >= MATCH_LIMIT:
+            return None
+        return action, int(matchID)
+
+    @staticmethod
+    def getActionSequence(message: str):
+        """Returns the sequence number of a client's action message (None if it was sent without one)"""
+        sequence = message.partition(SEQUENCE_DELIMITER)[2].rstrip(RETRY_MARK)
+        return int(sequence) if sequence != "" else None
+
+    @staticmethod
+    def isNumber(text: str) -> bool:
+        """Returns whether a message field is a non-negative decimal integer"""
+        return text.isascii() and text.isdigit()
+
+    def takeClientSequence(self, message: str) -> bool:
+        """Returns whether a client action may be applied, recording its sequence number if so. A first send always
+        may. A resend after the client's timeout may have been applied with only its outcome lost, so it may only
+        if this leader took an earlier action of the same player in its term and not this one (actions of a player
+        reach the leader in order); otherwise it may have been applied here or by an earlier leader"""
+        body, delimiter, sequence = message.partition(SEQUENCE_DELIMITER)
+        if delimiter == "":
+            return True  # Sent without a sequence number (e.g. by a benchmark)
+        action, matchID = self.parseAction(body)
+        key = (matchID, action[0])
+        isRetry = sequence.endswith(RETRY_MARK)
+        sequence = int(sequence.rstrip(RETRY_MARK))
+        if isRetry and (key not in self.clientSequences or sequence <= self.clientSequences[key]):
+            return False
+        self.clientSequences[key] = sequence
+        return True
+
+    def getMatchState(self, matchID: int) -> GameState:
+        """Returns the current game state of a match, starting a new match the first time its ID is seen"""
+        if matchID not in self.matches:
+            self.matches[matchID] = GameState(matchID)
+        return self.matches[matchID]
+
+    def getKnownLeader(self) -> int:
+        """Returns the ID of the leader this follower last heard of, or -1 if it knows of none"""
+        if self.currentLeader == self.id:
+            return -1  # This node has stepped down since it last led
+        return self.currentLeader
+
+    @staticmethod
+    def isVoter(process) -> bool:
+        """Returns whether a networking tuple is a voting server's"""
+        return process[0][0] == "S"
+
+    @staticmethod
+    def isReplica(process) -> bool:
+        """Returns whether a networking tuple is a server's or a learner's, i.e. a process replicated to"""
+        return process[0][0] == "S" or process[0][0] == "L"
+
+    def getProcessByAddress(self, address) -> tuple:
+        """Returns the networking tuple of the group member sending from the given address"""
+        for process in self.group:
+            if process[1] == address[1] and process[2] == address[2]:
+                return process
 
     def getProcessAddressing(self, recipientID: str) -> tuple:
         """Returns the networking tuple with the recipient's ID"""
@@ -411,73 +1491,154 @@ class Server:
             if process[0][-1] == recipientID:
                 return process
 
-    def startCompleteCluster(self) -> None:
-        """Brings complete server cluster online at once"""
-        isReady = input("Start server cluster? (Y/N)\n-> ")
-        if isReady == "y" or isReady == "Y" or isReady == "yes" or isReady == "YES":
+    def registerGauges(self) -> None:
+        """Registers the gauges read from this server's state whenever the metrics are read"""
+        self.metrics.registerGauge("raft_current_term", lambda: self.currentTerm)
+        self.metrics.registerGauge("raft_cluster_ready", lambda: 1 if self.clusterReady else 0)
+        # 0 follower, 1 candidate, 2 leader, 3 learner
+        self.metrics.registerGauge("raft_role", lambda: 3 if self.isLearner else 2 if self.isLeader else
+                                   1 if self.isCandidate else 0)
+        self.metrics.registerGauge("raft_log_length", lambda: self.log.lastAppendedEntry + 1)
+        self.metrics.registerGauge("raft_commit_index", lambda: self.log.lastCommittedEntry)
+        self.metrics.registerGauge("raft_commit_lag", lambda: self.log.lastAppendedEntry - self.log.lastCommittedEntry)
+        self.metrics.registerGauge("raft_heartbeat_period_seconds", lambda: self.heartRate)
+        self.metrics.registerGauge("raft_election_timeout_seconds", lambda: self.timeout)
+        self.metrics.registerGauge("raft_smoothed_rtt_seconds", lambda: self.smoothedRoundTrip or 0)
+
+    def markClusterReady(self) -> None:
+        """Marks the cluster as started and arms the election timer (once), passing the readiness barrier"""
+        if self.clusterReady is False:
             self.clusterReady = True
-            for process in self.group:
-                if process[0][0] == "S":
-                    self.sendMessage(process, "S")
+            self.scheduler.cancel(self.barrierTimer)
+            self.barrierTimer = None
+            self.resetElectionTimer()
+            self.clusterReadyEvent.set()
 
     def checkForLogInconsistency(self, leaderMsg):
-        """ If there is a log inconsistency return True """
-        acked = False
-        # if the term is incorrect we need to send correct log
-        if self.currentTerm < leaderMsg.currentTerm:
-            acked = True
-            self.currentTerm = leaderMsg.currentTerm
-            self.isLeader = False
-            self.isCandidate = False
-            self.isFollower = False
-            self.log.nextIndex -= 1
-        # if we have logs of equal length but this log has been recording incorrect entries send correct log
-        elif len(self.log.logList) > self.log.nextIndex and self.log.nextIndex != -1:
-            if (self.log.logList[self.log.nextIndex])[1] != leaderMsg.prevLogTerm:
-                acked = True
-                self.log.removeItemsFromIndextoEnd(self.log.nextIndex)
-                self.log.nextIndex -= 1
-        elif len(self.log.logList) > self.log.lastAppendedEntry and self.log.lastAppendedEntry != -1:
-            if (self.log.logList[self.log.lastAppendedEntry])[1] != leaderMsg.prevLogTerm:
-                acked = True
-                self.log.removeItemsFromIndextoEnd(self.log.nextIndex)
-                self.log.nextIndex -= 1
-        return acked
+        """ If this log does not hold the leader's previous entry (with a matching term) return True """
+        if leaderMsg.prevLogIndex <= self.log.snapshotIndex:
+            return False  # Entries up to the snapshot are committed, so they match the leader's
+        if leaderMsg.prevLogIndex > self.log.lastAppendedEntry:
+            return True
+        return self.log.getTermAtIndex(leaderMsg.prevLogIndex) != leaderMsg.prevLogTerm
+
+    @staticmethod
+    def parseTerm(data: bytes) -> int:
+        """Returns the term carried by a vote or election win message ('Y_<term>_<id>')"""
+        return int(data.decode("utf-8").split("_")[1])
 
     def parseIncomingData(self, data):
         """ Splits the data by the Delimiter and returns the list """
         splitData = data.split(DELIMITER)
         return splitData
 
-    def getLeaderMsg(self, entries):
-        """ returns the encoded jsonpickle of leader message to send to servers """
+    def decodeMessage(self, data: bytes):
+        """ unframes and decodes a Raft message, timing the decode """
+        if type(data) is FramedMessage:
+            return data.message
+        start = time.perf_counter()
+        message = WireCodec.decode(WireCodec.unframe(data))
+        self.decodeTimes.observe(time.perf_counter() - start)
+        return message
+
+    def encodeMessage(self, message) -> bytes:
+        """ encodes a Raft message in the configured encoding, timing the encode """
+        if self.passMessageObjects and type(message) is not SnapshotMessage:
+            return message
+        start = time.perf_counter()
+        encoded = WireCodec.encode(message, self.useBinaryCodec)
+        self.encodeTimes.observe(time.perf_counter() - start)
+        return encoded
+
+    def getLeaderMsg(self, entries, prevLogIndex):
+        """ returns the encoded leader message carrying the entries that follow prevLogIndex """
         newMessage = LeaderMessage(self.currentTerm, entries, self.log.lastCommittedEntry, self.log.lastAppendedEntry,
-                                   self.prevLogTerm, self.log.prevLogIndex, self.log.nextIndex)
-        return jsonpickle.encode(newMessage)
+                                   self.log.getTermAtIndex(prevLogIndex), prevLogIndex, prevLogIndex + 1)
+        return self.encodeMessage(newMessage)
 
-    def getFollowerResponseMsg(self, response):
-        """ returns the encoded jsonpickle of follower response message to send to leader """
-        newMessage = FollowerMessage(self.currentTerm, response, self.log.lastCommittedEntry, self.log.nextIndex)
-        return jsonpickle.encode(newMessage)
+    def getFollowerResponseMsg(self, response, nextIndex, conflictTerm=-1, snapshotIndex=-1, snapshotOffset=-1):
+        """ returns the encoded follower response message to send to leader, where nextIndex is one past the last
+        entry known to match on success, or on failure the conflict index the leader should back off to (the first
+        entry of conflictTerm, or one past the end of a log too short to have conflictTerm -1). Snapshot acks also
+        carry the snapshot's index and how many of its match states are held """
+        newMessage = FollowerMessage(self.currentTerm, response, self.log.lastCommittedEntry, nextIndex,
+                                     conflictTerm, -1 if response else nextIndex, snapshotIndex, snapshotOffset)
+        return self.encodeMessage(newMessage)
 
     def getElectionMessage(self):
-        """ returns the encoded jsonpickle of an election message"""
-        newMessage = ElectionMessage(self.id, self.currentTerm, self.log.lastCommittedEntry,
-                                     self.log.getTermAtIndex(self.log.lastCommittedEntry))
-        return jsonpickle.encode(newMessage)
+        """ returns the encoded election message"""
+        newMessage = ElectionMessage(self.id, self.currentTerm, self.log.lastAppendedEntry,
+                                     self.log.getTermAtIndex(self.log.lastAppendedEntry))
+        return self.encodeMessage(newMessage)
+
+    def persistEntries(self, firstIndex, onDurable=None):
+        """ queues the log entries from firstIndex onward in the write-ahead log (entries only reach the old
+        backup file on commit) """
+        if self.writeAheadLog is not None:
+            self.writeAheadLog.appendEntries(firstIndex, self.log.getSubLog(firstIndex), onDurable)
+        elif onDurable is not None:
+            onDurable()
+
+    def persistLeaderEntries(self, firstIndex):
+        """ queues the entries this leader appended from firstIndex onward, which count toward a majority only once
+        they are durable here too (the write-ahead log's callback is handed back to the thread running the protocol) """
+        lastIndex, term = self.log.lastAppendedEntry, self.currentTerm
+        if self.writeAheadLog is None:
+            self.hearEntriesDurable(lastIndex, term)
+        else:
+            self.persistEntries(firstIndex, lambda: self.runOnProtocolThread(self.hearEntriesDurable, lastIndex, term))
+
+    def hearEntriesDurable(self, lastIndex, term):
+        """ moves this leader's durableIndex up to lastIndex, committing whatever that gives a majority (ignored
+        once the term that appended the entries is over, as a later leader may have replaced them) """
+        if self.isLeader and term == self.currentTerm and lastIndex > self.durableIndex:
+            self.durableIndex = lastIndex
+            self.advanceCommitIndex()
+
+    def persistTermAndVote(self, onDurable=None):
+        """ records the current term and whether this node has voted in it in the write-ahead log, calling onDurable
+        once that is durable (later entry acks follow it on disk) """
+        if self.writeAheadLog is not None:
+            self.writeAheadLog.appendVote(self.currentTerm, self.hasVoted, onDurable)
+        elif onDurable is not None:
+            onDurable()
+
+    def persistCommit(self):
+        """ records the commit index, appending one record to the write-ahead log or rewriting the old backup """
+        if self.writeAheadLog is not None:
+            self.writeAheadLog.appendCommit(self.log.lastCommittedEntry)
+        else:
+            self.writeLogtoFile()
 
     def writeLogtoFile(self):
-        """ pickles the entire log and writes it to file """
-        f = open(self.backupPath, 'w+')
-        f.write(jsonpickle.encode(self.log))
-        f.close()
+        """ writes the entire log to file, as an indexed backup or pickled """
+        start = time.perf_counter()
+        if self.useIndexedBackup:
+            IndexedBackup.write(self.log, self.backupPath, self.matches)
+        else:
+            f = open(self.backupPath, 'w+')
+            f.write(jsonpickle.encode(self.log))
+            f.close()
+        self.metrics.observe("raft_write_log_to_file_seconds", time.perf_counter() - start)
 
     def loadAndRecoverLog(self):
         """ decodes the recovered log and replaces the old log """
-        f = open(self.backupPath, 'r')
-        pickledLog = f.read()
-        self.log = jsonpickle.decode(pickledLog)
-        f.close()
+        if self.writeAheadLog is not None:
+            self.log = self.writeAheadLog.recoverLog()
+            self.matches = self.log.getLatestGameStates()
+        elif IndexedBackup.isIndexedBackup(self.backupPath):
+            # the trailer restores the indexes and match states without decoding a single entry
+            self.log, self.matches = IndexedBackup.read(self.backupPath)
+        else:
+            f = open(self.backupPath, 'r')
+            pickledLog = f.read()
+            # backups written before snapshots existed lack the snapshot attributes, so start from a fresh log
+            self.log = Log()
+            self.log.__dict__.update(jsonpickle.decode(pickledLog).__dict__)
+            self.log.rebuildTermIndex()  # jsonpickle turns the term index's int keys into strings
+            f.close()
+            self.matches = self.log.getLatestGameStates()
+        self.committedStateCodes = self.log.getCommittedStateCodes()
 
     def createOnlyThreeServerGroup(self) -> None:
         """Selects only p2, p3, and p4 to be in the group for easier testing"""
@@ -0,0 +1,166 @@
+# _______________________________________
+# --------- SERVER PIPELINE CLASSES -----
+# =======================================
+import socket
+import time
+from collections import deque
+from threading import Condition, Thread
+
+from WireCodec import MAX_DATAGRAM
+
+# Message types clients send (actions and read queries); these are shed once the protocol stage is full, while
+# Raft messages may use RAFT_HEADROOM more items first, as losing them costs retransmissions and elections. Nothing
+# ever blocks a receive thread, so a stage that stops draining cannot stall the socket behind it
+CLIENT_MESSAGE_TYPES = (b"0", b"1", b"Q")
+PROTOCOL_CAPACITY = 4096
+RAFT_HEADROOM = 1024
+NOTIFY_CAPACITY = 4096
+# Bytes of kernel receive buffer asked for on each socket, so bursts wait there while the receive thread is not
+# scheduled (the kernel caps it at net.core.rmem_max)
+RECEIVE_BUFFER_BYTES = 4 * 1024 * 1024
+
+
+class PipelineStage:
+    """Class running one stage of a server's pipeline: a bounded queue of work items, each a function and its
+    arguments, drained in arrival order by a worker thread of its own. A full queue either drops what is offered to
+    it (counted as shed load) or makes the producer wait (counted as backpressure)"""
+
+    # CONSTRUCTOR
+    def __init__(self, name: str, capacity: int, metrics):
+        self.name = name
+        self.capacity = capacity
+        self.condition = Condition()
+        self.items = deque()  # (time queued, function, arguments) of every item not yet run
+        self.highWater = 0  # Deepest the queue has been
+        self.thread = None
+        self.dropped = metrics.getCounter("raft_pipeline_dropped_total")  # Counts by stage
+        self.blocked = metrics.getCounter("raft_pipeline_blocked_total")  # Counts by stage
+        self.failed = metrics.getCounter("raft_pipeline_failed_total")  # Counts by stage
+        self.waitTimes = metrics.getHistogram("raft_pipeline_" + name + "_wait_seconds")
+        metrics.registerGauge("raft_pipeline_" + name + "_depth", lambda: len(self.items))
+        metrics.registerGauge("raft_pipeline_" + name + "_high_water", lambda: self.highWater)
+
+    # ______________________________________
+    # --------- QUEUEING METHODS -----------
+    # ======================================
+    def offer(self, function, *arguments, headroom: int = 0) -> bool:
+        """Queues an item unless the stage holds its capacity (plus headroom) already, returning whether it was
+        queued"""
+        with self.condition:
+            if len(self.items) >= self.capacity + headroom:
+                self.dropped[self.name] += 1
+                return False
+            self.enqueue(function, arguments)
+            return True
+
+    def put(self, function, *arguments) -> None:
+        """Queues an item, waiting for room while the stage is full"""
+        with self.condition:
+            if len(self.items) >= self.capacity:
+                self.blocked[self.name] += 1
+                while len(self.items) >= self.capacity:
+                    self.condition.wait()
+            self.enqueue(function, arguments)
+
+    def putUrgent(self, function, *arguments) -> None:
+        """Queues an item even past the stage's capacity (timers and test commands, which must never be lost or
+        hold up the thread producing them)"""
+        with self.condition:
+            self.enqueue(function, arguments)
+
+    def enqueue(self, function, arguments: tuple) -> None:
+        self.items.append((time.perf_counter(), function, arguments))
+        self.highWater = max(self.highWater, len(self.items))
+        self.condition.notify_all()
+
+    # _________________________________
+    # --------- RUN METHODS -----------
+    # =================================
+    def start(self) -> None:
+        self.thread = Thread(target=self.runLoop, args=(), daemon=True)
+        self.thread.start()
+
+    def runLoop(self) -> None:
+        """Runs an infinite loop taking the oldest item (waking any producer waiting for room) and running it. An
+        item that raises (e.g. a malformed datagram) is reported and skipped, so it cannot stop the stage"""
+        while True:
+            with self.condition:
+                while len(self.items) == 0:
+                    self.condition.wait()
+                queuedAt, function, arguments = self.items.popleft()
+                self.condition.notify_all()
+            self.waitTimes.observe(time.perf_counter() - queuedAt)
+            try:
+                function(*arguments)
+            except Exception as error:
+                self.failed[self.name] += 1
+                print("The " + self.name + " stage skipped an item that raised " + repr(error) + "\n")
+
+
+class ServerPipeline:
+    """Class running a server as a pipeline of threads: receive threads only drain the sockets into the bounded
+    protocol stage, whose one thread runs every message handler, timer callback and test command in arrival order
+    (so no two ever touch the server's state at once), and client notifications (printing, rendering and sending
+    committed outcomes) go to a notify stage of their own. Persistence already runs on the write-ahead log's
+    group-commit thread, whose backlog is reported as the persist stage's depth"""
+
+    # CONSTRUCTOR
+    def __init__(self, server, protocolCapacity: int = PROTOCOL_CAPACITY, notifyCapacity: int = NOTIFY_CAPACITY):
+        self.server = server
+        self.protocol = PipelineStage("protocol", protocolCapacity, server.metrics)
+        self.notify = PipelineStage("notify", notifyCapacity, server.metrics)
+        self.receiverThreads = []
+        server.metrics.registerGauge("raft_pipeline_persist_depth", self.getPersistDepth)
+
+    # _________________________________
+    # --------- RUN METHODS -----------
+    # =================================
+    def start(self, daemon: bool = False) -> None:
+        """Starts the stages, a receive thread per socket and the clock thread, which hands due timers to the
+        protocol stage instead of running them itself (daemon threads let a process hosting servers for a while,
+        e.g. a benchmark, exit while they run)"""
+        self.protocol.start()
+        self.notify.start()
+        self.startReceiver(self.server.socket, self.server.handleMessage, daemon)
+        if self.server.multicastSocket is not None:
+            self.startReceiver(self.server.multicastSocket, self.server.handleMulticast, daemon)
+        self.server.clockThread = Thread(target=self.server.scheduler.run, args=(self.dispatchTimer,), daemon=daemon)
+        self.server.clockThread.start()
+
+    def startReceiver(self, receiverSocket, handler, daemon: bool) -> None:
+        receiverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+        receiverThread = Thread(target=self.receiveLoop, args=(receiverSocket, handler), daemon=daemon)
+        receiverThread.start()
+        self.receiverThreads.append(receiverThread)
+
+    def receiveLoop(self, receiverSocket, handler) -> None:
+        """Runs an infinite loop draining a socket into the protocol stage, shedding client messages once the stage
+        is full and Raft messages once its headroom is used up too"""
+        while True:
+            data, address = receiverSocket.recvfrom(MAX_DATAGRAM)
+            if data[:1] in CLIENT_MESSAGE_TYPES:
+                self.protocol.offer(handler, data, address)
+            else:
+                self.protocol.offer(handler, data, address, headroom=RAFT_HEADROOM)
+
+    def dispatchTimer(self, timer: list) -> None:
+        """Hands a due timer to the protocol stage (called on the clock thread)"""
+        self.protocol.putUrgent(self.runTimer, timer)
+
+    @staticmethod
+    def runTimer(timer: list) -> None:
+        """Runs a timer's callback unless it was cancelled while it waited in the protocol stage"""
+        callback = timer[2]
+        if callback is not None:
+            timer[2] = None
+            callback()
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    def getPersistDepth(self) -> int:
+        """Returns the batches of records queued in the write-ahead log and not yet synced"""
+        writeAheadLog = self.server.writeAheadLog
+        if writeAheadLog is None:
+            return 0
+        return writeAheadLog.batchesQueued - writeAheadLog.batchesDurable
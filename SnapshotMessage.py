@@ -0,0 +1,11 @@
+class SnapshotMessage:
+    def __init__(self, currentTerm, snapshotIndex, snapshotTerm, gameState, matchStates=None, offset=0,
+                 matchCount=None):
+        self.currentTerm = currentTerm
+        self.snapshotIndex = snapshotIndex
+        self.snapshotTerm = snapshotTerm
+        self.gameState = gameState
+        self.matchStates = matchStates
+        # Position of matchStates among all of the snapshot's match states, which may span several messages
+        self.offset = offset
+        self.matchCount = matchCount if matchCount is not None else len(matchStates or [gameState])
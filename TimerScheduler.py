@@ -0,0 +1,63 @@
+# _________________________________________
+# --------- TIMER SCHEDULER CLASS ---------
+# =========================================
+import heapq
+import itertools
+import time
+from threading import Condition
+
+
+class TimerScheduler:
+    """Class running callbacks at monotonic-clock deadlines, kept in a heap, from a single thread that sleeps on a
+    condition until the earliest deadline (or until an earlier timer is scheduled)"""
+
+    # CONSTRUCTOR
+    def __init__(self):
+        self.condition = Condition()
+        self.timers = []  # Heap of [deadline, sequence number, callback] entries
+        self.sequence = itertools.count()  # Breaks ties so equal deadlines run in scheduling order
+
+    # _______________________________________
+    # --------- SCHEDULING METHODS ----------
+    # =======================================
+    @staticmethod
+    def now() -> float:
+        """Returns the current monotonic time in seconds"""
+        return time.monotonic()
+
+    def callLater(self, delay: float, callback) -> list:
+        """Schedules callback to run after delay seconds, returning a handle that can be cancelled"""
+        timer = [self.now() + delay, next(self.sequence), callback]
+        with self.condition:
+            heapq.heappush(self.timers, timer)
+            # Only wake the scheduler thread if this timer is now the earliest
+            if self.timers[0] is timer:
+                self.condition.notify()
+        return timer
+
+    def callSoon(self, callback) -> list:
+        """Schedules callback to run as soon as possible, from any thread (e.g. the write-ahead log's)"""
+        return self.callLater(0, callback)
+
+    @staticmethod
+    def cancel(timer) -> None:
+        """Cancels a scheduled timer (a no-op if it already ran or was never scheduled)"""
+        if timer is not None:
+            timer[2] = None
+
+    def run(self, dispatch=None) -> None:
+        """Runs an infinite loop sleeping until the earliest deadline and firing every timer that is due (or, given
+        dispatch, handing each due timer to it to run elsewhere)"""
+        while True:
+            with self.condition:
+                while len(self.timers) == 0 or self.timers[0][0] > self.now():
+                    if len(self.timers) == 0:
+                        self.condition.wait()
+                    else:
+                        self.condition.wait(self.timers[0][0] - self.now())
+                timer = heapq.heappop(self.timers)
+            if timer[2] is not None:
+                if dispatch is None:
+                    timer[2]()
+                else:
+                    dispatch(timer)
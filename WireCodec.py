@@ -0,0 +1,214 @@
+# ____________________________________
+# --------- WIRE CODEC CLASS ---------
+# ====================================
+import struct
+
+import jsonpickle
+
+from ElectionMessage import ElectionMessage
+from FollowerMessage import FollowerMessage
+from GameState import GameState
+from LeaderMessage import LeaderMessage
+from SnapshotMessage import SnapshotMessage
+
+DELIMITER = b"$"
+MAX_DATAGRAM = 16384  # Receive buffer of every process, so no datagram may be longer
+JSON_ITEM_BYTES = 320  # Upper bound on one jsonpickled log entry or match state
+JSON_OVERHEAD = 1024  # Upper bound on the rest of a jsonpickled message
+
+# ENCODING: Every binary payload starts with a magic byte (never '{', so jsonpickle payloads are told apart),
+# a codec version, and the kind of message that follows
+MAGIC = 0xB7
+VERSION = 4  # Version 2 widened state codes to 32 bits to carry the match ID, 3 added follower conflict hints, 4
+# split snapshots over several messages (match state offsets and snapshot acks)
+KIND_LEADER = 1
+KIND_FOLLOWER = 2
+KIND_ELECTION = 3
+KIND_SNAPSHOT = 4
+
+# ENCODING: Leader entries are either absent, a single game state, or a list of (game state, term) log entries
+ENTRIES_NONE = 0
+ENTRIES_STATE = 1
+ENTRIES_LIST = 2
+
+HEADER = struct.Struct("<BBB")
+LEADER_BODY = struct.Struct("<qqqqqqB")
+FOLLOWER_BODY = struct.Struct("<q?qqqqqq")
+ELECTION_BODY = struct.Struct("<qqqq")
+SNAPSHOT_BODY = struct.Struct("<qqqIII")
+STATE_CODE = struct.Struct("<I")
+ENTRY_COUNT = struct.Struct("<I")
+LOG_ENTRY = struct.Struct("<II")
+READ_RESULT = struct.Struct("<IIq")
+CLIENT_SEQUENCE = struct.Struct("<Q")
+
+
+class FramedMessage(bytes):
+    """Class standing in for a framed Raft message that is handed over in memory unencoded (the simulator's object
+    mode): its bytes are just the message type and delimiter, and the message object itself rides along"""
+
+    def __new__(cls, messageType: str, message):
+        framed = super().__new__(cls, messageType.encode("utf-8") + DELIMITER)
+        framed.message = message
+        return framed
+
+
+class WireCodec:
+    """Class encoding and decoding the Raft messages exchanged between servers, either as compact
+    fixed-layout binary (default) or as jsonpickle text for compatibility with older nodes"""
+
+    # _____________________________________
+    # --------- FRAMING METHODS -----------
+    # =====================================
+    @staticmethod
+    def frame(messageType: str, payload: bytes) -> bytes:
+        """Prefixes an encoded payload with its single character message type and the delimiter (a message object
+        passed unencoded is framed as a FramedMessage instead)"""
+        if isinstance(payload, bytes):
+            return messageType.encode("utf-8") + DELIMITER + payload
+        return FramedMessage(messageType, payload)
+
+    @staticmethod
+    def unframe(data: bytes) -> bytes:
+        """Strips the message type and delimiter from a received datagram, returning the payload"""
+        return data[2:]
+
+    # _____________________________________________
+    # --------- ENCODE & DECODE METHODS -----------
+    # =============================================
+    @staticmethod
+    def encode(message, useBinary: bool = True) -> bytes:
+        """Encodes a leader, follower, election or snapshot message into a payload"""
+        if not useBinary:
+            return jsonpickle.encode(message).encode("utf-8")
+        if isinstance(message, LeaderMessage):
+            return WireCodec.encodeLeaderMessage(message)
+        elif isinstance(message, FollowerMessage):
+            return HEADER.pack(MAGIC, VERSION, KIND_FOLLOWER) + FOLLOWER_BODY.pack(
+                message.currentTerm, message.response, message.lastCommittedIndex, message.nextIndex,
+                message.conflictTerm, message.conflictIndex, message.snapshotIndex, message.snapshotOffset)
+        elif isinstance(message, ElectionMessage):
+            return HEADER.pack(MAGIC, VERSION, KIND_ELECTION) + ELECTION_BODY.pack(
+                message.eid, message.currentTerm, message.lastLogIndex, message.lastLogTems)
+        elif isinstance(message, SnapshotMessage):
+            matchStates = message.matchStates if message.matchStates is not None else [message.gameState]
+            return HEADER.pack(MAGIC, VERSION, KIND_SNAPSHOT) + SNAPSHOT_BODY.pack(
+                message.currentTerm, message.snapshotIndex, message.snapshotTerm, message.gameState.getStateCode(),
+                message.offset, message.matchCount) + ENTRY_COUNT.pack(len(matchStates)) + b"".join(
+                STATE_CODE.pack(matchState.getStateCode()) for matchState in matchStates)
+        raise TypeError("No wire encoding for " + type(message).__name__)
+
+    @staticmethod
+    def decode(payload: bytes):
+        """Decodes a payload produced by either encoding back into its message object"""
+        if payload[0] != MAGIC:
+            return jsonpickle.decode(payload.decode("utf-8"))
+        magic, version, kind = HEADER.unpack_from(payload)
+        if version != VERSION:
+            raise ValueError("Unsupported wire codec version " + str(version))
+        if kind == KIND_LEADER:
+            return WireCodec.decodeLeaderMessage(payload)
+        elif kind == KIND_FOLLOWER:
+            return FollowerMessage(*FOLLOWER_BODY.unpack_from(payload, HEADER.size))
+        elif kind == KIND_ELECTION:
+            return ElectionMessage(*ELECTION_BODY.unpack_from(payload, HEADER.size))
+        elif kind == KIND_SNAPSHOT:
+            (currentTerm, snapshotIndex, snapshotTerm, stateCode, matchOffset,
+             matchCount) = SNAPSHOT_BODY.unpack_from(payload, HEADER.size)
+            offset = HEADER.size + SNAPSHOT_BODY.size
+            count = ENTRY_COUNT.unpack_from(payload, offset)[0]
+            offset += ENTRY_COUNT.size
+            matchStates = [GameState.fromStateCode(matchCode) for (matchCode,) in
+                           STATE_CODE.iter_unpack(payload[offset:offset + count * STATE_CODE.size])]
+            return SnapshotMessage(currentTerm, snapshotIndex, snapshotTerm, GameState.fromStateCode(stateCode),
+                                   matchStates, matchOffset, matchCount)
+        raise ValueError("Unknown wire message kind " + str(kind))
+
+    # ____________________________________________
+    # --------- CHUNK SIZE METHODS ---------------
+    # ============================================
+    @staticmethod
+    def getMaxEntries(useBinary: bool = True) -> int:
+        """Returns how many log entries fit in one AppendEntries datagram of the given encoding"""
+        if useBinary:
+            return (MAX_DATAGRAM - 2 - HEADER.size - LEADER_BODY.size - ENTRY_COUNT.size) // LOG_ENTRY.size
+        return (MAX_DATAGRAM - JSON_OVERHEAD) // JSON_ITEM_BYTES
+
+    @staticmethod
+    def getMaxMatchStates(useBinary: bool = True) -> int:
+        """Returns how many match states fit in one snapshot datagram of the given encoding"""
+        if useBinary:
+            return (MAX_DATAGRAM - 2 - HEADER.size - SNAPSHOT_BODY.size - ENTRY_COUNT.size) // STATE_CODE.size
+        return (MAX_DATAGRAM - JSON_OVERHEAD) // JSON_ITEM_BYTES
+
+    # ____________________________________________
+    # --------- CLIENT STATE METHODS -------------
+    # ============================================
+    @staticmethod
+    def encodeClientState(stateCode: int, sequence: int = None) -> bytes:
+        """Frames a committed game state's packed code as the compact outcome sent to clients (in place of
+        'outcome$graphic$match$sequence'), which clients render from GameState's graphics table, followed by the
+        sequence number of the action behind it if known"""
+        if sequence is None:
+            return WireCodec.frame("G", STATE_CODE.pack(stateCode))
+        return WireCodec.frame("G", STATE_CODE.pack(stateCode) + CLIENT_SEQUENCE.pack(sequence))
+
+    @staticmethod
+    def decodeClientState(data: bytes) -> int:
+        """Returns the packed state code of a compact outcome"""
+        return STATE_CODE.unpack_from(WireCodec.unframe(data))[0]
+
+    @staticmethod
+    def decodeClientSequence(data: bytes):
+        """Returns the action sequence number a compact outcome carries (None if it carries none)"""
+        payload = WireCodec.unframe(data)
+        if len(payload) < STATE_CODE.size + CLIENT_SEQUENCE.size:
+            return None
+        return CLIENT_SEQUENCE.unpack_from(payload, STATE_CODE.size)[0]
+
+    @staticmethod
+    def encodeReadResult(readID: int, stateCode: int, commitIndex: int) -> bytes:
+        """Frames the answer to a client's read query: its read ID, the match's committed packed state code and the
+        commit index of the replica answering"""
+        return WireCodec.frame("V", READ_RESULT.pack(readID, stateCode, commitIndex))
+
+    @staticmethod
+    def decodeReadResult(data: bytes) -> tuple:
+        """Returns the (read ID, packed state code, commit index) of a read query's answer"""
+        return READ_RESULT.unpack_from(WireCodec.unframe(data))
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    @staticmethod
+    def encodeLeaderMessage(message: LeaderMessage) -> bytes:
+        """Encodes a leader message, packing its entries as state codes"""
+        entries = message.entries
+        if entries is None:
+            entriesKind, entriesBytes = ENTRIES_NONE, b""
+        elif isinstance(entries, GameState):
+            entriesKind, entriesBytes = ENTRIES_STATE, STATE_CODE.pack(entries.getStateCode())
+        else:
+            entriesKind = ENTRIES_LIST
+            entriesBytes = ENTRY_COUNT.pack(len(entries)) + b"".join(
+                LOG_ENTRY.pack(term, gameState.getStateCode()) for gameState, term in entries)
+        return HEADER.pack(MAGIC, VERSION, KIND_LEADER) + LEADER_BODY.pack(
+            message.currentTerm, message.lastCommittedEntry, message.lastAppendedEntry, message.prevLogTerm,
+            message.prevLogIndex, message.nextIndex, entriesKind) + entriesBytes
+
+    @staticmethod
+    def decodeLeaderMessage(payload: bytes) -> LeaderMessage:
+        """Decodes a leader message, unpacking its state codes back into game states"""
+        (currentTerm, lastCommittedEntry, lastAppendedEntry, prevLogTerm, prevLogIndex, nextIndex,
+         entriesKind) = LEADER_BODY.unpack_from(payload, HEADER.size)
+        offset = HEADER.size + LEADER_BODY.size
+        entries = None
+        if entriesKind == ENTRIES_STATE:
+            entries = GameState.fromStateCode(STATE_CODE.unpack_from(payload, offset)[0])
+        elif entriesKind == ENTRIES_LIST:
+            count = ENTRY_COUNT.unpack_from(payload, offset)[0]
+            offset += ENTRY_COUNT.size
+            entries = [(GameState.fromStateCode(stateCode), term)
+                       for term, stateCode in LOG_ENTRY.iter_unpack(payload[offset:offset + count * LOG_ENTRY.size])]
+        return LeaderMessage(currentTerm, entries, lastCommittedEntry, lastAppendedEntry, prevLogTerm, prevLogIndex,
+                             nextIndex)
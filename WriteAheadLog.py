@@ -0,0 +1,274 @@
+# _________________________________________
+# --------- WRITE-AHEAD LOG CLASS ---------
+# =========================================
+import os
+import struct
+import zlib
+from threading import Condition, Thread
+
+from GameState import GameState
+from Log import Log
+
+# ENCODING: Each record on disk is a length and CRC32 of its payload followed by the payload itself, where the
+# payload starts with a record type. An ENTRY at index i replaces everything from i onward (so a follower's
+# conflicting suffix is dropped on replay without a separate truncate record), a COMMIT moves the commit index and a
+# VOTE holds the newest term and whether the server voted in it (restated after every compaction). A SNAPSHOT record
+# (followed by a count and the state code of every match) is only ever stored alone in the snapshot file
+RECORD_HEADER = struct.Struct("<II")
+RECORD_TYPE = struct.Struct("<B")
+ENTRY_RECORD = struct.Struct("<qII")
+COMMIT_RECORD = struct.Struct("<q")
+VOTE_RECORD = struct.Struct("<qB")
+SNAPSHOT_RECORD = struct.Struct("<qqI")
+MATCH_COUNT = struct.Struct("<I")
+MATCH_CODE = struct.Struct("<I")
+RECORD_ENTRY = 1
+RECORD_COMMIT = 2
+RECORD_SNAPSHOT = 3
+RECORD_VOTE = 4
+
+SEGMENT_SUFFIX = ".seg"
+SNAPSHOT_FILE = "snapshot.bin"
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+
+
+class WriteAheadLog:
+    """Class representing an append-only, CRC-checked log of entry, commit and vote records split over rotating
+    segment files, written by a group-commit thread that covers every queued record with a single fsync.
+    The same thread serializes log snapshots, after which the segments they cover are deleted"""
+
+    # CONSTRUCTOR
+    def __init__(self, directory: str, segmentBytes: int = DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.segmentBytes = segmentBytes
+        os.makedirs(self.directory, exist_ok=True)
+
+        # SEGMENT ATTRIBUTES
+        self.segmentNumber = 0
+        self.segmentFile = None
+        self.openActiveSegment()
+        self.voteRecord = None  # Newest vote record queued (or recovered), restated in the segment after a snapshot
+
+        # GROUP COMMIT ATTRIBUTES
+        self.condition = Condition()
+        self.pending = []  # Encoded records waiting for the writer thread
+        self.callbacks = []  # Functions to run once the pending records are durable
+        self.batchesQueued = 0
+        self.batchesDurable = 0
+        self.writerThread = Thread(target=self.groupCommitLoop, args=(), daemon=True)
+        self.writerThread.start()
+
+    # ____________________________________
+    # --------- APPEND METHODS -----------
+    # ====================================
+    def appendEntries(self, firstIndex: int, entries, onDurable=None) -> None:
+        """Queues (game state, term) entries stored from firstIndex onward, calling onDurable once they are synced"""
+        self.queueRecords(self.encodeEntries(firstIndex, entries), onDurable)
+
+    def appendCommit(self, lastCommittedEntry: int, onDurable=None) -> None:
+        """Queues a record moving the commit index, calling onDurable once it is synced"""
+        self.queueRecords([self.encodeCommit(lastCommittedEntry)], onDurable)
+
+    def appendVote(self, term: int, hasVoted: bool, onDurable=None) -> None:
+        """Queues a record of the newest term and whether a vote was cast in it, calling onDurable once it is synced
+        (a server must not answer a vote or act in a new term before then)"""
+        self.voteRecord = self.encodeVote(term, hasVoted)
+        self.queueRecords([self.voteRecord], onDurable)
+
+    def appendSnapshot(self, log: Log, onDurable=None) -> None:
+        """Queues a snapshot of a freshly compacted log. The writer thread serializes it, restates the entries
+        after the snapshot (and the newest vote) in a new segment and then deletes every older segment"""
+        compaction = (log.snapshotIndex, log.snapshotTerm, log.snapshotState, list(log.snapshotMatches.values()),
+                      log.getSubLog(log.snapshotIndex + 1), log.lastCommittedEntry, self.voteRecord)
+        self.queueRecords([compaction], onDurable)
+
+    def queueRecords(self, records: list, onDurable=None) -> None:
+        """Hands encoded records to the group-commit thread without waiting for the disk"""
+        with self.condition:
+            self.pending.extend(records)
+            if onDurable is not None:
+                self.callbacks.append(onDurable)
+            self.batchesQueued += 1
+            self.condition.notify_all()
+
+    def flush(self) -> None:
+        """Blocks until every record queued so far is durable"""
+        with self.condition:
+            target = self.batchesQueued
+            while self.batchesDurable < target:
+                self.condition.wait()
+
+    def groupCommitLoop(self) -> None:
+        """Runs an infinite loop writing everything queued since the last pass and syncing it with one fsync"""
+        while True:
+            with self.condition:
+                while self.batchesDurable == self.batchesQueued:
+                    self.condition.wait()
+                records, self.pending = self.pending, []
+                callbacks, self.callbacks = self.callbacks, []
+                batchesCovered = self.batchesQueued
+            batch = []
+            for record in records:
+                if isinstance(record, bytes):
+                    batch.append(record)
+                else:
+                    # Everything queued before a snapshot must reach the old segments first
+                    self.writeAndSync(batch)
+                    batch = []
+                    self.compactSegments(*record)
+            self.writeAndSync(batch)
+            with self.condition:
+                self.batchesDurable = batchesCovered
+                self.condition.notify_all()
+            for callback in callbacks:
+                callback()
+
+    # ______________________________________
+    # --------- RECOVERY METHODS -----------
+    # ======================================
+    def recoverLog(self) -> Log:
+        """Loads the snapshot (if any) and replays every segment in order, returning the recovered log"""
+        self.flush()
+        log = Log()
+        snapshotPath = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshotPath):
+            payload = self.readRecords(snapshotPath)[0][0]
+            snapshotIndex, snapshotTerm, stateCode = SNAPSHOT_RECORD.unpack_from(payload, RECORD_TYPE.size)
+            offset = RECORD_TYPE.size + SNAPSHOT_RECORD.size
+            count = MATCH_COUNT.unpack_from(payload, offset)[0]
+            offset += MATCH_COUNT.size
+            matchStates = [GameState.fromStateCode(matchCode) for (matchCode,) in
+                           MATCH_CODE.iter_unpack(payload[offset:offset + count * MATCH_CODE.size])]
+            log.installSnapshot(snapshotIndex, snapshotTerm, GameState.fromStateCode(stateCode), matchStates)
+        lastCommittedEntry = log.lastCommittedEntry
+        # Entries are replayed straight into the log's arrays as packed codes (none is decoded into a game state)
+        # and the term index is rebuilt once at the end
+        for segmentPath in self.getSegmentPaths():
+            for payload in self.readRecords(segmentPath)[0]:
+                recordType = payload[0]
+                if recordType == RECORD_ENTRY:
+                    index, term, stateCode = ENTRY_RECORD.unpack_from(payload, RECORD_TYPE.size)
+                    position = index - log.snapshotIndex - 1
+                    if position < 0:
+                        continue  # Already folded into the snapshot
+                    if position < len(log.terms):
+                        del log.terms[position:]
+                        del log.stateCodes[position:]
+                    log.terms.append(term)
+                    log.stateCodes.append(stateCode)
+                elif recordType == RECORD_COMMIT:
+                    lastCommittedEntry = max(lastCommittedEntry,
+                                             COMMIT_RECORD.unpack_from(payload, RECORD_TYPE.size)[0])
+                elif recordType == RECORD_VOTE:
+                    self.voteRecord = self.encodeRecord(payload)
+        log.lastAppendedEntry = log.snapshotIndex + len(log.terms)
+        log.nextIndex = log.lastAppendedEntry + 1
+        log.rebuildTermIndex()
+        log.lastCommittedEntry = min(lastCommittedEntry, log.lastAppendedEntry)
+        return log
+
+    def getTermAndVote(self) -> tuple:
+        """Returns the newest term recorded and whether a vote was cast in it (0 and False before any record), as
+        of the last recoverLog or appendVote"""
+        if self.voteRecord is None:
+            return 0, False
+        term, voted = VOTE_RECORD.unpack_from(self.voteRecord, RECORD_HEADER.size + RECORD_TYPE.size)
+        return term, voted == 1
+
+    @staticmethod
+    def readRecords(segmentPath: str) -> tuple:
+        """Returns the payloads of the intact records in a segment and the byte offset where they end,
+        stopping at the first short or corrupt record (i.e. a torn write)"""
+        with open(segmentPath, "rb") as segment:
+            data = segment.read()
+        payloads = []
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, checksum = RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+            payloads.append(payload)
+            offset += RECORD_HEADER.size + length
+        return payloads, offset
+
+    # ____________________________________
+    # --------- HELPER METHODS -----------
+    # ====================================
+    @staticmethod
+    def encodeRecord(payload: bytes) -> bytes:
+        """Frames a record payload with its length and checksum"""
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def encodeEntries(self, firstIndex: int, entries) -> list:
+        """Encodes (game state, term) entries stored from firstIndex onward as entry records"""
+        records = []
+        for offset in range(len(entries)):
+            gameState, term = entries[offset]
+            records.append(self.encodeRecord(RECORD_TYPE.pack(RECORD_ENTRY) + ENTRY_RECORD.pack(
+                firstIndex + offset, term, gameState.getStateCode())))
+        return records
+
+    def encodeCommit(self, lastCommittedEntry: int) -> bytes:
+        """Encodes a commit index as a commit record"""
+        return self.encodeRecord(RECORD_TYPE.pack(RECORD_COMMIT) + COMMIT_RECORD.pack(lastCommittedEntry))
+
+    def encodeVote(self, term: int, hasVoted: bool) -> bytes:
+        """Encodes a term and whether a vote was cast in it as a vote record"""
+        return self.encodeRecord(RECORD_TYPE.pack(RECORD_VOTE) + VOTE_RECORD.pack(term, 1 if hasVoted else 0))
+
+    def writeAndSync(self, records: list) -> None:
+        """Appends encoded records to the active segment with one fsync, rotating the segment once it is full"""
+        if len(records) == 0:
+            return
+        self.segmentFile.write(b"".join(records))
+        self.segmentFile.flush()
+        os.fsync(self.segmentFile.fileno())
+        if self.segmentFile.tell() >= self.segmentBytes:
+            self.rotateSegment()
+
+    def compactSegments(self, snapshotIndex, snapshotTerm, gameState, matchStates, retainedEntries,
+                        lastCommittedEntry, voteRecord) -> None:
+        """Durably replaces the snapshot file, then restates the retained entries in a fresh segment and deletes
+        the older ones. A crash at any point leaves a snapshot and segments that still replay to the same log"""
+        snapshotPath = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(snapshotPath + ".tmp", "wb") as snapshotFile:
+            snapshotFile.write(self.encodeRecord(RECORD_TYPE.pack(RECORD_SNAPSHOT) + SNAPSHOT_RECORD.pack(
+                snapshotIndex, snapshotTerm, gameState.getStateCode()) + MATCH_COUNT.pack(len(matchStates)) + b"".join(
+                MATCH_CODE.pack(matchState.getStateCode()) for matchState in matchStates)))
+            snapshotFile.flush()
+            os.fsync(snapshotFile.fileno())
+        os.replace(snapshotPath + ".tmp", snapshotPath)
+        obsoleteSegments = self.getSegmentPaths()
+        self.rotateSegment()
+        self.writeAndSync(self.encodeEntries(snapshotIndex + 1, retainedEntries) +
+                          [self.encodeCommit(lastCommittedEntry)] + ([voteRecord] if voteRecord is not None else []))
+        for segmentPath in obsoleteSegments:
+            if segmentPath != self.getSegmentPath(self.segmentNumber):
+                os.remove(segmentPath)
+
+    def getSegmentPaths(self) -> list:
+        """Returns the paths of all segment files, oldest first"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def getSegmentPath(self, segmentNumber: int) -> str:
+        """Returns the path of the segment file with the given number"""
+        return os.path.join(self.directory, "{:08d}".format(segmentNumber) + SEGMENT_SUFFIX)
+
+    def openActiveSegment(self) -> None:
+        """Opens the newest segment for appending, first cutting off any torn record left by a crash"""
+        segmentPaths = self.getSegmentPaths()
+        if len(segmentPaths) > 0:
+            activePath = segmentPaths[-1]
+            self.segmentNumber = int(os.path.basename(activePath)[:-len(SEGMENT_SUFFIX)])
+            intactBytes = self.readRecords(activePath)[1]
+            if intactBytes != os.path.getsize(activePath):
+                os.truncate(activePath, intactBytes)
+        self.segmentFile = open(self.getSegmentPath(self.segmentNumber), "ab")
+
+    def rotateSegment(self) -> None:
+        """Closes the active segment and starts the next one"""
+        self.segmentFile.close()
+        self.segmentNumber += 1
+        self.segmentFile = open(self.getSegmentPath(self.segmentNumber), "ab")
@@ -0,0 +1,99 @@
+# ______________________________________
+# --------- BATCHING BENCHMARK ---------
+# ======================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.batchingBenchmark
+Offers client actions open-loop at increasing rates to a five server cluster, with batching off and on (each run
+in a fresh process), and reports the committed actions/sec observed by a client
+"""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+from Server import Server
+
+BASE_PORT = 7400
+SERVER_IDS = [3, 4, 5, 6, 7]
+ACTIONS = ["0_A", "0_S", "1_A", "1_S"]  # Blocks only, so the match never ends mid-benchmark
+OFFERED_RATES = [250, 500, 1000, 2000]
+SEND_SECONDS = 2
+DRAIN_SECONDS = 2
+BATCH_WINDOWS = [0, 0.005]
+
+
+def buildServers(directory: str, batchWindow: float) -> list:
+    """Constructs and starts the servers with short timeouts and the given batch window"""
+    processes = [("Client_Red_0", "127.0.0.1", BASE_PORT), ("Client_Blue_1", "127.0.0.1", BASE_PORT + 1)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        group = [process for process in processes if process[0] != name]
+        server = Server(nodeID, name, "127.0.0.1", BASE_PORT + nodeID, group,
+                        os.path.join(directory, name + "_LOG.txt"), batchWindow=batchWindow,
+                        electionTimeoutMs=(150, 300), heartbeatMs=50)
+        Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+        Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+        with server.stateLock:
+            server.markClusterReady()
+        servers.append(server)
+    return servers
+
+
+def measureThroughput(batchWindow: float, offeredRate: int) -> None:
+    """Prints the committed actions/sec a client sees while offering actions at offeredRate per second"""
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.bind(("127.0.0.1", BASE_PORT))
+    client.settimeout(0.5)
+    outcomeTimes = []
+
+    def countOutcomes() -> None:
+        while True:
+            try:
+                client.recvfrom(16384)
+                outcomeTimes.append(time.perf_counter())
+            except socket.timeout:
+                pass
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        servers = buildServers(tempfile.mkdtemp(), batchWindow)
+        leader = None
+        while leader is None:
+            time.sleep(0.01)
+            leader = next((server for server in servers if server.isLeader is True), None)
+        Thread(target=countOutcomes, args=(), daemon=True).start()
+        start = time.perf_counter()
+        total = offeredRate * SEND_SECONDS
+        for sample in range(total):
+            # Open loop: each action goes out on its schedule whether or not earlier ones have committed
+            delay = start + sample / offeredRate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            client.sendto(ACTIONS[sample % len(ACTIONS)].encode("utf-8"), ("127.0.0.1", leader.port))
+        time.sleep(DRAIN_SECONDS)
+    committed = len(outcomeTimes)
+    elapsed = (outcomeTimes[-1] - start) if committed > 0 else SEND_SECONDS
+    print("{:>10}{:>12}{:>14.0f}{:>12}".format(str(int(batchWindow * 1000)) + " ms", offeredRate,
+                                               committed / elapsed, committed))
+
+
+def runBenchmark() -> None:
+    """Runs every batch window and offered rate in its own process"""
+    print("{:>10}{:>12}{:>14}{:>12}".format("WINDOW", "OFFERED/s", "COMMITTED/s", "COMMITTED"))
+    for batchWindow in BATCH_WINDOWS:
+        for offeredRate in OFFERED_RATES:
+            subprocess.run([sys.executable, "-m", "benchmarks.batchingBenchmark", str(batchWindow),
+                            str(offeredRate)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        measureThroughput(float(sys.argv[1]), int(sys.argv[2]))
+    else:
+        runBenchmark()
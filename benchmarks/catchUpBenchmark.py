@@ -0,0 +1,82 @@
+# _________________________________________
+# --------- CATCH-UP BENCHMARK ------------
+# =========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.catchUpBenchmark
+Fails a follower of a three server simulated cluster on 100 Mbit/s links, appends a backlog of entries, restarts
+the follower and reports how long it takes to catch up (in virtual time) and what share of the link that used, for
+the whole backlog in one AppendEntries (longer than a datagram, so it never arrives), stop-and-wait chunks and a
+window of chunks, with and without packet loss, and for a follower that must first be sent a snapshot
+"""
+import math
+
+from ClusterSimulator import ClusterSimulator
+from WireCodec import LOG_ENTRY, STATE_CODE
+
+BANDWIDTH = 12.5e6  # Bytes per second (100 Mbit/s)
+APPEND_BATCH = 1000
+CATCH_UP_LIMIT = 4  # Virtual seconds, short of the restarted follower's election timeout
+SEED = 3
+# (label, backlog entries, matches, loss rate, chunk entries (None for as many as fit), window, snapshot threshold)
+SCENARIOS = [
+    ("one message", 10 ** 4, 1, 0.0, 10 ** 9, 1, 10 ** 9),
+    ("stop-and-wait", 10 ** 4, 1, 0.0, None, 1, 10 ** 9),
+    ("window 8", 10 ** 4, 1, 0.0, None, 8, 10 ** 9),
+    ("stop-and-wait", 10 ** 5, 1, 0.0, None, 1, 10 ** 9),
+    ("window 8", 10 ** 5, 1, 0.0, None, 8, 10 ** 9),
+    ("window 8, 1% loss", 10 ** 5, 1, 0.01, None, 8, 10 ** 9),
+    ("window 8, 5% loss", 10 ** 5, 1, 0.05, None, 8, 10 ** 9),
+    ("window 8, snapshot", 10 ** 5, 50000, 0.0, None, 8, 20000),
+]
+
+
+def measureCatchUp(entries: int, matches: int, lossRate: float, chunkEntries: int, window: int,
+                   snapshotThreshold: int) -> tuple:
+    """Returns the virtual seconds a restarted follower takes to hold the leader's whole log (None if it never
+    does) and the bytes of entries and match states it was sent per second of that, as a fraction of the link"""
+    simulator = ClusterSimulator(SEED, serverCount=3, playerCount=0, bandwidth=BANDWIDTH)
+    for server in simulator.servers:
+        server.replicationWindow = window
+        server.snapshotThreshold = snapshotThreshold
+        if chunkEntries is not None:
+            server.chunkEntries = chunkEntries
+    simulator.start()
+    simulator.waitForLeader(120)
+    leader = simulator.getLeader()
+    follower = next(server for server in simulator.servers if server is not leader)
+    simulator.failServer(follower)
+    for first in range(0, entries, APPEND_BATCH):
+        leader.pendingActions = ["0_A@" + str(index % matches) for index in range(first, first + APPEND_BATCH)]
+        with simulator.quiet():
+            leader.appendActionBatch()
+        simulator.runFor(0.05)
+    simulator.runUntil(lambda: leader.log.lastCommittedEntry == leader.log.lastAppendedEntry, 60)
+
+    simulator.recoverServer(follower)
+    simulator.network.lossRate = lossRate
+    # stand in for the leader's next heartbeat finding the follower behind
+    leader.lastReplicatedAt[follower.name] = -math.inf
+    with simulator.quiet():
+        leader.pulseHeartbeat()
+    seconds = simulator.runUntil(lambda: follower.log.lastAppendedEntry == leader.log.lastAppendedEntry,
+                                 CATCH_UP_LIMIT)
+    if seconds is None:
+        return None, 0.0
+    payload = (leader.log.lastAppendedEntry - max(leader.log.snapshotIndex, -1)) * LOG_ENTRY.size
+    if follower.log.snapshotIndex == leader.log.snapshotIndex >= 0:
+        payload += len(leader.log.snapshotMatches) * STATE_CODE.size
+    return seconds, payload / seconds / BANDWIDTH
+
+
+def runBenchmark() -> None:
+    print("{:<22}{:>10}{:>10}{:>16}{:>12}".format("TRANSFER", "ENTRIES", "MATCHES", "CATCH-UP (ms)", "LINK USE"))
+    for label, entries, matches, lossRate, chunkEntries, window, snapshotThreshold in SCENARIOS:
+        seconds, linkUse = measureCatchUp(entries, matches, lossRate, chunkEntries, window, snapshotThreshold)
+        print("{:<22}{:>10}{:>10}{:>16}{:>11.0f}%".format(label, entries, matches,
+                                                        "never" if seconds is None else
+                                                        "{:.1f}".format(seconds * 1000), linkUse * 100))
+
+
+if __name__ == "__main__":
+    runBenchmark()
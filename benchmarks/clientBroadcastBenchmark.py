@@ -0,0 +1,80 @@
+# _______________________________________________
+# --------- CLIENT BROADCAST BENCHMARK ----------
+# ===============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.clientBroadcastBenchmark
+Plays random matches and, for every committed game state, compares the leader building the text outcome
+('outcome$graphic$match', with the graphic rendered by string concatenation or looked up in the precomputed table)
+against the compact packed state code, reporting the time per outcome, the bytes sent to each client and the time
+a client takes to turn a compact outcome back into the same graphic
+"""
+import random
+import time
+
+from GameState import GameState, OUTCOMES, MATCH_SHIFT
+from WireCodec import WireCodec
+
+MATCHES = 2000
+ACTIONS = ["0_Q", "0_W", "0_A", "0_S", "1_Q", "1_W", "1_A", "1_S"]
+DELIMITER = "$"
+
+
+def playMatches() -> list:
+    """Returns every game state of MATCHES random matches played until a knockout"""
+    random.seed(0)
+    states = []
+    for matchID in range(MATCHES):
+        gameState = GameState(matchID)
+        while gameState.winner == 2:
+            gameState.updateGameState(random.choice(ACTIONS))
+            states.append(GameState.fromStateCode(gameState.getStateCode()))
+    return states
+
+
+def timePerState(function, stateCodes: list) -> tuple:
+    """Returns the microseconds function(stateCode) takes per committed state (the leader reads each committed
+    entry's packed code from its log) and the average bytes it returns"""
+    start = time.perf_counter()
+    sizes = [len(function(stateCode)) for stateCode in stateCodes]
+    return (time.perf_counter() - start) / len(stateCodes) * 1e6, sum(sizes) / len(stateCodes)
+
+
+def getTextOutcome(gameState: GameState, graphic: str) -> bytes:
+    return (gameState.outcome + DELIMITER + graphic + DELIMITER + str(gameState.match)).encode("utf-8")
+
+
+def renderTextOutcome(stateCode: int) -> bytes:
+    gameState = GameState.fromStateCode(stateCode)
+    return getTextOutcome(gameState, gameState.renderGameStateGraphic())
+
+
+def runBenchmark() -> None:
+    states = playMatches()
+    print("Committed game states: " + str(len(states)) + "\n")
+    print("{:<42}{:>12}{:>14}".format("LEADER OUTCOME MESSAGE", "US/OUTCOME", "BYTES/CLIENT"))
+    stateCodes = [gameState.getStateCode() for gameState in states]
+    for label, function in [
+            ("text, graphic rendered per commit", renderTextOutcome),
+            ("text, graphic from the table", lambda stateCode: getTextOutcome(
+                GameState.fromStateCode(stateCode), GameState.getGraphicForStateCode(stateCode))),
+            ("compact state code", WireCodec.encodeClientState)]:
+        microseconds, size = timePerState(function, stateCodes)
+        print("{:<42}{:>12.2f}{:>14.1f}".format(label, microseconds, size))
+
+    compact = [WireCodec.encodeClientState(stateCode) for stateCode in stateCodes]
+    start = time.perf_counter()
+    rendered = []
+    for data in compact:
+        stateCode = WireCodec.decodeClientState(data)
+        rendered.append((OUTCOMES[stateCode >> 8 & 0x7], GameState.getGraphicForStateCode(stateCode),
+                         stateCode >> MATCH_SHIFT))
+    clientTime = (time.perf_counter() - start) / len(compact) * 1e6
+    assert rendered == [(gameState.outcome, gameState.renderGameStateGraphic(), gameState.match)
+                        for gameState in states]
+    print("\nClient decode and render of a compact outcome: {:.2f} us (same graphic as the text outcome)".format(
+        clientTime))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,98 @@
+# __________________________________________
+# --------- COLD START BENCHMARK -----------
+# ==========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.coldStartBenchmark
+Launches a five server cluster with the cluster launcher (empty logs, loopback), by default as one process hosting
+every server and with --process-per-server on either engine, and scrapes each server's metrics endpoint to report the
+time from launching to every server serving, to every server passing the readiness barrier and to the first
+elected leader. A process per server starts the interpreter five times over, in parallel only given enough cores
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from startCluster import launchCluster, stopCluster, START_SCRIPT
+
+BASE_PORT = 7800
+METRICS_BASE_PORT = 7900
+SERVER_IDS = [2, 3, 4, 5, 6]
+RUNS = 5
+POLL_INTERVAL = 0.01
+LIMIT_SECONDS = 30
+
+
+def writeConfig(directory: str) -> str:
+    """Writes a config file of the five servers with their logs in directory, returning its path"""
+    configFilePath = os.path.join(directory, "config.txt")
+    with open(configFilePath, "w") as configFile:
+        configFile.write("$LOCAL$\n")
+        for nodeID in SERVER_IDS:
+            configFile.write(str(nodeID) + " Server_" + str(nodeID) + " 127.0.0.1 " + str(BASE_PORT + nodeID) +
+                             " 127.0.0.1 " + os.path.join(directory, "Server_" + str(nodeID) + "_LOG.txt") + "\n")
+    return configFilePath
+
+
+def scrapeGauge(nodeID: int, gauge: str) -> float:
+    """Returns a gauge of a server's metrics (None while its endpoint is not serving yet)"""
+    try:
+        with urllib.request.urlopen("http://127.0.0.1:" + str(METRICS_BASE_PORT + nodeID) + "/metrics",
+                                    timeout=1) as response:
+            for line in response.read().decode("utf-8").split("\n"):
+                if line.startswith(gauge + " "):
+                    return float(line.split(" ")[1])
+    except OSError:
+        return None
+    return None
+
+
+def launch(mode: str, configFilePath: str) -> list:
+    """Starts the cluster of a config file the way the launcher does by default, or as a process per server on an
+    engine"""
+    if mode == "default":
+        launcher = os.path.join(os.path.dirname(START_SCRIPT), "startCluster.py")
+        return [("cluster", subprocess.Popen([sys.executable, launcher, "--config", configFilePath,
+                                              "--metrics-base-port", str(METRICS_BASE_PORT)],
+                                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                             stderr=subprocess.STDOUT))]
+    return launchCluster(configFilePath, "local", ["--engine", mode], metricsBasePort=METRICS_BASE_PORT)
+
+
+def measureColdStart(mode: str) -> tuple:
+    """Returns the seconds from launch to every server serving metrics, to every server past the barrier and to
+    the first leader"""
+    directory = tempfile.mkdtemp()
+    start = time.perf_counter()
+    cluster = launch(mode, writeConfig(directory))
+    serving = ready = leader = None
+    while leader is None and time.perf_counter() - start < LIMIT_SECONDS:
+        roles = [scrapeGauge(nodeID, "raft_role") for nodeID in SERVER_IDS]
+        if serving is None and None not in roles:
+            serving = time.perf_counter() - start
+        if ready is None and all(scrapeGauge(nodeID, "raft_cluster_ready") == 1 for nodeID in SERVER_IDS):
+            ready = time.perf_counter() - start
+        if 2 in roles:
+            leader = time.perf_counter() - start
+        time.sleep(POLL_INTERVAL)
+    stopCluster(cluster)
+    return serving, ready, leader
+
+
+def runBenchmark() -> None:
+    print("{:<24}{:>6}{:>14}{:>14}{:>14}{:>24}".format("LAUNCH", "RUN", "SERVING (ms)", "BARRIER (ms)",
+                                                       "LEADER (ms)", "SERVING TO LEADER (ms)"))
+    for mode in ["default", "threads", "asyncio"]:
+        for run in range(RUNS):
+            serving, ready, leader = measureColdStart(mode)
+            # a leader can be scraped before every server is seen past the barrier
+            print("{:<24}{:>6}{:>14.0f}{:>14.0f}{:>14.0f}{:>24.0f}".format(
+                mode if mode == "default" else "per server, " + mode, run, serving * 1000, min(ready or leader, leader) * 1000, leader * 1000,
+                (leader - serving) * 1000))
+
+
+if __name__ == "__main__":
+    runBenchmark()
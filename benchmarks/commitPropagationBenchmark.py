@@ -0,0 +1,104 @@
+# ________________________________________________
+# --------- COMMIT PROPAGATION BENCHMARK ---------
+# ================================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.commitPropagationBenchmark
+Offers client actions open-loop to a five server cluster and counts, per committed action, the datagrams the
+leader sends by message type (outcomes sent to clients count under their outcome, e.g. 'M') and the commit
+persistence calls made by followers, then checks every follower has caught up with the leader's commit index
+"""
+import contextlib
+import os
+import socket
+import tempfile
+import time
+from collections import Counter
+from threading import Thread
+
+from Server import Server
+
+BASE_PORT = 7700
+SERVER_IDS = [3, 4, 5, 6, 7]
+ACTIONS = ["0_A", "0_S", "1_A", "1_S"]  # Blocks only, so the match never ends mid-benchmark
+OFFERED_RATE = 500
+SEND_SECONDS = 2
+DRAIN_SECONDS = 1
+HEART_RATE = 0.05
+
+
+class CountingTransport:
+    """Class wrapping a server's transport to count the datagrams it sends by message type"""
+
+    # CONSTRUCTOR
+    def __init__(self, transport):
+        self.transport = transport
+        self.sent = Counter()
+
+    def sendto(self, data: bytes, address: tuple) -> None:
+        self.sent[chr(data[0])] += 1
+        self.transport.sendto(data, address)
+
+
+def buildServers(directory: str) -> list:
+    """Constructs and starts the servers with short timeouts, counting sends and commit persistence calls"""
+    processes = [("Client_Red_0", "127.0.0.1", BASE_PORT)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        group = [process for process in processes if process[0] != name]
+        server = Server(nodeID, name, "127.0.0.1", BASE_PORT + nodeID, group,
+                        os.path.join(directory, name + "_LOG.txt"),
+                        electionTimeoutMs=(150, 300), heartbeatMs=HEART_RATE * 1000)
+        server.transport = CountingTransport(server.transport)
+        server.commitPersists = 0
+        persistCommit = server.persistCommit
+
+        def countingPersistCommit(server=server, persistCommit=persistCommit) -> None:
+            server.commitPersists += 1
+            persistCommit()
+        server.persistCommit = countingPersistCommit
+        Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+        Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+        with server.stateLock:
+            server.markClusterReady()
+        servers.append(server)
+    return servers
+
+
+def runBenchmark() -> None:
+    """Prints leader datagrams and follower commit persistence calls per committed action"""
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.bind(("127.0.0.1", BASE_PORT))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        servers = buildServers(tempfile.mkdtemp())
+        leader = None
+        while leader is None:
+            time.sleep(0.01)
+            leader = next((server for server in servers if server.isLeader is True), None)
+        followers = [server for server in servers if server is not leader]
+        leader.transport.sent.clear()
+        for follower in followers:
+            follower.commitPersists = 0
+        start = time.perf_counter()
+        committedBefore = leader.log.lastCommittedEntry
+        for sample in range(OFFERED_RATE * SEND_SECONDS):
+            delay = start + sample / OFFERED_RATE - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            client.sendto(ACTIONS[sample % len(ACTIONS)].encode("utf-8"), ("127.0.0.1", leader.port))
+        time.sleep(DRAIN_SECONDS)
+    committed = leader.log.lastCommittedEntry - committedBefore
+    print("Committed actions: " + str(committed) + "\n")
+    print("{:<34}{:>12}".format("LEADER DATAGRAMS PER ACTION", ""))
+    for messageType, count in sorted(leader.transport.sent.items()):
+        print("{:<34}{:>12.3f}".format("  '" + messageType + "'", count / committed))
+    persists = sum(follower.commitPersists for follower in followers) / len(followers)
+    print("{:<34}{:>12.3f}".format("Follower commit persists/action", persists / committed))
+    lag = max(leader.log.lastCommittedEntry - follower.log.lastCommittedEntry for follower in followers)
+    print("{:<34}{:>12}".format("Largest follower commit lag", lag))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,91 @@
+# __________________________________________
+# --------- END-TO-END BENCHMARK -----------
+# ==========================================
+"""
+RUN COMMAND (from the repository root, optionally naming the JSON results file):
+    python -m benchmarks.endToEndBenchmark [results.json]
+Hosts a five server cluster in a separate process and drives it with the load generator: open-loop at increasing
+fixed rates, open-loop with Poisson arrivals and closed-loop, reporting send-to-outcome latency percentiles and
+committed actions/sec for each run and saving every run's results as JSON
+"""
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+from LoadGenerator import LoadGenerator, OPEN_LOOP, CLOSED_LOOP
+from RoutingTable import RoutingTable
+from Server import Server
+
+BASE_PORT = 7800
+SERVER_IDS = [3, 4, 5, 6, 7]
+CLIENTS = 16
+SEND_SECONDS = 3
+ELECTION_SECONDS = 2
+RUNS = [(OPEN_LOOP, "fixed", 250), (OPEN_LOOP, "fixed", 500), (OPEN_LOOP, "fixed", 1000),
+        (OPEN_LOOP, "poisson", 500), (CLOSED_LOOP, None, None)]
+DEFAULT_OUTPUT = "endToEndBenchmark.json"
+
+
+def buildRoutingTable() -> RoutingTable:
+    """Returns the routing table of one five server Raft group and the load generator's client"""
+    routingTable = RoutingTable()
+    routingTable.addProcess("-", 0, "Client_Red_0", "127.0.0.1", BASE_PORT, "")
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        routingTable.addProcess(0, nodeID, name, "127.0.0.1", BASE_PORT + nodeID, name + "_LOG.txt")
+    return routingTable
+
+
+def hostCluster() -> None:
+    """Runs the servers, with short timeouts, until the process is killed"""
+    directory = tempfile.mkdtemp()
+    routingTable = buildRoutingTable()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for groupID, nodeID, name, address, port, backupPath in list(routingTable.processes.values()):
+            if groupID != 0:
+                continue
+            server = Server(nodeID, name, address, port, routingTable.getGroupMembers(0, name),
+                            os.path.join(directory, backupPath), electionTimeoutMs=(150, 300), heartbeatMs=50)
+            Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+            Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+            with server.stateLock:
+                server.markClusterReady()
+        while True:
+            time.sleep(60)
+
+
+def runBenchmark(outputPath: str) -> None:
+    """Prints and saves the results of every run against one cluster"""
+    routingTable = buildRoutingTable()
+    host = subprocess.Popen([sys.executable, "-m", "benchmarks.endToEndBenchmark", "host"])
+    allResults = []
+    print("{:>8}{:>9}{:>10}{:>13}{:>10}{:>10}{:>10}{:>10}".format("MODE", "ARRIVALS", "OFFERED/s", "COMMITTED/s",
+                                                                  "P50 ms", "P99 ms", "P999 ms", "LOST"))
+    try:
+        time.sleep(ELECTION_SECONDS)
+        for sample, (mode, schedule, rate) in enumerate(RUNS):
+            # Fresh match IDs per run, so no run waits on an outcome left over from the previous one
+            generator = LoadGenerator("Client_Red_0", "127.0.0.1", BASE_PORT, routingTable, CLIENTS,
+                                      sample * CLIENTS, mode, rate or 0, schedule or "fixed", seed=sample)
+            results = generator.run(SEND_SECONDS)
+            allResults.append(results)
+            print("{:>8}{:>9}{:>10}{:>13.0f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10}".format(
+                mode, schedule or "-", rate or "-", results["committedPerSecond"], results["p50Ms"],
+                results["p99Ms"], results["p999Ms"], results["unanswered"]))
+    finally:
+        host.kill()
+    with open(outputPath, "w") as outputFile:
+        json.dump(allResults, outputFile, indent=2)
+    print("\nResults saved to " + outputPath)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "host":
+        hostCluster()
+    else:
+        runBenchmark(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_OUTPUT)
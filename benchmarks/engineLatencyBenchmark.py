@@ -0,0 +1,96 @@
+# ____________________________________________
+# --------- ENGINE LATENCY BENCHMARK ---------
+# ============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.engineLatencyBenchmark
+Runs a five server cluster on the threaded engine and then on the asyncio engine (each in a fresh process) and
+reports the time from a client sending an action to receiving its committed outcome
+"""
+import asyncio
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+from AsyncServerEngine import AsyncServerEngine
+from Server import Server
+
+BASE_PORT = 7200
+SERVER_IDS = [3, 4, 5, 6, 7]
+ACTIONS = ["0_A", "0_S", "1_A", "1_S"]  # Blocks only, so the match never ends mid-benchmark
+SAMPLES = 300
+
+
+def buildServers(directory: str) -> list:
+    """Constructs the servers with short timeouts, each with both clients in its group as in config.txt"""
+    processes = [("Client_Red_0", "127.0.0.1", BASE_PORT), ("Client_Blue_1", "127.0.0.1", BASE_PORT + 1)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        group = [process for process in processes if process[0] != name]
+        # The old backup path keeps fsync out of the comparison, and a low snapshot threshold keeps its rewrite small
+        server = Server(nodeID, name, "127.0.0.1", BASE_PORT + nodeID, group,
+                        os.path.join(directory, name + "_LOG.txt"), useWriteAheadLog=False, snapshotThreshold=50,
+                        electionTimeoutMs=(150, 300), heartbeatMs=50)
+        servers.append(server)
+    return servers
+
+
+def startEngine(engine: str, servers: list) -> None:
+    """Starts the servers on the chosen engine in background threads and arms their election timers"""
+    if engine == "threads":
+        for server in servers:
+            Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+            Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+            with server.stateLock:
+                server.markClusterReady()
+    else:
+        loop = asyncio.new_event_loop()
+        Thread(target=loop.run_until_complete, args=(AsyncServerEngine(servers).run(False),), daemon=True).start()
+        time.sleep(0.1)
+        for server in servers:
+            loop.call_soon_threadsafe(server.markClusterReady)
+
+
+def measureEngine(engine: str) -> None:
+    """Prints commit latency percentiles for one engine"""
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.bind(("127.0.0.1", BASE_PORT))
+    client.settimeout(2)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        servers = buildServers(tempfile.mkdtemp())
+        startEngine(engine, servers)
+        leader = None
+        while leader is None:
+            time.sleep(0.01)
+            leader = next((server for server in servers if server.isLeader is True), None)
+        latencies = []
+        for sample in range(SAMPLES):
+            start = time.perf_counter()
+            client.sendto(ACTIONS[sample % len(ACTIONS)].encode("utf-8"), ("127.0.0.1", leader.port))
+            client.recvfrom(16384)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print("{:<10}{:>12.3f}{:>12.3f}{:>12.3f}".format(engine, latencies[len(latencies) // 2] * 1000,
+                                                    latencies[int(len(latencies) * 0.99)] * 1000,
+                                                    sum(latencies) / len(latencies) * 1000))
+
+
+def runBenchmark() -> None:
+    """Measures each engine in its own process so neither leaves threads or sockets behind for the other"""
+    print("{:<10}{:>12}{:>12}{:>12}".format("ENGINE", "p50 ms", "p99 ms", "mean ms"))
+    for engine in ["threads", "asyncio"]:
+        subprocess.run([sys.executable, "-m", "benchmarks.engineLatencyBenchmark", engine], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        measureEngine(sys.argv[1])
+    else:
+        runBenchmark()
@@ -0,0 +1,82 @@
+# ______________________________________
+# --------- FAILOVER BENCHMARK ---------
+# ======================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.failoverBenchmark
+Brings up five servers in this process with a 150-300 ms election timeout and a 50 ms heart rate, then reports
+process CPU use while the cluster idles under a leader and the time from failing that leader to a new one
+"""
+import contextlib
+import os
+import tempfile
+import time
+from threading import Thread
+
+from Server import Server
+
+BASE_PORT = 7100
+SERVER_IDS = [3, 4, 5, 6, 7]
+TIMEOUT_RANGE_MS = (150, 300)
+HEARTBEAT_MS = 50
+IDLE_SECONDS = 3
+LEADER_WAIT_SECONDS = 30
+
+
+def buildCluster(directory: str) -> list:
+    """Constructs the servers (plus two client entries in each group, as in config.txt) and starts their loops"""
+    processes = [("Client_Red_0", "127.0.0.1", BASE_PORT), ("Client_Blue_1", "127.0.0.1", BASE_PORT + 1)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        group = [process for process in processes if process[0] != name]
+        server = Server(nodeID, name, "127.0.0.1", BASE_PORT + nodeID, group,
+                        os.path.join(directory, name + "_LOG.txt"),
+                        electionTimeoutMs=TIMEOUT_RANGE_MS, heartbeatMs=HEARTBEAT_MS)
+        servers.append(server)
+    for server in servers:
+        # Every loop except the interactive test command loop
+        Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+        Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+        with server.stateLock:
+            server.markClusterReady()
+    return servers
+
+
+def waitForLeader(servers: list, excluded=None):
+    """Polls until a server other than excluded is leader, returning it (or None after LEADER_WAIT_SECONDS)"""
+    deadline = time.monotonic() + LEADER_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        for server in servers:
+            if server.isLeader is True and server is not excluded:
+                return server
+        time.sleep(0.001)
+    return None
+
+
+def runBenchmark() -> None:
+    """Prints time to first leader, idle CPU use and failover time"""
+    directory = tempfile.mkdtemp()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.monotonic()
+        servers = buildCluster(directory)
+        leader = waitForLeader(servers)
+        firstLeaderTime = time.monotonic() - start
+        cpuStart = time.process_time()
+        time.sleep(IDLE_SECONDS)
+        idleCpu = (time.process_time() - cpuStart) / IDLE_SECONDS
+        leader.isFailed = True
+        failStart = time.monotonic()
+        newLeader = waitForLeader(servers, leader)
+        failoverTime = time.monotonic() - failStart
+    print("First leader elected after: {:.3f} s".format(firstLeaderTime))
+    print("Idle CPU (5 servers):       {:.1f}% of one core".format(idleCpu * 100))
+    if newLeader is None:
+        print("Failover:                   no new leader within " + str(LEADER_WAIT_SECONDS) + " s")
+    else:
+        print("Failover to new leader:     {:.3f} s".format(failoverTime))
+
+
+if __name__ == "__main__":
+    runBenchmark()
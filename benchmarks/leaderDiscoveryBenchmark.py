@@ -0,0 +1,88 @@
+# ______________________________________________
+# --------- LEADER DISCOVERY BENCHMARK ---------
+# ==============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.leaderDiscoveryBenchmark
+Drives a five server cluster with a client sending one action at a time, first multicasting every action and then
+caching the leader, and counts the datagrams sent per committed action (by the client, and as redirects by servers
+that are not leader). Each mode runs in a fresh process
+"""
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+from Client import Client
+from Server import Server
+
+BASE_PORT = 7600
+SERVER_IDS = [3, 4, 5, 6, 7]
+ACTION_KEYS = ["A", "S"]  # Blocks only, so the match never ends mid-benchmark
+ACTION_COUNT = 200
+LEADER_WAIT_SECONDS = 30
+
+
+def buildCluster(directory: str) -> tuple:
+    """Constructs and starts the servers (with short timeouts) and one client"""
+    processes = [("Client_Red_0", "127.0.0.1", BASE_PORT)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        group = [process for process in processes if process[0] != name]
+        server = Server(nodeID, name, "127.0.0.1", BASE_PORT + nodeID, group,
+                        os.path.join(directory, name + "_LOG.txt"),
+                        electionTimeoutMs=(150, 300), heartbeatMs=50)
+        Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+        Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+        with server.stateLock:
+            server.markClusterReady()
+        servers.append(server)
+    return servers, processes[1:]
+
+
+def measureDatagrams(useLeaderCache: bool) -> None:
+    """Prints the datagrams sent per committed action with the client's leader cache off or on"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        servers, serverProcesses = buildCluster(tempfile.mkdtemp())
+        client = Client(0, "Client_Red_0", "127.0.0.1", BASE_PORT, serverProcesses, "",
+                        useLeaderCache=useLeaderCache)
+        Thread(target=client.listen, args=(), daemon=True).start()
+        deadline = time.monotonic() + LEADER_WAIT_SECONDS
+        while not any(server.isLeader for server in servers) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.5)  # Let every follower hear the election win
+        committedBefore = max(server.log.lastCommittedEntry for server in servers)
+        for sample in range(ACTION_COUNT):
+            # Closed loop: the next action goes out once the previous one's outcome has arrived
+            message = client.getActionMessage(ACTION_KEYS[sample % len(ACTION_KEYS)])
+            client.lastAction = message
+            client.sendAction(message)
+            while client.pendingAction is not None:
+                time.sleep(0.0005)
+        time.sleep(0.2)
+    committed = max(server.log.lastCommittedEntry for server in servers) - committedBefore
+    redirects = sum(server.redirectsSent for server in servers)
+    print("{:>8}{:>12}{:>18.2f}{:>18.2f}{:>16.2f}".format("on" if useLeaderCache else "off", committed,
+                                                          client.datagramsSent / committed, redirects / committed,
+                                                          (client.datagramsSent + redirects) / committed))
+
+
+def runBenchmark() -> None:
+    """Runs both modes, each in its own process"""
+    print("{:>8}{:>12}{:>18}{:>18}{:>16}".format("CACHE", "COMMITTED", "CLIENT DGRAMS/ACT", "REDIRECTS/ACT",
+                                                 "TOTAL/ACT"))
+    for useLeaderCache in [False, True]:
+        subprocess.run([sys.executable, "-m", "benchmarks.leaderDiscoveryBenchmark", str(useLeaderCache)],
+                       check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        measureDatagrams(sys.argv[1] == "True")
+    else:
+        runBenchmark()
@@ -0,0 +1,77 @@
+# ___________________________________________________
+# --------- LEADERSHIP TRANSFER BENCHMARK -----------
+# ===================================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.leadershipTransferBenchmark
+Rolls a restart through every server of a five server cluster under four closed-loop players in the deterministic
+simulator, over several seeds and with the default 5-15 s and a 150-300 ms election timeout. Each server is stopped,
+kept down and restarted in turn; the leader is either stopped as it is (as the 'f' test command does) or first hands
+leadership to the most caught-up voter (the 'x' test command) and stays up for a moment after, redirecting the
+players to the new leader. Reports the virtual time each leader change left the
+cluster without a leader and the action-to-outcome latencies of the players over the whole rolling restart
+"""
+from ClusterSimulator import ClusterSimulator
+
+SEEDS = range(5)
+ELECTION_LIMIT = 120
+DOWN_SECONDS = 5
+DRAIN_SECONDS = 0.2  # A few of the players' think times
+SETTLE_SECONDS = 5
+TIMINGS = [("5-15 s", (5, 15), 3), ("150-300 ms", (0.15, 0.3), 0.05)]
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Returns the sample at the given fraction of the sorted samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rollRestart(seed: int, timeoutRange: tuple, heartRate: float, useTransfer: bool) -> tuple:
+    """Returns the leaderless virtual seconds of each leader change, the players' latencies during a rolling
+    restart and the safety violations seen"""
+    simulator = ClusterSimulator(seed, playerCount=4, timeoutRange=timeoutRange, heartRate=heartRate)
+    simulator.start()
+    simulator.waitForLeader(ELECTION_LIMIT)
+    simulator.runFor(SETTLE_SECONDS)
+    latenciesBefore = [len(player.latencies) for player in simulator.players]
+    leaderless = []
+    for server in list(simulator.servers):
+        if server is simulator.getLeader() and useTransfer:
+            simulator.transferLeadership(server)
+            leaderless.append(simulator.waitForLeader(ELECTION_LIMIT, server))
+            simulator.runFor(DRAIN_SECONDS)
+            simulator.failServer(server)
+        elif server is simulator.getLeader():
+            simulator.failServer(server)
+            leaderless.append(simulator.waitForLeader(ELECTION_LIMIT, server))
+        else:
+            simulator.failServer(server)
+        simulator.runFor(DOWN_SECONDS)
+        simulator.recoverServer(server)
+        simulator.runFor(SETTLE_SECONDS)
+    latencies = [latency for player, before in zip(simulator.players, latenciesBefore)
+                 for latency in player.latencies[before:]]
+    return leaderless, latencies, simulator.violations
+
+
+def runBenchmark() -> None:
+    print("{:<14}{:<12}{:>10}{:>16}{:>16}{:>16}{:>12}".format("TIMEOUT", "LEADER", "CHANGES", "LEADERLESS ms",
+                                                              "P99 LATENCY ms", "MAX LATENCY ms", "VIOLATIONS"))
+    for timingLabel, timeoutRange, heartRate in TIMINGS:
+        for label, useTransfer in [("stopped", False), ("handed off", True)]:
+            leaderless = []
+            latencies = []
+            violations = []
+            for seed in SEEDS:
+                runLeaderless, runLatencies, runViolations = rollRestart(seed, timeoutRange, heartRate, useTransfer)
+                leaderless += runLeaderless
+                latencies += runLatencies
+                violations += runViolations
+            print("{:<14}{:<12}{:>10}{:>16.1f}{:>16.1f}{:>16.1f}{:>12}".format(
+                timingLabel, label, len(leaderless), sum(leaderless) / len(leaderless) * 1000,
+                percentile(latencies, 0.99) * 1000, max(latencies) * 1000, len(violations)))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,121 @@
+# ______________________________________________
+# --------- LEARNER READ BENCHMARK ------------
+# ==============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.learnerReadBenchmark
+Reports the players' action-to-outcome latency of simulated clusters of three voting servers with 0, 2 and 4
+learners against five and seven voting servers (learners add replicas without growing the majority a commit waits
+for), then has many spectators repeatedly read their matches' committed states from three voters and four learners
+and reports the reads served per virtual second, the read latency and the leader's datagrams per read, for reads
+the leader confirms (ReadIndex) vs. replica reads served by any server or learner
+"""
+import os
+
+from Client import Client
+from ClusterSimulator import ClusterSimulator, SIMULATED_PORT
+
+SEEDS = range(10)
+LOAD_SECONDS = 20
+# (label, voting servers, learners)
+CLUSTERS = [
+    ("3 voters", 3, 0),
+    ("3 voters + 2 learners", 3, 2),
+    ("3 voters + 4 learners", 3, 4),
+    ("5 voters", 5, 0),
+    ("7 voters", 7, 0),
+]
+SEED = 7
+SPECTATORS = 32
+THINK_TIME = 0.01
+READ_SECONDS = 10
+
+
+class Spectator:
+    """Class driving a client closed-loop through read queries of its match, one at a time, recording each
+    read's latency"""
+
+    # CONSTRUCTOR
+    def __init__(self, client: Client, simulator: ClusterSimulator, anyReplica: bool):
+        self.client = client
+        self.simulator = simulator
+        self.anyReplica = anyReplica  # Send replica reads instead of reads the leader confirms
+        self.sentAt = None
+        self.latencies = []
+
+    def sendRead(self) -> None:
+        self.sentAt = self.simulator.scheduler.now()
+        self.client.sendQuery(anyReplica=self.anyReplica)
+
+    def handleMessage(self, data: bytes, address) -> None:
+        self.client.handleMessage(data, address)
+        if self.sentAt is not None and self.client.pendingQuery is None:
+            self.latencies.append(self.simulator.scheduler.now() - self.sentAt)
+            self.sentAt = None
+            self.simulator.scheduler.callLater(THINK_TIME, self.sendRead)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Returns the sample at the given fraction of the sorted samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measureCommitLatency() -> None:
+    """Prints the p50/p99 action-to-outcome latency of two closed-loop players on each cluster"""
+    print("{:<26}{:>12}{:>12}{:>10}".format("COMMIT LATENCY", "P50 (ms)", "P99 (ms)", "ACTIONS"))
+    for label, serverCount, learnerCount in CLUSTERS:
+        latencies = []
+        for seed in SEEDS:
+            simulator = ClusterSimulator(seed, serverCount=serverCount, learnerCount=learnerCount)
+            simulator.start()
+            simulator.waitForLeader(120)
+            simulator.runFor(LOAD_SECONDS)
+            latencies += simulator.getLatencies()
+        print("{:<26}{:>12.2f}{:>12.2f}{:>10}".format(label, percentile(latencies, 0.5) * 1000,
+                                                      percentile(latencies, 0.99) * 1000, len(latencies)))
+
+
+def measureReads(label: str, anyReplica: bool) -> None:
+    """Prints the reads per virtual second, read latency and leader datagrams per read of many spectators"""
+    simulator = ClusterSimulator(SEED, serverCount=3, playerCount=0, learnerCount=4)
+    replicas = [(server.name, server.address, server.port) for server in simulator.getReplicas()]
+    spectators = []
+    with simulator.quiet():
+        for number in range(SPECTATORS):
+            address = ("10.0.2." + str(number), SIMULATED_PORT)
+            client = Client(0, "Client_Spectator_" + str(number), address[0], address[1], replicas, os.devnull,
+                            matchID=number, transport=simulator.network.getTransport(address),
+                            clock=simulator.scheduler.now)
+            spectator = Spectator(client, simulator, anyReplica)
+            simulator.network.attach(address, spectator.handleMessage)
+            spectators.append(spectator)
+    simulator.start()
+    simulator.waitForLeader(120)
+    leader = simulator.getLeader()
+    for spectator in spectators:
+        spectator.client.leader = (leader.name, leader.address, leader.port)
+        spectator.sendRead()
+    simulator.runFor(1)  # Warm up
+    leaderAddress = (leader.address, leader.port)
+    datagramsBefore = simulator.network.datagramsSentBy.get(leaderAddress, 0)
+    readsBefore = sum(len(spectator.latencies) for spectator in spectators)
+    simulator.runFor(READ_SECONDS)
+    reads = sum(len(spectator.latencies) for spectator in spectators) - readsBefore
+    datagrams = simulator.network.datagramsSentBy.get(leaderAddress, 0) - datagramsBefore
+    latencies = [latency for spectator in spectators for latency in spectator.latencies]
+    print("{:<26}{:>12.0f}{:>12.2f}{:>12.2f}{:>16.2f}".format(
+        label, reads / READ_SECONDS, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000,
+        datagrams / reads))
+
+
+def runBenchmark() -> None:
+    measureCommitLatency()
+    print("\n{:<26}{:>12}{:>12}{:>12}{:>16}".format("READS (3 VOTERS + 4 LRN)", "READS/s", "P50 (ms)", "P99 (ms)",
+                                                    "LEADER DGRAM/RD"))
+    measureReads("leader (ReadIndex)", False)
+    measureReads("any replica", True)
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,84 @@
+# _________________________________________
+# --------- LOG MEMORY BENCHMARK ---------
+# =========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.logMemoryBenchmark
+Measures memory per log entry for the old list of deepcopied game states against the array-backed log
+"""
+import copy
+import tracemalloc
+
+from GameState import GameState
+from Log import Log
+
+ENTRIES = 100000
+ACTIONS = ["0_A", "1_S", "0_Q", "1_W", "0_S", "1_A"]
+
+
+class LegacyGameState:
+    """Stand-in for the original dict-backed game state, with the same seven attributes"""
+
+    def __init__(self, gameState: GameState):
+        self.redLeft = gameState.redLeft
+        self.redRight = gameState.redRight
+        self.blueLeft = gameState.blueLeft
+        self.blueRight = gameState.blueRight
+        self.action = gameState.action
+        self.outcome = gameState.outcome
+        self.winner = gameState.winner
+
+
+def buildGameStates() -> list:
+    """Plays a match long enough to produce one game state per entry (restarting it whenever someone wins)"""
+    gameStates = []
+    gameState = GameState()
+    for i in range(ENTRIES):
+        if gameState.winner != 2:
+            gameState = GameState()
+        gameState.updateGameState(ACTIONS[i % len(ACTIONS)])
+        gameStates.append(GameState.fromStateCode(gameState.getStateCode()))
+    return gameStates
+
+
+def measureBytesPerEntry(buildLog, gameStates: list) -> float:
+    """Returns the memory held by whatever buildLog(gameStates) returns, averaged per entry"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    log = buildLog(gameStates)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del log
+    return (after - before) / ENTRIES
+
+
+def buildLegacyLog(gameStates: list) -> list:
+    """The original log: a list of (deepcopied dict-backed game state, term) tuples"""
+    return [(copy.deepcopy(LegacyGameState(gameState)), 1) for gameState in gameStates]
+
+
+def buildSlottedLog(gameStates: list) -> list:
+    """A list of (deepcopied slotted game state, term) tuples"""
+    return [(copy.deepcopy(gameState), 1) for gameState in gameStates]
+
+
+def buildArrayLog(gameStates: list) -> Log:
+    """The array-backed log of terms and packed state codes"""
+    log = Log()
+    for gameState in gameStates:
+        log.appendEntryToLog(gameState, 1)
+    return log
+
+
+def runBenchmark() -> None:
+    """Prints bytes per entry for each log representation"""
+    gameStates = buildGameStates()
+    print("{:<40}{:>16}".format("REPRESENTATION (" + str(ENTRIES) + " entries)", "BYTES/ENTRY"))
+    for name, buildLog in [("list of dict-backed game states", buildLegacyLog),
+                           ("list of slotted game states", buildSlottedLog),
+                           ("array-backed log", buildArrayLog)]:
+        print("{:<40}{:>16.1f}".format(name, measureBytesPerEntry(buildLog, gameStates)))
+
+
+if __name__ == "__main__":
+    runBenchmark()
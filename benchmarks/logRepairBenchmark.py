@@ -0,0 +1,75 @@
+# ________________________________________
+# --------- LOG REPAIR BENCHMARK ---------
+# ========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.logRepairBenchmark
+Builds a leader and a follower log that share a committed prefix and then diverge by thousands of entries from
+different terms, and counts the AppendEntries round trips (and time) the leader needs to find the point where
+they agree: backing off one entry per nack vs. skipping a whole term per nack with the conflict hints
+"""
+import time
+
+from GameState import GameState
+from Log import Log
+
+SHARED_ENTRIES = 1000
+DIVERGED_TERMS = [(2, 1500), (3, 2500), (4, 1000)]  # (term, entries) only the follower holds
+LEADER_TERMS = [(5, 2000), (6, 3000)]  # (term, entries) only the leader holds
+
+
+def buildLog(termRuns: list) -> Log:
+    """Returns a log holding the given runs of (term, entries)"""
+    log = Log()
+    gameState = GameState()
+    for term, count in termRuns:
+        for entry in range(count):
+            log.appendEntryToLog(gameState, term)
+    return log
+
+
+def isInconsistent(follower: Log, prevLogIndex: int, prevLogTerm: int) -> bool:
+    """Mirrors Server.checkForLogInconsistency"""
+    if prevLogIndex <= follower.snapshotIndex:
+        return False
+    if prevLogIndex > follower.lastAppendedEntry:
+        return True
+    return follower.getTermAtIndex(prevLogIndex) != prevLogTerm
+
+
+def repair(useConflictHints: bool) -> tuple:
+    """Returns the round trips and seconds the leader needs to bring the follower's log up to date"""
+    leader = buildLog([(1, SHARED_ENTRIES)] + LEADER_TERMS)
+    follower = buildLog([(1, SHARED_ENTRIES)] + DIVERGED_TERMS)
+    nextIndex = leader.lastAppendedEntry + 1
+    roundTrips = 0
+    start = time.perf_counter()
+    while True:
+        roundTrips += 1
+        prevLogIndex = nextIndex - 1
+        if not isInconsistent(follower, prevLogIndex, leader.getTermAtIndex(prevLogIndex)):
+            follower.appendEntriesAfterIndex(prevLogIndex, leader.getSubLog(nextIndex))
+            break
+        if useConflictHints:
+            conflictTerm, conflictIndex = follower.getConflictHint(prevLogIndex)
+            nextIndex = leader.getNextIndexAfterConflict(conflictTerm, conflictIndex)
+        else:
+            hint = min(follower.lastAppendedEntry + 1, max(prevLogIndex, 0))
+            nextIndex = max(0, min(nextIndex - 1, hint))
+    elapsed = time.perf_counter() - start
+    assert list(follower.terms) == list(leader.terms)
+    return roundTrips, elapsed
+
+
+def runBenchmark() -> None:
+    """Prints round trips and repair time for both back-off strategies"""
+    diverged = sum(count for term, count in DIVERGED_TERMS)
+    print("Follower diverged by " + str(diverged) + " entries over " + str(len(DIVERGED_TERMS)) + " terms\n")
+    print("{:<24}{:>14}{:>14}".format("BACK-OFF", "ROUND TRIPS", "TIME (ms)"))
+    for label, useConflictHints in [("one entry per nack", False), ("one term per nack", True)]:
+        roundTrips, elapsed = repair(useConflictHints)
+        print("{:<24}{:>14}{:>14.1f}".format(label, roundTrips, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    runBenchmark()
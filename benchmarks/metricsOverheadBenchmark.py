@@ -0,0 +1,91 @@
+# _____________________________________________
+# --------- METRICS OVERHEAD BENCHMARK --------
+# =============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.metricsOverheadBenchmark
+Reports the cost of one counter increment, histogram observation and full scrape, and the time a follower takes
+to handle an AppendEntries message with metrics recording on and with it stubbed out (best of three runs)
+"""
+import contextlib
+import os
+import tempfile
+import time
+import urllib.request
+
+from GameState import GameState
+from Metrics import MetricsRegistry
+from Server import Server
+from WireCodec import WireCodec
+from LeaderMessage import LeaderMessage
+
+SAMPLES = 200000
+MESSAGES = 20000
+BASE_PORT = 7900
+
+
+def timePerCall(function, samples: int) -> float:
+    """Returns the nanoseconds function() takes per call"""
+    start = time.perf_counter()
+    for sample in range(samples):
+        function()
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+def timeAppendEntries(server: Server) -> float:
+    """Returns the microseconds the follower takes to handle one single-entry AppendEntries"""
+    gameState = GameState()
+    leaderAddress = ("127.0.0.1", BASE_PORT + 2)
+    start = time.perf_counter()
+    for index in range(MESSAGES):
+        message = LeaderMessage(1, [(gameState, 1)], index - 1, index, 1 if index > 0 else -1, index - 1, index)
+        server.handleMessage(WireCodec.frame("R", WireCodec.encode(message, True)), leaderAddress)
+    return (time.perf_counter() - start) / MESSAGES * 1e6
+
+
+def buildFollower(directory: str, port: int) -> Server:
+    """Returns a follower without a write-ahead log, so its timing is not disk bound"""
+    server = Server(3, "Server_3", "127.0.0.1", port, [("Server_2", "127.0.0.1", BASE_PORT + 2)],
+                    os.path.join(directory, "Server_3_LOG.txt"), useWriteAheadLog=False, snapshotThreshold=10 ** 9,
+                    metricsPort=0)
+    server.persistCommit = lambda: None
+    return server
+
+
+def runBenchmark() -> None:
+    registry = MetricsRegistry()
+    counter = registry.getCounter("counter")
+    histogram = registry.getHistogram("histogram")
+    print("{:<40}{:>12}".format("OPERATION", "NS/CALL"))
+    print("{:<40}{:>12.0f}".format("empty call (loop overhead)", timePerCall(lambda: None, SAMPLES)))
+
+    def incrementCounter() -> None:
+        counter["R"] += 1
+    print("{:<40}{:>12.0f}".format("counter increment", timePerCall(incrementCounter, SAMPLES)))
+    print("{:<40}{:>12.0f}".format("histogram observation", timePerCall(lambda: histogram.observe(0.0001),
+                                                                         SAMPLES)))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        directory = tempfile.mkdtemp()
+        server = buildFollower(directory, BASE_PORT + 3)
+        timeAppendEntries(server)
+    url = "http://127.0.0.1:" + str(server.metricsEndpoint.port) + "/metrics"
+    print("{:<40}{:>12.0f}".format("HTTP scrape of a busy follower", timePerCall(
+        lambda: urllib.request.urlopen(url).read(), 200)))
+    print("{:<40}{:>12.0f}".format("text format of a busy follower", timePerCall(server.metrics.formatText, 200)))
+
+    print("\n{:<40}{:>12}".format("FOLLOWER APPENDENTRIES", "US/MESSAGE"))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        recording = buildFollower(directory, BASE_PORT + 4)
+        stubbed = buildFollower(directory, BASE_PORT + 5)
+        stubbed.messagesReceived = {messageType: 0 for messageType in "SHENYWRAI01"}
+        for histogram in [stubbed.decodeTimes, stubbed.encodeTimes] + list(stubbed.metrics.histograms.values()):
+            histogram.observe = lambda value: None
+        stubbed.metrics.observe = lambda *args: None
+        stubbedTime = min(timeAppendEntries(stubbed) for repeat in range(3))
+        recordingTime = min(timeAppendEntries(recording) for repeat in range(3))
+    print("{:<40}{:>12.2f}".format("metrics stubbed out", stubbedTime))
+    print("{:<40}{:>12.2f}".format("metrics recorded", recordingTime))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,108 @@
+# _________________________________________
+# --------- MULTICAST BENCHMARK -----------
+# =========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.multicastBenchmark
+Builds clusters of 3 to 33 servers on loopback sockets in this process and reports the leader's sendto calls and
+CPU time (user and system) per heartbeat and per one-action AppendEntries batch, sending one datagram per follower
+vs. one datagram to an IP multicast group every follower joined. On loopback the kernel copies each multicast
+datagram to every member's socket within the sender's sendto, so a real network (where the switch replicates it)
+saves more than the system time shown here
+"""
+import contextlib
+import os
+import time
+
+from MulticastChannel import MulticastChannel
+from Server import Server
+
+BASE_PORT = 7400
+MULTICAST_GROUP = ("239.255.0.2", 7399)
+CLUSTER_SIZES = [3, 5, 9, 17, 33]
+ROUNDS = 2000
+
+
+class CountingTransport:
+    """Class counting the sendto calls made through a server's socket"""
+
+    # CONSTRUCTOR
+    def __init__(self, socket):
+        self.socket = socket
+        self.sends = 0
+
+    def sendto(self, data: bytes, address: tuple) -> None:
+        self.sends += 1
+        self.socket.sendto(data, address)
+
+
+def buildCluster(serverCount: int, useMulticast: bool) -> list:
+    """Constructs the servers and makes the first one leader with every follower caught up, without starting any
+    threads (followers' sockets just queue what they are sent)"""
+    processes = [("Server_" + str(nodeID), "127.0.0.1", BASE_PORT + nodeID) for nodeID in range(serverCount)]
+    servers = []
+    for nodeID in range(serverCount):
+        multicastChannel = MulticastChannel(*MULTICAST_GROUP) if useMulticast else None
+        servers.append(Server(nodeID, processes[nodeID][0], "127.0.0.1", BASE_PORT + nodeID,
+                              [process for process in processes if process is not processes[nodeID]], os.devnull,
+                              useWriteAheadLog=False, multicastChannel=multicastChannel))
+    leader = servers[0]
+    leader.isLeader = True
+    leader.isFollower = False
+    leader.currentTerm = 1
+    leader.resetFollowerProgress()
+    leader.transport = CountingTransport(leader.socket)
+    return servers
+
+
+def closeCluster(servers: list) -> None:
+    for server in servers:
+        server.socket.close()
+        if server.multicastSocket is not None:
+            server.multicastSocket.close()
+
+
+def measureLeader(serverCount: int, useMulticast: bool) -> tuple:
+    """Returns the leader's sendto calls and CPU microseconds per heartbeat and per one-action batch"""
+    servers = buildCluster(serverCount, useMulticast)
+    leader = servers[0]
+    heartbeatCPU = 0.0
+    batchCPU = 0.0
+    heartbeatSends = 0
+    batchSends = 0
+    for roundNumber in range(ROUNDS):
+        # every follower has acked everything and was last replicated to long ago, so each needs a beat
+        for process in leader.group:
+            leader.matchIndex[process[0]] = leader.log.lastAppendedEntry
+            leader.nextIndex[process[0]] = leader.log.lastAppendedEntry + 1
+            leader.chunksInFlight[process[0]] = 0
+        leader.lastReplicatedAt = {}
+        sendsBefore = leader.transport.sends
+        start = time.process_time()
+        leader.pulseHeartbeat()
+        heartbeatCPU += time.process_time() - start
+        heartbeatSends += leader.transport.sends - sendsBefore
+
+        leader.pendingActions = ["0_A@" + str(roundNumber)]
+        sendsBefore = leader.transport.sends
+        start = time.process_time()
+        leader.appendActionBatch()
+        batchCPU += time.process_time() - start
+        batchSends += leader.transport.sends - sendsBefore
+    closeCluster(servers)
+    return heartbeatSends / ROUNDS, heartbeatCPU / ROUNDS * 1e6, batchSends / ROUNDS, batchCPU / ROUNDS * 1e6
+
+
+def runBenchmark() -> None:
+    print("{:<10}{:<12}{:>14}{:>14}{:>14}{:>14}".format("SERVERS", "MODE", "BEAT SENDS", "BEAT CPU us",
+                                                        "BATCH SENDS", "BATCH CPU us"))
+    with open(os.devnull, "w") as devnull:
+        for serverCount in CLUSTER_SIZES:
+            for label, useMulticast in [("unicast", False), ("multicast", True)]:
+                with contextlib.redirect_stdout(devnull):
+                    result = measureLeader(serverCount, useMulticast)
+                print("{:<10}{:<12}{:>14.1f}{:>14.1f}{:>14.1f}{:>14.1f}".format(serverCount, label, *result))
+
+
+if __name__ == "__main__":
+    runBenchmark()
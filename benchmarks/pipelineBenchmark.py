@@ -0,0 +1,104 @@
+# ________________________________________
+# --------- PIPELINE BENCHMARK -----------
+# ========================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.pipelineBenchmark
+Brings up three servers in this process (console output sent to /dev/null), fires a burst of client actions at
+the leader as fast as one socket can send them and reports how many actions the kernel dropped before the leader
+read them, how many the leader shed itself and how many committed, with the threaded engine handling every
+datagram on its receiver thread vs. the pipeline of bounded stages. Runs with the write-ahead log and with the
+whole backup rewritten on every commit (the slow step). The receiver thread keeps the kernel's default receive
+buffer, while the pipeline asks for a larger one
+"""
+import contextlib
+import os
+import socket
+import tempfile
+import time
+from threading import Thread
+
+from Server import Server
+from ServerPipeline import ServerPipeline
+
+BASE_PORT = 7600  # Each run takes the next ten ports, as receiver threads keep theirs bound until exit
+SERVER_IDS = [2, 3, 4]
+BURST = 20000
+MATCHES = 64
+IDLE_SECONDS = 0.5
+LIMIT_SECONDS = 60
+
+
+def buildCluster(directory: str, basePort: int, useWriteAheadLog: bool, usePipeline: bool) -> list:
+    """Constructs the servers (plus two client sinks in the group) and starts their receiver and clock threads or
+    their pipelines, with the first server leading term 1"""
+    processes = [("Client_Red_0", "127.0.0.1", basePort), ("Client_Blue_1", "127.0.0.1", basePort + 1)]
+    processes += [("Server_" + str(nodeID), "127.0.0.1", basePort + nodeID) for nodeID in SERVER_IDS]
+    servers = []
+    for nodeID in SERVER_IDS:
+        name = "Server_" + str(nodeID)
+        server = Server(nodeID, name, "127.0.0.1", basePort + nodeID, [p for p in processes if p[0] != name],
+                        os.path.join(directory, name + "_LOG.txt"), useWriteAheadLog=useWriteAheadLog,
+                        snapshotThreshold=10 ** 9)
+        server.currentTerm = 1
+        servers.append(server)
+    leader = servers[0]
+    leader.isLeader = True
+    leader.isFollower = False
+    leader.resetFollowerProgress()
+    leader.startHeartbeats()
+    for server in servers:
+        if usePipeline:
+            server.pipeline = ServerPipeline(server)
+            server.pipeline.start(daemon=True)
+        else:
+            Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+            Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+    return servers
+
+
+def measureBurst(basePort: int, useWriteAheadLog: bool, usePipeline: bool) -> tuple:
+    """Returns the actions the kernel dropped, the leader shed and that committed out of a burst, the seconds to
+    commit everything read and the leader's deepest protocol stage queue"""
+    servers = buildCluster(tempfile.mkdtemp(), basePort, useWriteAheadLog, usePipeline)
+    server = servers[0]
+    sinks = []
+    for port in [basePort, basePort + 1]:
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(("127.0.0.1", port))
+        sinks.append(sink)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    actions = [("0_A@" + str(action % MATCHES)).encode("utf-8") for action in range(BURST)]
+    start = time.perf_counter()
+    for action in actions:
+        sender.sendto(action, ("127.0.0.1", basePort + SERVER_IDS[0]))
+    # done once nothing has been handled or committed for a while
+    handled = committed = -1
+    while time.perf_counter() - start < LIMIT_SECONDS:
+        time.sleep(IDLE_SECONDS)
+        if (server.messagesReceived["0"], server.log.lastCommittedEntry) == (handled, committed):
+            break
+        handled, committed = server.messagesReceived["0"], server.log.lastCommittedEntry
+    elapsed = time.perf_counter() - start - IDLE_SECONDS
+    shed = server.metrics.getCounter("raft_pipeline_dropped_total")["protocol"]
+    highWater = server.pipeline.protocol.highWater if usePipeline else 0
+    for closing in sinks + [sender]:
+        closing.close()
+    return BURST - handled - shed, shed, committed + 1, elapsed, highWater
+
+
+def runBenchmark() -> None:
+    print("{:<18}{:<12}{:>16}{:>12}{:>12}{:>14}{:>16}".format("PERSISTENCE", "ENGINE", "KERNEL DROPPED", "SHED",
+                                                              "COMMITTED", "SECONDS", "QUEUE HIGH"))
+    basePort = BASE_PORT
+    with open(os.devnull, "w") as devnull:
+        for label, useWriteAheadLog in [("write-ahead log", True), ("backup rewrite", False)]:
+            for engine, usePipeline in [("receiver", False), ("pipeline", True)]:
+                with contextlib.redirect_stdout(devnull):
+                    result = measureBurst(basePort, useWriteAheadLog, usePipeline)
+                basePort += 10
+                print("{:<18}{:<12}{:>16}{:>12}{:>12}{:>14.2f}{:>16}".format(label, engine, *result))
+
+
+if __name__ == "__main__":
+    runBenchmark()
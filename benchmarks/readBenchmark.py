@@ -0,0 +1,89 @@
+# _____________________________________
+# --------- READ BENCHMARK ------------
+# =====================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.readBenchmark
+Runs a five server simulated cluster with a reader that repeatedly asks for its match's committed state, and
+reports each way of reading's latency, datagrams per read and log entries appended per read: submitting
+an action (the only way before read queries), a ReadIndex query confirmed by one round of leader confirmations and a
+query answered on the leader's lease
+"""
+import os
+
+from Client import Client
+from ClusterSimulator import ClusterSimulator, SIMULATED_PORT
+
+SEED = 7
+READS = 2000
+THINK_TIME = 0.01
+LEASE_DURATION = 4.5  # Shorter than the simulator's shortest election timeout (5 s)
+
+
+class Reader:
+    """Class driving a client closed-loop through reads, one at a time, recording each read's latency"""
+
+    # CONSTRUCTOR
+    def __init__(self, client: Client, simulator: ClusterSimulator, useActions: bool):
+        self.client = client
+        self.simulator = simulator
+        self.useActions = useActions  # Read by submitting a block action and waiting for its outcome instead
+        self.sentAt = None
+        self.latencies = []
+
+    def sendRead(self) -> None:
+        self.sentAt = self.simulator.scheduler.now()
+        if self.useActions:
+            self.client.sendAction(self.client.getActionMessage("A"))
+        else:
+            self.client.sendQuery()
+
+    def handleMessage(self, data: bytes, address) -> None:
+        self.client.handleMessage(data, address)
+        pending = self.client.pendingAction if self.useActions else self.client.pendingQuery
+        if self.sentAt is not None and pending is None and len(self.latencies) < READS:
+            self.latencies.append(self.simulator.scheduler.now() - self.sentAt)
+            self.sentAt = None
+            self.simulator.scheduler.callLater(THINK_TIME, self.sendRead)
+
+
+def measureReads(label: str, useActions: bool, leaseDuration: float) -> None:
+    """Prints the p50/p99 latency, datagrams and log entries per read of one way of reading"""
+    simulator = ClusterSimulator(SEED, playerCount=0)
+    address = ("10.0.2.0", SIMULATED_PORT)
+    for server in simulator.servers:
+        server.leaseDuration = leaseDuration
+        server.group.append(("Client_Reader", address[0], address[1]))  # Outcomes of committed actions go to it
+    with simulator.quiet():
+        servers = [(server.name, server.address, server.port) for server in simulator.servers]
+        client = Client(0, "Client_Reader", address[0], address[1], servers, os.devnull, matchID=100,
+                        transport=simulator.network.getTransport(address), clock=simulator.scheduler.now)
+    reader = Reader(client, simulator, useActions)
+    simulator.network.attach(address, reader.handleMessage)
+    simulator.start()
+    simulator.waitForLeader(120)
+    simulator.runFor(5)  # Let a lease be granted
+    leader = simulator.getLeader()
+    datagramsBefore = simulator.network.datagramsSent
+    entriesBefore = leader.log.lastAppendedEntry
+    reader.sendRead()
+    simulator.runUntil(lambda: len(reader.latencies) >= READS, 600, 0.01)
+    # the datagrams include the cluster's heartbeats over the run (a few per second)
+    datagrams = simulator.network.datagramsSent - datagramsBefore
+    entries = leader.log.lastAppendedEntry - entriesBefore
+    latencies = sorted(reader.latencies)
+    print("{:<22}{:>12.2f}{:>12.2f}{:>16.2f}{:>14.2f}".format(
+        label, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000,
+        datagrams / READS, entries / READS))
+
+
+def runBenchmark() -> None:
+    print("{:<22}{:>12}{:>12}{:>16}{:>14}".format("READ", "P50 (ms)", "P99 (ms)", "DATAGRAMS/READ",
+                                                  "ENTRIES/READ"))
+    measureReads("action (append)", True, None)
+    measureReads("ReadIndex query", False, None)
+    measureReads("lease query", False, LEASE_DURATION)
+
+
+if __name__ == "__main__":
+    runBenchmark()
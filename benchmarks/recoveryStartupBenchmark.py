@@ -0,0 +1,81 @@
+# ______________________________________________
+# --------- RECOVERY STARTUP BENCHMARK ---------
+# ==============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.recoveryStartupBenchmark
+Writes logs of 10^5 and 10^6 entries (over many matches and terms) as a jsonpickle backup, a write-ahead log with
+no snapshot and an indexed backup, and reports how long Server.loadAndRecoverLog takes on each before the node
+can serve, then how long the first replication read (the newest 100 entries) takes on the recovered log
+"""
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import jsonpickle
+
+from GameState import GameState
+from IndexedBackup import IndexedBackup
+from Log import Log
+from Server import Server
+from WriteAheadLog import WriteAheadLog
+
+LOG_LENGTHS = [10 ** 5, 10 ** 6]
+MATCHES = 64
+ENTRIES_PER_TERM = 10000
+JSONPICKLE_LIMIT = 10 ** 5  # Writing (and reading) a larger jsonpickle backup takes minutes
+
+
+def buildLog(length: int) -> Log:
+    """Builds a log of blocks spread over MATCHES matches, with a new term every ENTRIES_PER_TERM entries"""
+    log = Log()
+    matches = [GameState(match) for match in range(MATCHES)]
+    for index in range(length):
+        gameState = matches[index % MATCHES]
+        gameState.updateGameState("0_A" if index // MATCHES % 2 == 0 else "1_S")
+        log.appendEntryToLog(gameState, 1 + index // ENTRIES_PER_TERM)
+    log.lastCommittedEntry = length - 1
+    return log
+
+
+def timeRecovery(node: SimpleNamespace) -> tuple:
+    """Returns the seconds loadAndRecoverLog takes and the seconds of the first replication read afterwards"""
+    start = time.perf_counter()
+    Server.loadAndRecoverLog(node)
+    recovered = time.perf_counter()
+    node.log.getSubLog(node.log.lastAppendedEntry - 99)
+    return recovered - start, time.perf_counter() - recovered
+
+
+def runBenchmark() -> None:
+    print("{:>10}{:>26}{:>12}{:>16}{:>12}".format("ENTRIES", "BACKUP", "BYTES", "RECOVERY (ms)", "READ (ms)"))
+    for length in LOG_LENGTHS:
+        log = buildLog(length)
+        expected = (log.lastCommittedEntry, log.lastAppendedEntry, len(log.getLatestGameStates()))
+        with tempfile.TemporaryDirectory() as directory:
+            backupPath = os.path.join(directory, "backup.txt")
+            runs = []
+            if length <= JSONPICKLE_LIMIT:
+                with open(backupPath, "w") as backupFile:
+                    backupFile.write(jsonpickle.encode(log))
+                runs.append(("jsonpickle", backupPath, None))
+            writeAheadLog = WriteAheadLog(os.path.join(directory, "wal"), segmentBytes=64 * 1024 * 1024)
+            writeAheadLog.writeAndSync(writeAheadLog.encodeEntries(0, log.getSubLog(0)) +
+                                       [writeAheadLog.encodeCommit(log.lastCommittedEntry)])
+            runs.append(("write-ahead log replay", None, writeAheadLog))
+            indexedPath = os.path.join(directory, "indexed.bin")
+            IndexedBackup.write(log, indexedPath)
+            runs.append(("indexed (mmap)", indexedPath, None))
+            for label, path, wal in runs:
+                node = SimpleNamespace(backupPath=path, writeAheadLog=wal, log=None, matches=None)
+                recovery, read = timeRecovery(node)
+                assert (node.log.lastCommittedEntry, node.log.lastAppendedEntry, len(node.matches)) == expected
+                size = os.path.getsize(path) if path is not None else sum(
+                    os.path.getsize(segmentPath) for segmentPath in wal.getSegmentPaths())
+                print("{:>10}{:>26}{:>12}{:>16.1f}{:>12.2f}".format(length, label, size, recovery * 1000,
+                                                                     read * 1000))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,136 @@
+# ______________________________________
+# --------- SHARDING BENCHMARK ---------
+# ======================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.shardingBenchmark
+Hosts 1, 2 and 4 independent three server Raft groups, each in its own process, and offers client actions for
+many concurrent matches (routed to their groups by a routing table) at a fixed rate per group, reporting the
+aggregate committed actions/sec observed by a client (counting outcomes only, not the redirects followers answer
+with; like Client, actions go to every server of a group until one of them names the leader)
+"""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+from GameState import OUTCOMES
+from RoutingTable import RoutingTable
+from Server import Server
+
+BASE_PORT = 7500
+CLIENT_PORT = BASE_PORT
+SERVER_IDS = [3, 4, 5]
+GROUP_COUNTS = [1, 2, 4]
+MATCHES_PER_GROUP = 16
+ACTIONS = ["0_A", "0_S", "1_A", "1_S"]  # Blocks only, so no match ends mid-benchmark
+RATE_PER_GROUP = 1500
+SEND_SECONDS = 2
+DRAIN_SECONDS = 2
+ELECTION_SECONDS = 2
+
+
+def buildRoutingTable(groupCount: int) -> RoutingTable:
+    """Returns the routing table of groupCount three server Raft groups and one client"""
+    routingTable = RoutingTable()
+    routingTable.addProcess("-", 0, "Client_Red_0", "127.0.0.1", CLIENT_PORT, "")
+    for groupID in range(groupCount):
+        for nodeID in SERVER_IDS:
+            name = "Server_" + str(nodeID)
+            routingTable.addProcess(groupID, nodeID, name, "127.0.0.1", BASE_PORT + 10 * (groupID + 1) + nodeID,
+                                    name + "_" + str(groupID) + "_LOG.txt")
+    return routingTable
+
+
+def hostGroup(groupCount: int, groupID: int) -> None:
+    """Runs the servers of one Raft group, with short timeouts, until the process is killed"""
+    directory = tempfile.mkdtemp()
+    routingTable = buildRoutingTable(groupCount)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for processGroupID, nodeID, name, address, port, backupPath in list(routingTable.processes.values()):
+            if processGroupID != groupID:
+                continue
+            server = Server(nodeID, name, address, port, routingTable.getGroupMembers(groupID, name),
+                            os.path.join(directory, backupPath), electionTimeoutMs=(150, 300), heartbeatMs=50)
+            Thread(target=server.mainIncomingLoop, args=(), daemon=True).start()
+            Thread(target=server.mainClockLoop, args=(), daemon=True).start()
+            with server.stateLock:
+                server.markClusterReady()
+        while True:
+            time.sleep(60)
+
+
+def measureThroughput(groupCount: int) -> None:
+    """Prints the aggregate committed actions/sec a client sees over groupCount Raft groups"""
+    routingTable = buildRoutingTable(groupCount)
+    hosts = [subprocess.Popen([sys.executable, "-m", "benchmarks.shardingBenchmark", "host", str(groupCount),
+                               str(groupID)]) for groupID in range(groupCount)]
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.bind(("127.0.0.1", CLIENT_PORT))
+    client.settimeout(0.5)
+    outcomeTimes = []
+    leaders = {}  # Networking tuple of each Raft group's leader, keyed by group ID, once a follower names it
+    groupIDs = {(process[1], process[2]): groupID for groupID, servers in routingTable.groups.items()
+                for process in servers}
+
+    def countOutcomes() -> None:
+        while True:
+            try:
+                data, address = client.recvfrom(16384)
+            except socket.timeout:
+                continue
+            except OSError:
+                continue  # ICMP port unreachable from a server that is not up yet
+            fields = data.decode("utf-8").split("$")
+            if fields[0] == "L" and int(fields[1]) >= 0:
+                groupID = groupIDs[address]
+                leaders[groupID] = next(process for process in routingTable.groups[groupID]
+                                        if process[0] == "Server_" + fields[1])
+            elif fields[0] in OUTCOMES[1:]:
+                outcomeTimes.append(time.perf_counter())
+
+    try:
+        time.sleep(ELECTION_SECONDS)
+        Thread(target=countOutcomes, args=(), daemon=True).start()
+        matchCount = MATCHES_PER_GROUP * groupCount
+        offeredRate = RATE_PER_GROUP * groupCount
+        start = time.perf_counter()
+        for sample in range(offeredRate * SEND_SECONDS):
+            delay = start + sample / offeredRate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            matchID = sample % matchCount
+            message = (ACTIONS[sample // matchCount % len(ACTIONS)] + "@" + str(matchID)).encode("utf-8")
+            # Like Client, send to the group's leader once known and to every server of the group until then
+            groupID = routingTable.getGroupID(matchID)
+            for process in [leaders[groupID]] if groupID in leaders else routingTable.getServers(matchID):
+                client.sendto(message, (process[1], process[2]))
+        time.sleep(DRAIN_SECONDS)
+    finally:
+        for host in hosts:
+            host.kill()
+    committed = len(outcomeTimes)
+    elapsed = (outcomeTimes[-1] - start) if committed > 0 else SEND_SECONDS
+    print("{:>8}{:>10}{:>12}{:>14.0f}{:>12}".format(groupCount, groupCount * MATCHES_PER_GROUP,
+                                                    RATE_PER_GROUP * groupCount, committed / elapsed, committed))
+
+
+def runBenchmark() -> None:
+    """Runs every group count in its own process"""
+    print("CPU cores: " + str(os.cpu_count()))
+    print("{:>8}{:>10}{:>12}{:>14}{:>12}".format("GROUPS", "MATCHES", "OFFERED/s", "COMMITTED/s", "COMMITTED"))
+    for groupCount in GROUP_COUNTS:
+        subprocess.run([sys.executable, "-m", "benchmarks.shardingBenchmark", str(groupCount)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "host":
+        hostGroup(int(sys.argv[2]), int(sys.argv[3]))
+    elif len(sys.argv) > 1:
+        measureThroughput(int(sys.argv[1]))
+    else:
+        runBenchmark()
@@ -0,0 +1,77 @@
+# ______________________________________
+# --------- TIMING BENCHMARK -----------
+# ======================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.timingBenchmark
+Runs five server clusters in the deterministic simulator (0.5-2 ms one-way delay, as on a LAN) over many seeds and
+reports the virtual time from failing the leader to a new one under the default 5-15 s election timeout and 3 s
+heartbeat, a fixed 150-300 ms timeout and 50 ms heartbeat, and adaptive timing derived from measured round trips.
+Then partitions a follower away from a healthy cluster for a minute and reports the terms it adds to the cluster's
+and the leader changes once it rejoins, with and without pre-vote
+"""
+from ClusterSimulator import ClusterSimulator
+
+SEEDS = range(20)
+ELECTION_LIMIT = 120
+SETTLE_SECONDS = 10
+PARTITION_SECONDS = 60
+REJOIN_SECONDS = 10
+TIMINGS = [("default 5-15 s / 3 s", {}),
+           ("fixed 150-300 ms / 50 ms", {"timeoutRange": (0.15, 0.3), "heartRate": 0.05}),
+           ("adaptive", {"adaptiveTiming": True})]
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Returns the sample at the given fraction of the sorted samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measureFailover(seed: int, settings: dict) -> tuple:
+    """Returns the virtual seconds from failing a settled leader to a new one, and the heartbeat interval the
+    leader settled on"""
+    simulator = ClusterSimulator(seed, playerCount=0, **settings)
+    simulator.start()
+    simulator.waitForLeader(ELECTION_LIMIT)
+    simulator.runFor(SETTLE_SECONDS)  # Long enough for adaptive timing to shorten the timeouts it drew at start
+    leader = simulator.getLeader()
+    heartRate = leader.heartRate
+    simulator.failServer(leader)
+    return simulator.waitForLeader(ELECTION_LIMIT, leader), heartRate
+
+
+def measureDisruption(seed: int, preVote: bool) -> tuple:
+    """Returns the terms started and the leader changes after a follower partitioned away rejoins"""
+    simulator = ClusterSimulator(seed, playerCount=0, timeoutRange=(0.15, 0.3), heartRate=0.05, preVote=preVote)
+    simulator.start()
+    simulator.waitForLeader(ELECTION_LIMIT)
+    simulator.runFor(SETTLE_SECONDS)
+    leader = simulator.getLeader()
+    follower = next(server for server in simulator.servers if server is not leader)
+    simulator.partition([[follower], [server for server in simulator.servers if server is not follower]])
+    simulator.runFor(PARTITION_SECONDS)
+    term = max(server.currentTerm for server in simulator.servers if server is not follower)
+    simulator.heal()
+    simulator.runFor(REJOIN_SECONDS)
+    newLeader = simulator.getLeader()
+    return max(server.currentTerm for server in simulator.servers) - term, int(newLeader is not leader)
+
+
+def runBenchmark() -> None:
+    print("{:<28}{:>12}{:>12}{:>12}{:>16}".format("FAILOVER (ms)", "P50", "P99", "MAX", "HEARTBEAT (ms)"))
+    for label, settings in TIMINGS:
+        results = [measureFailover(seed, settings) for seed in SEEDS]
+        failovers = [failover * 1000 for failover, heartRate in results]
+        print("{:<28}{:>12.0f}{:>12.0f}{:>12.0f}{:>16.1f}".format(
+            label, percentile(failovers, 0.5), percentile(failovers, 0.99), max(failovers),
+            sum(heartRate for failover, heartRate in results) / len(results) * 1000))
+    print("\n{:<28}{:>16}{:>16}".format("REJOINING FOLLOWER", "TERMS ADDED", "LEADER CHANGES"))
+    for label, preVote in [("without pre-vote", False), ("with pre-vote", True)]:
+        results = [measureDisruption(seed, preVote) for seed in SEEDS]
+        print("{:<28}{:>16}{:>16}".format(label, sum(terms for terms, changes in results),
+                                          sum(changes for terms, changes in results)))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,55 @@
+# ______________________________________________
+# --------- WIRE CODEC MICROBENCHMARK ---------
+# ==============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.wireCodecBenchmark
+Compares bytes per message and encode/decode nanoseconds per message for jsonpickle and the binary codec
+"""
+import time
+
+from ElectionMessage import ElectionMessage
+from FollowerMessage import FollowerMessage
+from GameState import GameState
+from LeaderMessage import LeaderMessage
+from WireCodec import WireCodec
+
+ITERATIONS = 2000
+
+
+def buildSampleMessages() -> dict:
+    """Builds one of each message the servers exchange, using a realistic mid-match game state"""
+    gameState = GameState()
+    for action in ["0_A", "1_S", "0_Q", "1_W"]:
+        gameState.updateGameState(action)
+    correctionLog = [(GameState.fromStateCode(gameState.getStateCode()), term // 10) for term in range(100)]
+    return {
+        "R (1 entry)": LeaderMessage(4, correctionLog[:1], 10, 11, 4, 10, 11),
+        "R (100 entries)": LeaderMessage(4, correctionLog, 98, 99, 4, -1, 0),
+        "A (follower ack)": FollowerMessage(4, True, 10, 12),
+        "E (election)": ElectionMessage(3, 5, 10, 4),
+    }
+
+
+def timePerMessage(function, argument) -> float:
+    """Returns the mean wall time in nanoseconds of calling function(argument)"""
+    start = time.perf_counter_ns()
+    for i in range(ITERATIONS):
+        function(argument)
+    return (time.perf_counter_ns() - start) / ITERATIONS
+
+
+def runBenchmark() -> None:
+    """Prints a table of payload size and codec cost for both encodings of every sample message"""
+    print("{:<20}{:<12}{:>10}{:>14}{:>14}".format("MESSAGE", "CODEC", "BYTES", "ENCODE ns", "DECODE ns"))
+    for name, message in buildSampleMessages().items():
+        for codecName, useBinary in [("jsonpickle", False), ("binary", True)]:
+            payload = WireCodec.encode(message, useBinary)
+            encodeTime = timePerMessage(lambda m: WireCodec.encode(m, useBinary), message)
+            decodeTime = timePerMessage(WireCodec.decode, payload)
+            print("{:<20}{:<12}{:>10}{:>14.0f}{:>14.0f}".format(name, codecName, len(payload), encodeTime,
+                                                                 decodeTime))
+
+
+if __name__ == "__main__":
+    runBenchmark()
@@ -0,0 +1,79 @@
+# _____________________________________________
+# --------- WRITE-AHEAD LOG BENCHMARK ---------
+# =============================================
+"""
+RUN COMMAND (from the repository root):
+    python -m benchmarks.writeAheadLogBenchmark
+Compares commits/sec against log length for the old full-backup rewrite and the segmented write-ahead log
+"""
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from GameState import GameState
+from Log import Log
+from Metrics import MetricsRegistry
+from Server import Server
+from WriteAheadLog import WriteAheadLog
+
+LOG_LENGTHS = [100, 1000, 5000]
+COMMITS = 50
+GROUP_SIZE = 10
+
+
+def buildLog(length: int) -> Log:
+    """Builds a log of the given length, alternating blocks so every entry holds a distinct game state"""
+    log = Log()
+    gameState = GameState()
+    for i in range(length):
+        gameState.updateGameState("0_A" if i % 2 == 0 else "1_S")
+        log.appendEntryToLog(GameState.fromStateCode(gameState.getStateCode()), 1)
+    return log
+
+
+def timeRewriteCommits(log: Log, directory: str) -> float:
+    """Returns commits/sec for the old path, where each commit rewrites the whole jsonpickled log (no fsync)"""
+    node = SimpleNamespace(backupPath=os.path.join(directory, "backup.txt"), log=log, useIndexedBackup=False,
+                           metrics=MetricsRegistry())
+    start = time.perf_counter()
+    for i in range(COMMITS):
+        log.appendEntryToLog(log.logList[-1][0], 1)
+        log.commitEntryToLog()
+        Server.writeLogtoFile(node)
+    return COMMITS / (time.perf_counter() - start)
+
+
+def timeWriteAheadCommits(log: Log, directory: str, groupSize: int) -> float:
+    """Returns commits/sec for the write-ahead log, waiting for durability after every groupSize commits"""
+    writeAheadLog = WriteAheadLog(os.path.join(directory, "wal"))
+    writeAheadLog.appendEntries(0, log.logList)
+    writeAheadLog.flush()
+    start = time.perf_counter()
+    for i in range(COMMITS):
+        log.appendEntryToLog(log.logList[-1][0], 1)
+        log.commitEntryToLog()
+        writeAheadLog.appendEntries(log.lastAppendedEntry, log.getSubLog(log.lastAppendedEntry))
+        writeAheadLog.appendCommit(log.lastCommittedEntry)
+        if (i + 1) % groupSize == 0:
+            writeAheadLog.flush()
+    writeAheadLog.flush()
+    return COMMITS / (time.perf_counter() - start)
+
+
+def runBenchmark() -> None:
+    """Prints commits/sec for each persistence path at each log length"""
+    print("{:>10}{:>18}{:>18}{:>18}".format("LOG LENGTH", "REWRITE c/s", "WAL SYNC c/s",
+                                            "WAL GROUP" + str(GROUP_SIZE) + " c/s"))
+    for length in LOG_LENGTHS:
+        with tempfile.TemporaryDirectory() as directory:
+            rewrite = timeRewriteCommits(buildLog(length), directory)
+        with tempfile.TemporaryDirectory() as directory:
+            walSync = timeWriteAheadCommits(buildLog(length), directory, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            walGroup = timeWriteAheadCommits(buildLog(length), directory, GROUP_SIZE)
+        print("{:>10}{:>18.0f}{:>18.0f}{:>18.0f}".format(length, rewrite, walSync, walGroup))
+
+
+if __name__ == "__main__":
+    runBenchmark()
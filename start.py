@@ -2,52 +2,52 @@
 # --------- START-UP FUNCTION & PROCESS INITIALIZATION -----------
 # ================================================================
 """
-LOCAL RUN COMMAND:
+LOCAL RUN COMMAND (prompts for everything it is not given):
     python PycharmProjects/520-DS_Proj2/start.py
+NON-INTERACTIVE RUN COMMAND (e.g. a server on the asyncio engine, or a client in match 3):
+    python start.py --id 2 --config config.txt --env local --engine asyncio
+    python start.py --id 0 --env local --match 3
 """
+import argparse
 import os
 
+from AsyncServerEngine import AsyncServerEngine
 from Client import Client
+from MulticastChannel import MulticastChannel
+from RoutingTable import RoutingTable
 from Server import Server
 
+AWS_CONFIG_PATH = "/home/ec2-user/520-DS_Proj2/config.txt"
 
-def processStartup() -> None:
-    """Function to take user input and read from a configuration file to initialize a specific process node"""
-    # Greet and get input
-    print("=========================================================================================================")
-    print("Hello! Welcome to a Raft consensus implementation of Rock-Em-Sock-Em Robots over multiple game servers...")
-    print("=========================================================================================================\n")
-    print("Is this process node running locally or on Amazon Web Services?")
-    awsOrLocal = input("Type 'local' or 'AWS'\n-> ")
-    while awsOrLocal not in ["local", "LOCAL", "l", "L", "aws", "AWS", "a", "A"]:
-        awsOrLocal = input("Invalid! Please type 'local' or 'AWS'\n-> ")
-    processID = int(input("Provide the Process ID as an integer:\n-> "))
-    while processID not in range(7):
-        processID = int(input("Invalid! Provide the Process ID as an integer:\n-> "))
+
+def processStartup(arguments: argparse.Namespace) -> None:
+    """Function to take user input (or command line arguments) and read from a configuration file to initialize a
+    specific process node"""
+    interactive = arguments.id is None
+    awsOrLocal = arguments.env
+    processID = arguments.id
+    if interactive:
+        # Greet and get input
+        print("=====================================================================================================")
+        print("Hello! Welcome to a Raft consensus implementation of Rock-Em-Sock-Em Robots over multiple game "
+              "servers...")
+        print("=====================================================================================================\n")
+        print("Is this process node running locally or on Amazon Web Services?")
+        awsOrLocal = input("Type 'local' or 'AWS'\n-> ")
+        while awsOrLocal not in ["local", "LOCAL", "l", "L", "aws", "AWS", "a", "A"]:
+            awsOrLocal = input("Invalid! Please type 'local' or 'AWS'\n-> ")
+        processID = int(input("Provide the Process ID as an integer:\n-> "))
+    isLocal = awsOrLocal in ["local", "Local", "LOCAL", "l", "L"]
     # Set the absolute path to the configuration file
     workingDir = os.getcwd()
-    configFilePath = ""
-    if awsOrLocal == "local" or awsOrLocal == "Local" or awsOrLocal == "LOCAL" or awsOrLocal == "l" or awsOrLocal == "L":
-        configFilePath = os.path.join(workingDir, "config.txt")
-    elif awsOrLocal == "aws" or awsOrLocal == "Aws" or awsOrLocal == "AWS" or awsOrLocal == "a" or awsOrLocal == "A":
-        configFilePath = "/home/ec2-user/520-DS_Proj2/config.txt"
-    # Read config file and split on lines
-    with open(configFilePath, "r") as config:
-        configAsString = config.read()
-    configLines = configAsString.split("\n")
-    # Get configurations
-    configurations = []
-    for line in range(len(configLines)):
-        if configLines[line] == "$LOCAL$" and (
-                awsOrLocal == "local" or awsOrLocal == "Local" or awsOrLocal == "LOCAL" or awsOrLocal == "l" or awsOrLocal == "L"):
-            for processLine in range(1, 8):
-                processConfigs = configLines[line + processLine].split(" ")
-                configurations.append(processConfigs)
-        elif configLines[line] == "$AWS$" and (
-                awsOrLocal == "aws" or awsOrLocal == "Aws" or awsOrLocal == "AWS" or awsOrLocal == "a" or awsOrLocal == "A"):
-            for processLine in range(1, 8):
-                processConfigs = configLines[line + processLine].split(" ")
-                configurations.append(processConfigs)
+    configFilePath = arguments.config
+    if configFilePath is None:
+        configFilePath = os.path.join(workingDir, "config.txt") if isLocal else AWS_CONFIG_PATH
+    configurations = readConfigSection(configFilePath, "$LOCAL$" if isLocal else "$AWS$")
+    while processID not in [int(process[0]) for process in configurations]:
+        if not interactive:
+            raise SystemExit("Process ID " + str(processID) + " is not in " + configFilePath)
+        processID = int(input("Invalid! Provide the Process ID as an integer:\n-> "))
     # Parse out this process's configurations and form node group
     name = ""
     publicIP = ""
@@ -77,13 +77,86 @@ def processStartup() -> None:
     print("\n")
     # Initialize process based on type and launch threads
     if name[0] == "C":
-        thisClient = Client(processID, name, privateIP, port, group, backupPath)
+        matchID = arguments.match
+        shardFile = arguments.shards
+        if interactive:
+            matchID = input("Provide the match ID to play in (default 0):\n-> ")
+            shardFile = input("Provide a shard file routing matches over several Raft groups (default none):\n-> ")
+        routingTable = None
+        if shardFile is not None and shardFile != "":
+            routingTable = RoutingTable.fromShardFile(os.path.join(workingDir, shardFile))
+        thisClient = Client(processID, name, privateIP, port, group, backupPath,
+                            int(matchID) if matchID is not None and matchID != "" else 0, routingTable)
         thisClient.startThreads()
-    elif name[0] == "S":
-        thisServer = Server(processID, name, privateIP, port, group, backupPath)
-        thisServer.startThreads()
+    elif name[0] == "S" or name[0] == "L":
+        # learners ('Learner_<id>') run as servers that never vote or lead
+        metricsPort = arguments.metrics_port
+        multicastGroup = arguments.multicast
+        engine = arguments.engine
+        if interactive:
+            metricsPort = input("Provide a local port to serve metrics on over HTTP (default none):\n-> ")
+            multicastGroup = input("Provide a multicast group as <ip>:<port> to broadcast heartbeats and "
+                                   "replication on, e.g. 239.255.0.1:5000 (default none, every server must use "
+                                   "the same one):\n-> ")
+        multicastChannel = None
+        if multicastGroup is not None and multicastGroup != "":
+            multicastChannel = MulticastChannel(multicastGroup.split(":")[0], int(multicastGroup.split(":")[1]),
+                                                privateIP)
+        thisServer = Server(processID, name, privateIP, port, group, backupPath,
+                            metricsPort=int(metricsPort) if metricsPort is not None and metricsPort != "" else None,
+                            isLearner=name[0] == "L", multicastChannel=multicastChannel,
+                            electionTimeoutMs=tuple(arguments.election_timeout_ms), heartbeatMs=arguments.heartbeat_ms,
+                            preVote=not arguments.no_pre_vote, adaptiveTiming=arguments.adaptive_timing)
+        if interactive:
+            engine = input("Run the server on 'threads' or the single-threaded 'asyncio' engine? (default "
+                           "threads)\n-> ")
+        if engine == "asyncio" or engine == "ASYNCIO" or engine == "a" or engine == "A":
+            AsyncServerEngine([thisServer]).runForever()
+        else:
+            thisServer.startThreads()
+
+
+def readConfigSection(configFilePath: str, section: str) -> list:
+    """Returns the split process lines of a section of a configuration file"""
+    # Read config file and split on lines
+    with open(configFilePath, "r") as config:
+        configLines = config.read().split("\n")
+    for line in range(len(configLines)):
+        if configLines[line] == section:
+            return readProcessLines(configLines, line + 1)
+    return []
+
+
+def readProcessLines(configLines: list, firstLine: int) -> list:
+    """Returns the split process lines of a config section, which runs up to the first blank line"""
+    configurations = []
+    for processLine in configLines[firstLine:]:
+        if processLine.strip() == "":
+            break
+        configurations.append(processLine.split(" "))
+    return configurations
+
+
+def parseArguments(argv: list = None) -> argparse.Namespace:
+    """Parses the command line; without --id every setting is prompted for instead"""
+    parser = argparse.ArgumentParser(description="Starts one server, learner or client of the Raft cluster")
+    parser.add_argument("--id", type=int, help="process ID of this node in the configuration file")
+    parser.add_argument("--config", help="configuration file (default config.txt, or the AWS path with --env aws)")
+    parser.add_argument("--env", default="local", choices=["local", "aws"], help="configuration section to use")
+    parser.add_argument("--engine", default="threads", choices=["threads", "asyncio"], help="server engine")
+    parser.add_argument("--metrics-port", type=int, help="local port to serve a server's metrics on over HTTP")
+    parser.add_argument("--multicast", help="multicast group <ip>:<port> for a server's broadcasts")
+    parser.add_argument("--election-timeout-ms", type=int, nargs=2, default=[5000, 15000], metavar=("LOW", "HIGH"),
+                        help="bounds a server's election timeout is drawn from (default 5000 15000)")
+    parser.add_argument("--heartbeat-ms", type=int, default=3000, help="leader heartbeat interval (default 3000)")
+    parser.add_argument("--no-pre-vote", action="store_true", help="start elections without asking for pre-votes")
+    parser.add_argument("--adaptive-timing", action="store_true",
+                        help="derive the heartbeat and election timeouts from measured round trips")
+    parser.add_argument("--match", type=int, help="match ID a client plays in (default 0)")
+    parser.add_argument("--shards", help="shard file routing a client's matches over several Raft groups")
+    return parser.parse_args(argv)
 
 
 # START-UP SCRIPT
 if __name__ == "__main__":
-    processStartup()
+    processStartup(parseArguments())
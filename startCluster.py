@@ -1,10 +1,153 @@
+# ____________________________________________________________
+# --------- LAUNCHER FOR A WHOLE CLUSTER (ONE HOST) ----------
+# ============================================================
+"""
+LOCAL RUN COMMAND (runs every server and learner of the config section on one asyncio event loop in this process,
+so one interpreter starts instead of one per server, taking test commands prefixed with the node ID, e.g. '3 f';
+clients are interactive, so run each in its own terminal with the printed command):
+    python startCluster.py --config config.txt --env local
+With --process-per-server every server and learner starts as a background process instead, each logging to
+LogBackups/<name>.out, and Ctrl+C stops them all:
+    python startCluster.py --config config.txt --env local --process-per-server --engine asyncio
+On Windows every process, clients included, opens in a console of its own (unless --in-process is given)
+"""
+import argparse
+import os
 import subprocess
+import sys
+import time
 
-# Opens SEVEN separate terminals, one for each process
-for process in range(7):
-    subprocess.Popen("python start.py", creationflags=subprocess.CREATE_NEW_CONSOLE)
+from AsyncServerEngine import AsyncServerEngine
+from MulticastChannel import MulticastChannel
+from RoutingTable import RoutingTable, NO_GROUP
+from Server import Server
+from start import readConfigSection
 
-"""
-for process in range(5):
-    subprocess.Popen("python start.py", creationflags=subprocess.CREATE_NEW_CONSOLE)
-"""
+START_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "start.py")
+
+
+def launchCluster(configFilePath: str, env: str = "local", startArguments: list = None, outputDir: str = None,
+                  metricsBasePort: int = None) -> list:
+    """Starts a process per server and learner of the config section (and per client on Windows), returning the
+    (name, process) pairs. Each server serves its metrics on metricsBasePort plus its process ID, if given"""
+    processes = []
+    for process in readConfigSection(configFilePath, "$LOCAL$" if env == "local" else "$AWS$"):
+        processID, name = process[0], process[1]
+        command = [sys.executable, START_SCRIPT, "--id", processID, "--config", configFilePath, "--env", env]
+        if os.name == "nt":
+            # a console each, so clients can be played and servers can take test commands
+            if name[0] != "C":
+                command += startArguments or []
+            processes.append((name, subprocess.Popen(command, creationflags=subprocess.CREATE_NEW_CONSOLE)))
+            continue
+        if name[0] == "C":
+            printClientCommand(name, processID, configFilePath, env)
+            continue
+        command += startArguments or []
+        if metricsBasePort is not None:
+            command += ["--metrics-port", str(metricsBasePort + int(processID))]
+        output = subprocess.DEVNULL
+        if outputDir is not None:
+            output = open(os.path.join(outputDir, name + ".out"), "w")
+        processes.append((name, subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=output,
+                                                 stderr=subprocess.STDOUT)))
+        if outputDir is not None:
+            output.close()  # The child holds its own copy
+    return processes
+
+
+def hostCluster(configFilePath: str, env: str = "local", multicastGroup: str = None,
+                metricsBasePort: int = None, timing: dict = None) -> list:
+    """Builds every server and learner of the config section in this process, to be run on one event loop (with
+    the Server timing keyword arguments given, if any)"""
+    routingTable = RoutingTable.fromConfigFile(configFilePath, "$LOCAL$" if env == "local" else "$AWS$")
+    servers = []
+    for groupID, processID, name, address, port, backupPath in routingTable.processes.values():
+        if groupID != NO_GROUP:
+            multicastChannel = None
+            if multicastGroup is not None:
+                multicastChannel = MulticastChannel(multicastGroup.split(":")[0], int(multicastGroup.split(":")[1]))
+            servers.append(Server(processID, name, address, port, routingTable.getGroupMembers(groupID, name),
+                                  os.path.join(os.getcwd(), backupPath),
+                                  metricsPort=metricsBasePort + processID if metricsBasePort is not None else None,
+                                  isLearner=name[0] == "L", multicastChannel=multicastChannel, **(timing or {})))
+    return servers
+
+
+def printClientCommand(name: str, processID: str, configFilePath: str, env: str) -> None:
+    """Prints the command starting a client in a terminal of its own"""
+    print("Start " + name + " with: python start.py --id " + processID + " --config " + configFilePath + " --env " +
+          env)
+
+
+def stopCluster(processes: list) -> None:
+    """Terminates every launched process and waits for it to exit"""
+    for name, process in processes:
+        process.terminate()
+    for name, process in processes:
+        process.wait()
+
+
+def parseArguments(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Starts every server and learner of a configuration file")
+    parser.add_argument("--config", default="config.txt", help="configuration file")
+    parser.add_argument("--env", default="local", choices=["local", "aws"], help="configuration section to use")
+    parser.add_argument("--engine", default="threads", choices=["threads", "asyncio"],
+                        help="server engine of each process (with a process per server)")
+    parser.add_argument("--multicast", help="multicast group <ip>:<port> for the servers' broadcasts")
+    parser.add_argument("--election-timeout-ms", type=int, nargs=2, metavar=("LOW", "HIGH"),
+                        help="bounds each server's election timeout is drawn from (default 5000 15000)")
+    parser.add_argument("--heartbeat-ms", type=int, help="leader heartbeat interval (default 3000)")
+    parser.add_argument("--no-pre-vote", action="store_true", help="start elections without asking for pre-votes")
+    parser.add_argument("--adaptive-timing", action="store_true",
+                        help="derive the heartbeat and election timeouts from measured round trips")
+    parser.add_argument("--metrics-base-port", type=int, help="serve each server's metrics on this plus its ID")
+    parser.add_argument("--output", default="LogBackups",
+                        help="directory for each process's console output (with a process per server)")
+    parser.add_argument("--process-per-server", action="store_true",
+                        help="start every server as a background process instead of on one event loop here")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run every server on one event loop here (the default except on Windows)")
+    return parser.parse_args(argv)
+
+
+# START-UP SCRIPT
+if __name__ == "__main__":
+    arguments = parseArguments()
+    # one interpreter to start is what brings a cluster up well under a second; a process per server starts five
+    # one after another on a single core
+    if arguments.in_process or (os.name != "nt" and not arguments.process_per_server):
+        configPath = os.path.abspath(arguments.config)
+        for process in readConfigSection(configPath, "$LOCAL$" if arguments.env == "local" else "$AWS$"):
+            if process[1][0] == "C":
+                printClientCommand(process[1], process[0], configPath, arguments.env)
+        timing = {"preVote": not arguments.no_pre_vote, "adaptiveTiming": arguments.adaptive_timing}
+        if arguments.election_timeout_ms is not None:
+            timing["electionTimeoutMs"] = tuple(arguments.election_timeout_ms)
+        if arguments.heartbeat_ms is not None:
+            timing["heartbeatMs"] = arguments.heartbeat_ms
+        AsyncServerEngine(hostCluster(configPath, arguments.env, arguments.multicast, arguments.metrics_base_port,
+                                      timing)).runForever()
+        sys.exit()
+    startArguments = ["--engine", arguments.engine]
+    if arguments.multicast is not None:
+        startArguments += ["--multicast", arguments.multicast]
+    if arguments.election_timeout_ms is not None:
+        startArguments += ["--election-timeout-ms"] + [str(bound) for bound in arguments.election_timeout_ms]
+    if arguments.heartbeat_ms is not None:
+        startArguments += ["--heartbeat-ms", str(arguments.heartbeat_ms)]
+    if arguments.no_pre_vote:
+        startArguments.append("--no-pre-vote")
+    if arguments.adaptive_timing:
+        startArguments.append("--adaptive-timing")
+    os.makedirs(arguments.output, exist_ok=True)
+    cluster = launchCluster(os.path.abspath(arguments.config), arguments.env, startArguments, arguments.output,
+                            arguments.metrics_base_port)
+    print("Started " + ", ".join(name for name, process in cluster) + " (Ctrl+C stops them)")
+    try:
+        while all(process.poll() is None for name, process in cluster):
+            time.sleep(0.5)
+        print("A process exited, stopping the cluster...")
+    except KeyboardInterrupt:
+        pass
+    stopCluster(cluster)
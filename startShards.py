@@ -0,0 +1,34 @@
+# ___________________________________________________________
+# --------- START-UP FUNCTION FOR SHARDED MATCHES -----------
+# ===========================================================
+"""
+LOCAL RUN COMMAND (hosts the listed Raft groups of the shard file on one asyncio event loop, so run one of these
+per core with different group IDs to spread the groups over processes):
+    python startShards.py shards.txt 0 1
+"""
+import os
+import sys
+
+from AsyncServerEngine import AsyncServerEngine
+from RoutingTable import RoutingTable, NO_GROUP
+from Server import Server
+
+
+def shardStartup(shardFilePath: str, groupIDs: list) -> None:
+    """Builds every server of the given Raft groups from the shard file and runs them until stopped"""
+    routingTable = RoutingTable.fromShardFile(shardFilePath)
+    workingDir = os.getcwd()
+    servers = []
+    for groupID, processID, name, address, port, backupPath in routingTable.processes.values():
+        if groupID != NO_GROUP and groupID in groupIDs:
+            servers.append(Server(processID, name, address, port, routingTable.getGroupMembers(groupID, name),
+                                  os.path.join(workingDir, backupPath), isLearner=name[0] == "L"))
+    print("Hosting Raft groups " + str(groupIDs) + " (" + str(len(servers)) + " servers)...\n")
+    # each server starts once the rest of its Raft group is up, in this process or another (the readiness barrier)
+    # Several servers of different groups share node IDs, so test commands cannot be routed and are not read
+    AsyncServerEngine(servers).runForever(readTestCommands=False)
+
+
+# START-UP SCRIPT
+if __name__ == "__main__":
+    shardStartup(sys.argv[1], [int(groupID) for groupID in sys.argv[2:]])